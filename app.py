@@ -1,10 +1,11 @@
 """Simple Flask app to summarize documents using the project summarizer.
 
-The app exposes a single endpoint `/summarize` that accepts a JSON payload:
+The app exposes an endpoint `/summarize` that accepts a JSON payload:
 ```
 { "text": "<document content>" }
 ```
-or a file upload via multipart form.
+or a file upload via multipart form, and a `/metrics` endpoint that serves
+per-stage latency histograms and counters in the Prometheus text format.
 
 It loads the content into a :class:`main.document.Document`, runs the
 `BestHitLLMSummarizer` with a default model, and returns the best report as
@@ -17,28 +18,69 @@ setup you would configure the OpenAI client, model, and possibly add authenticat
 from __future__ import annotations
 
 import asyncio
+import os
 
-from flask import Flask, abort, jsonify, render_template, request
+from flask import Flask, Response, abort, jsonify, render_template, request
 from openai import AsyncOpenAI
 
+from main.backend_pool import LLMBackendPool
+from main.config import SummarizerConfig, SummarizerFactory
 from main.document import Document
-from main.summarizer import BestHitLLMSummarizer
+from main.job_queue import SQLiteJobQueue
+from main.tracing import PrometheusSpanExporter, get_tracer
+from main.usage import usage_scope
 
 # ---------- Configuration -----------------------------------------------------
 # Adjust these values as needed for your environment.
-DEFAULT_MODEL = "deepseek-r1:8b"
 OPENAI_API_KEY = "YOUR_OPENAI_API_KEY"
 OPENAI_BASE_URL = "http://localhost:11434/v1"
+# Comma-separated endpoints to spread LLM calls over, e.g.
+# "http://box-1:11434/v1,http://box-2:11434/v1". Empty = OPENAI_BASE_URL alone.
+OPENAI_BASE_URLS = [u.strip() for u in os.environ.get("OPENAI_BASE_URLS", "").split(",") if u.strip()]
+LLM_HEALTH_CHECK_SECONDS = float(os.environ.get("LLM_HEALTH_CHECK_SECONDS", "10"))
+# The summarizer settings (model, BERTScore backend, scoring executor, judges,
+# repair, map-reduce, compression, token counter and per-request token budget)
+# are read from the environment variables of `main.config`, e.g.
+# BERT_SCORE_BACKEND=int8 or FAST_JUDGE=1; queue workers read the same ones.
+SUMMARIZER_CONFIG = SummarizerConfig.from_env()
+# With a queue file, /summarize enqueues a job for the workers
+# (`python -m main.worker --queue ...`) and answers 202 with its id; poll
+# /jobs/<id> for the result.
+JOB_QUEUE_PATH = os.environ.get("JOB_QUEUE_PATH")
 
 # ---------- Flask app setup ---------------------------------------------------
 app = Flask(__name__)
 
 # Create a global AsyncOpenAI client to avoid re‑creating it on each request.
 # In a real deployment you might use dependency injection.
-_llm_client = AsyncOpenAI(base_url=OPENAI_BASE_URL, api_key=OPENAI_API_KEY)
+if OPENAI_BASE_URLS:
+    _llm_client = LLMBackendPool.from_urls(OPENAI_BASE_URLS, api_key=OPENAI_API_KEY)
+    _llm_client.start_health_checks(interval=LLM_HEALTH_CHECK_SECONDS)
+else:
+    _llm_client = AsyncOpenAI(base_url=OPENAI_BASE_URL, api_key=OPENAI_API_KEY)
+
+# One BERTScore backend and scoring executor for all requests, each request
+# runs in its own event loop.
+_summarizers = SummarizerFactory(client=_llm_client, config=SUMMARIZER_CONFIG)
+
+_job_queue = SQLiteJobQueue(path=JOB_QUEUE_PATH) if JOB_QUEUE_PATH else None
+
+# Aggregate the spans of every pipeline stage for the `/metrics` endpoint.
+_prometheus_exporter = PrometheusSpanExporter()
+get_tracer().add_exporter(_prometheus_exporter)
 
 
 # ---------- Helper ------------------------------------------------------------
+def _request_options(has_title: bool,
+                     num_paragraph: int,
+                     compression_rate: float) -> dict:
+    """Summarizer options chosen in the UI, as sent along with queued jobs."""
+    return {"has_title": has_title,
+            "min_num_of_paragraph": max(1, num_paragraph - 1),
+            "max_num_of_paragraph": num_paragraph + 1,
+            "compression_rate": compression_rate}
+
+
 async def _summarize_text(text: str,
                           has_title: bool,
                           num_paragraph: int,
@@ -48,12 +90,9 @@ async def _summarize_text(text: str,
     Returns the report as a dict.
     """
     document = Document(content=text)
-    summarizer = BestHitLLMSummarizer(client=_llm_client,
-                                      has_title=has_title,
-                                      min_num_of_paragraph=max(1, num_paragraph - 1),
-                                      max_num_of_paragraph=num_paragraph + 1,
-                                      compression_rate=compression_rate,
-                                      model=DEFAULT_MODEL)
+    summarizer = _summarizers.create(**_request_options(has_title,
+                                                         num_paragraph,
+                                                         compression_rate))
     report = await summarizer.summarize(document=document)
     # The Report Pydantic model can be converted to a dict.
     return report.model_dump()
@@ -82,16 +121,56 @@ def summarize_route():
     else:
         abort(415, description="Unsupported media type")
 
+    if _job_queue is not None:
+        job_id = _job_queue.enqueue({"text": text,
+                                     "options": _request_options(include_title,
+                                                                 num_paragraph,
+                                                                 compression_rate)})
+        response = jsonify({"job_id": job_id})
+        response.status_code = 202
+        response.headers["Location"] = f"/jobs/{job_id}"
+        return response
+
     # Run the async summarizer in the event loop.
     try:
-        summary = asyncio.run(_summarize_text(text,
-                                              has_title=include_title,
-                                              num_paragraph=num_paragraph,
-                                              compression_rate=compression_rate))
+        with get_tracer().span("service.request", endpoint="/summarize") as span, \
+                usage_scope(budget=SUMMARIZER_CONFIG.token_budget()) as ledger:
+            summary = asyncio.run(_summarize_text(text,
+                                                  has_title=include_title,
+                                                  num_paragraph=num_paragraph,
+                                                  compression_rate=compression_rate))
+            span.set_attribute("outcome", "ok")
     except Exception as exc:  # pragma: no cover - debugging
         abort(500, description=str(exc))
 
-    return jsonify(summary)
+    usage = ledger.usage
+    response = jsonify(summary)
+    response.headers["X-Prompt-Tokens"] = str(usage.prompt_tokens)
+    response.headers["X-Completion-Tokens"] = str(usage.completion_tokens)
+    response.headers["X-LLM-Calls"] = str(usage.num_of_calls)
+    return response
+
+
+@app.route("/jobs/<job_id>")
+def job_route(job_id: str):
+    """Status of a queued job, with the report once it is done."""
+    if _job_queue is None:
+        abort(404, description="Jobs are not enabled")
+    job = _job_queue.get(job_id)
+    if job is None:
+        abort(404, description=f"Unknown job {job_id}")
+    return jsonify({"job_id": job.id,
+                    "status": job.status,
+                    "attempts": job.attempts,
+                    "result": job.result,
+                    "error": job.error})
+
+
+@app.route("/metrics")
+def metrics_route():
+    """Expose latency histograms and counters in the Prometheus text format."""
+    return Response(_prometheus_exporter.render(),
+                    mimetype="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,197 @@
+"""backend_pool module.
+
+Spread LLM calls over several OpenAI-compatible endpoints, e.g. one Ollama
+server per inference box. An `LLMBackendPool` is accepted wherever a client
+is: each call goes to the healthy endpoint with the fewest requests in flight.
+An endpoint failing `max_failures` calls in a row is ejected for
+`eject_seconds`, after which it is tried again; `check_health` probes every
+endpoint and re-admits or ejects them right away. Each endpoint keeps its own
+persistent connection pool.
+"""
+
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, Optional, Union
+
+import httpx
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    InternalServerError,
+)
+
+__all__ = [
+    "LLMClient",
+    "LLMEndpoint",
+    "LLMBackendPool",
+]
+
+# Errors which tell about the endpoint rather than the request.
+_ENDPOINT_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError)
+
+
+class LLMEndpoint:
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str = "dummy_key",
+        max_connections: int = 16,
+        client: Optional[AsyncOpenAI] = None,
+    ):
+        self._base_url = base_url.rstrip("/")
+        self._api_key = api_key
+        self._client = client or AsyncOpenAI(
+            base_url=self._base_url,
+            api_key=api_key,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                )
+            ),
+        )
+        self.num_of_outstanding = 0
+        self.num_of_failures = 0
+        self.ejected_until = 0.0
+
+    @property
+    def base_url(self) -> str:
+        return self._base_url
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        return self._client
+
+    def probe(self, timeout: float = 2.0) -> bool:
+        """Whether the endpoint lists its models within `timeout` seconds."""
+        try:
+            response = httpx.get(
+                f"{self._base_url}/models",
+                headers={"Authorization": f"Bearer {self._api_key}"},
+                timeout=timeout,
+            )
+        except httpx.HTTPError:
+            return False
+        return response.status_code < 500
+
+
+class LLMBackendPool:
+
+    def __init__(
+        self,
+        endpoints: List[LLMEndpoint],
+        max_failures: int = 3,
+        eject_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not endpoints:
+            raise ValueError("An LLM backend pool needs at least one endpoint.")
+        self._endpoints = endpoints
+        self._max_failures = max_failures
+        self._eject_seconds = eject_seconds
+        self._clock = clock
+        self._next = 0
+        # Requests of several threads, each running its own event loop, share
+        # the pool.
+        self._lock = threading.Lock()
+        self._health_checker: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_urls(
+        cls, base_urls: List[str], api_key: str = "dummy_key", **kwargs
+    ) -> "LLMBackendPool":
+        return cls(
+            endpoints=[
+                LLMEndpoint(base_url=base_url, api_key=api_key) for base_url in base_urls
+            ],
+            **kwargs,
+        )
+
+    @property
+    def endpoints(self) -> List[LLMEndpoint]:
+        return list(self._endpoints)
+
+    def healthy_endpoints(self) -> List[LLMEndpoint]:
+        now = self._clock()
+        return [
+            endpoint for endpoint in self._endpoints if endpoint.ejected_until <= now
+        ]
+
+    def _select(self) -> LLMEndpoint:
+        # With every endpoint ejected, try them all rather than fail outright.
+        candidates = self.healthy_endpoints() or self._endpoints
+        # Rotate the start, so ties do not always go to the first endpoint.
+        start = self._next % len(candidates)
+        self._next += 1
+        rotated = candidates[start:] + candidates[:start]
+        return min(rotated, key=lambda endpoint: endpoint.num_of_outstanding)
+
+    def _record_success(self, endpoint: LLMEndpoint) -> None:
+        endpoint.num_of_failures = 0
+        endpoint.ejected_until = 0.0
+
+    def _record_failure(self, endpoint: LLMEndpoint) -> None:
+        endpoint.num_of_failures += 1
+        if endpoint.num_of_failures >= self._max_failures:
+            endpoint.ejected_until = self._clock() + self._eject_seconds
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[AsyncOpenAI]:
+        """The client of the least loaded healthy endpoint, for one call."""
+        with self._lock:
+            endpoint = self._select()
+            endpoint.num_of_outstanding += 1
+        try:
+            yield endpoint.client
+        except _ENDPOINT_ERRORS:
+            with self._lock:
+                self._record_failure(endpoint)
+            raise
+        else:
+            with self._lock:
+                self._record_success(endpoint)
+        finally:
+            with self._lock:
+                endpoint.num_of_outstanding -= 1
+
+    def check_health(self, timeout: float = 2.0) -> None:
+        """Probe every endpoint, ejecting or re-admitting it right away."""
+        for endpoint in self._endpoints:
+            is_healthy = endpoint.probe(timeout=timeout)
+            with self._lock:
+                if is_healthy:
+                    self._record_success(endpoint)
+                else:
+                    endpoint.num_of_failures = self._max_failures
+                    endpoint.ejected_until = self._clock() + self._eject_seconds
+
+    def start_health_checks(self, interval: float = 10.0, timeout: float = 2.0) -> None:
+        """Run `check_health` every `interval` seconds on a daemon thread.
+
+        Threads do not survive a fork: a process forked from this one, e.g. a
+        `gunicorn --preload` worker, starts a thread of its own.
+        """
+        if self._health_checker is not None:
+            return
+
+        def run() -> None:
+            while True:
+                self.check_health(timeout=timeout)
+                time.sleep(interval)
+
+        def start() -> None:
+            self._health_checker = threading.Thread(
+                target=run, name="llm-health-check", daemon=True
+            )
+            self._health_checker.start()
+
+        start()
+        os.register_at_fork(after_in_child=start)
+
+
+LLMClient = Union[AsyncOpenAI, LLMBackendPool]
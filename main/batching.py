@@ -0,0 +1,133 @@
+"""batching module.
+
+Cross-request micro-batching for BERTScore. Concurrent `summarize` calls each
+score a few candidates; `BatchingBertScoreBackend` queues their pairs, waits a
+short window (or until the batch is full) and scores them in one padded batch
+on a dedicated thread. Each caller's future resolves with its own F1.
+
+The queue lives on a thread rather than an event loop, so calls from every
+loop and thread of the process, e.g. concurrent web requests each running
+their own loop, share batches.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import List, Optional, Tuple
+
+from main.bert_backends import BertScoreBackend
+
+__all__ = [
+    "BatchingBertScoreBackend",
+]
+
+_Request = Tuple[str, str, Future]
+
+
+class BatchingBertScoreBackend(BertScoreBackend):
+
+    def __init__(
+        self,
+        backend: BertScoreBackend,
+        max_batch_size: int = 32,
+        max_wait_seconds: float = 0.01,
+    ):
+        super().__init__(model_type=backend.model_type)
+        self._backend = backend
+        self._max_batch_size = max_batch_size
+        self._max_wait_seconds = max_wait_seconds
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_pid: Optional[int] = None
+        self._worker_lock = threading.Lock()
+
+    def _load(self):
+        return self._backend.scorer
+
+    def _ensure_worker(self) -> None:
+        pid = os.getpid()
+        if self._worker_pid != pid:
+            with self._worker_lock:
+                if self._worker_pid != pid:
+                    # A worker started before a fork does not run in the
+                    # forked process, which starts its own, with its own queue.
+                    self._queue = queue.Queue()
+                    self._worker = threading.Thread(
+                        target=self._run, name="bert-score-batcher", daemon=True
+                    )
+                    self._worker.start()
+                    self._worker_pid = pid
+
+    def _next_batch(self) -> Optional[List[_Request]]:
+        request = self._queue.get()
+        if request is None:
+            return None
+        batch = [request]
+        deadline = time.monotonic() + self._max_wait_seconds
+        while len(batch) < self._max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)  # stop after this batch
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            batch = [
+                request
+                for request in batch
+                if request[2].set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+            try:
+                f1 = self._backend.score(
+                    cands=[cand for cand, _, _ in batch],
+                    refs=[ref for _, ref, _ in batch],
+                )
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, _, future), value in zip(batch, f1):
+                    future.set_result(value)
+
+    def submit(self, cand: str, ref: str) -> Future:
+        """Queue one pair, the returned future resolves with its F1."""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((cand, ref, future))
+        return future
+
+    def score(self, cands: List[str], refs: List[str]) -> List[float]:
+        futures = [self.submit(cand, ref) for cand, ref in zip(cands, refs)]
+        return [future.result() for future in futures]
+
+    async def score_async(
+        self, cands: List[str], refs: List[str], executor: Optional[Executor] = None
+    ) -> List[float]:
+        # Waiting on the batcher does not need an executor thread.
+        futures = [self.submit(cand, ref) for cand, ref in zip(cands, refs)]
+        return list(
+            await asyncio.gather(*[asyncio.wrap_future(future) for future in futures])
+        )
+
+    def close(self) -> None:
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+            self._worker_pid = None
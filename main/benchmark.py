@@ -0,0 +1,502 @@
+"""benchmark module.
+
+Micro-benchmarks for every metric extractor and requirement on a synthetic
+corpus. Run it with::
+
+    python -m main.benchmark --baseline benchmarks/baseline.json --update-baseline
+    python -m main.benchmark --baseline benchmarks/baseline.json --max-slowdown 1.25
+
+The second command exits with a non-zero status when a case is slower than the
+stored baseline by more than the given factor, or when there is no baseline;
+only ``--update-baseline`` records one.
+
+``--agreement`` instead compares the BERTScore backends against ``float32``
+on the same corpus::
+
+    python -m main.benchmark --agreement --backends int8 distilled onnx
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import random
+import sys
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from main.bert_backends import get_bert_score_backend
+from main.document import Document
+from main.llm_as_judge import Reference
+from main.metrics import (
+    BertScoreMetricExtractor,
+    CompletenessMetricExtractor,
+    CorrectnessMetricExtractor,
+    HasTitleMetricExtractor,
+    NumberOfParagraphMetricExtractor,
+    NumberOfTokenMetricExtractor,
+    RougeScoreMetricExtractor,
+    TitleLengthMetricExtractor,
+)
+from main.report import Report
+from main.requirements import (
+    CompletenessRequirement,
+    CorrectnessRequirement,
+    DoubleNewlineDelimiterRequirement,
+    HasTitleRequirement,
+    NumberOfParagraphRequirement,
+    NumberOfTokenRequirement,
+    TitleLengthRequirement,
+)
+
+__all__ = [
+    "DEFAULT_DOCUMENT_SIZES",
+    "DEFAULT_CANDIDATE_COUNTS",
+    "SyntheticCorpus",
+    "BenchmarkCase",
+    "BenchmarkResult",
+    "BenchmarkBaseline",
+    "Regression",
+    "build_targets",
+    "run_benchmarks",
+    "compare_with_baseline",
+    "BackendAgreement",
+    "measure_backend_agreement",
+]
+
+DEFAULT_DOCUMENT_SIZES = [1_000, 10_000, 100_000, 1_000_000]  # in bytes
+DEFAULT_CANDIDATE_COUNTS = [1, 10, 100]
+
+_VOCABULARY = (
+    "the of and to in a is that for it as was with be by on not he this are or "
+    "his from at which but have an they you were her she there been one all we "
+    "their has would when who will more no if out so said what up its about "
+    "into than them can only other new some could time these two may then do "
+    "first any my now such like our over man me even most made after also did "
+    "many before must through back years where much your way well down should "
+    "because each just those people how too little state good very make world "
+    "still own see men work long get here between both life being under never "
+    "day same another know while last might us great old year off come since "
+    "against go came right used take three university research students city "
+    "council government report foster care children families carers campaign "
+    "network survey school health service public policy funding budget model "
+    "summary document evidence analysis result increase decrease average local"
+).split()
+
+
+class SyntheticCorpus:
+    """Deterministic generator of documents and candidate reports."""
+
+    def __init__(self, seed: int = 0):
+        self._seed = seed
+
+    def _random(self, *salt) -> random.Random:
+        return random.Random(f"{self._seed}-" + "-".join(str(s) for s in salt))
+
+    @staticmethod
+    def _sentence(rng: random.Random) -> str:
+        words = [rng.choice(_VOCABULARY) for _ in range(rng.randint(8, 20))]
+        return " ".join(words).capitalize() + "."
+
+    def document(self, size_in_bytes: int) -> Document:
+        rng = self._random("document", size_in_bytes)
+        paragraphs = []
+        length = 0
+        while length < size_in_bytes:
+            paragraph = " ".join(
+                self._sentence(rng) for _ in range(rng.randint(3, 6))
+            )
+            paragraphs.append(paragraph)
+            length += len(paragraph) + 2
+        content = "\n\n".join(paragraphs)[:size_in_bytes].rstrip()
+        return Document(content=content)
+
+    def reports(
+        self, document: Document, num_of_candidate: int, compression_rate: float = 0.2
+    ) -> List[Report]:
+        sentences = [
+            sentence.strip() + "."
+            for sentence in document.content.replace("\n\n", " ").split(".")
+            if sentence.strip()
+        ]
+        num_of_word = len(document.content.split())
+        reports = []
+        for idx in range(num_of_candidate):
+            rng = self._random("report", len(document.content), idx)
+            budget = max(1, int(num_of_word * compression_rate))
+            picked = []
+            while budget > 0 and sentences:
+                sentence = rng.choice(sentences)
+                picked.append(sentence)
+                budget -= len(sentence.split())
+            num_of_paragraph = min(len(picked), rng.randint(2, 4))
+            step = -(-len(picked) // num_of_paragraph)
+            paragraphs = [
+                " ".join(picked[start : start + step])
+                for start in range(0, len(picked), step)
+            ]
+            title = " ".join(rng.choice(_VOCABULARY) for _ in range(rng.randint(2, 8)))
+            reports.append(
+                Report(title=title.title(), content="\n\n".join(paragraphs))
+            )
+        return reports
+
+
+class _OfflineCompletions:
+    """Answer structured-output requests locally so that LLM-backed targets
+    measure the overhead of this package only (prompt rendering, parsing)."""
+
+    async def parse(self, model: str, messages: list, response_format, **kwargs):
+        content = {}
+        for name, field in response_format.model_fields.items():
+            content[name] = True if field.annotation is bool else "benchmark"
+        message = SimpleNamespace(content=json.dumps(content))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+class _OfflineLLMClient:
+
+    def __init__(self):
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=_OfflineCompletions()))
+
+
+class BenchmarkCase(BaseModel):
+    target: str
+    document_size: int
+    num_of_candidate: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.target}|{self.document_size}|{self.num_of_candidate}"
+
+
+class BenchmarkResult(BaseModel):
+    case: BenchmarkCase
+    repeats: int
+    best_seconds: float
+    mean_seconds: float
+
+
+class BenchmarkBaseline(BaseModel):
+    environment: Dict[str, str]
+    results: List[BenchmarkResult]
+
+    def save(self, output_file_path: str) -> None:
+        directory = os.path.dirname(output_file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(output_file_path, "w") as out_file_obj:
+            out_file_obj.write(self.model_dump_json(indent=2))
+
+    @classmethod
+    def load(cls, input_file_path: str) -> "BenchmarkBaseline":
+        with open(input_file_path, "r") as in_file_obj:
+            return cls.model_validate_json(in_file_obj.read())
+
+
+class Regression(BaseModel):
+    key: str
+    baseline_seconds: float
+    current_seconds: float
+
+    @property
+    def slowdown(self) -> float:
+        return self.current_seconds / self.baseline_seconds
+
+
+def build_targets(document: Document) -> Dict[str, Callable]:
+    """Return one callable per extractor / requirement, keyed by class name.
+
+    Every callable takes a report and returns either a value or an awaitable.
+    """
+    client = _OfflineLLMClient()
+    model = "offline"
+    reference = Reference(content=document.content)
+    num_of_word = len(document.content.split())
+
+    extractors = [
+        HasTitleMetricExtractor(),
+        TitleLengthMetricExtractor(),
+        NumberOfParagraphMetricExtractor(),
+        NumberOfTokenMetricExtractor(),
+        BertScoreMetricExtractor(reference=reference),
+        RougeScoreMetricExtractor(reference=reference),
+        CorrectnessMetricExtractor(client=client, model=model, reference=reference),
+        CompletenessMetricExtractor(client=client, model=model, reference=reference),
+    ]
+    requirements = [
+        HasTitleRequirement(must_be_satisfied=True),
+        TitleLengthRequirement(min_num_of_char=5, max_num_of_char=50),
+        DoubleNewlineDelimiterRequirement(),
+        NumberOfParagraphRequirement(min_num_of_paragraph=2, max_num_of_paragraph=4),
+        NumberOfTokenRequirement(
+            min_num_of_token=int(0.15 * num_of_word),
+            max_num_of_token=int(0.25 * num_of_word),
+        ),
+        CorrectnessRequirement(client=client, model=model, org_document=document),
+        CompletenessRequirement(client=client, model=model, org_document=document),
+    ]
+
+    targets = {}
+    for extractor in extractors:
+        targets[type(extractor).__name__] = extractor.extract
+    for requirement in requirements:
+        targets[type(requirement).__name__] = requirement.is_satisfied
+    return targets
+
+
+def _uncached(reports: List[Report]) -> List[Report]:
+    """Copies of `reports` without their cached features, so that every
+    repeat computes them as a request would."""
+    return [Report(title=report.title, content=report.content) for report in reports]
+
+
+def _time_once(target: Callable, reports: List[Report]) -> float:
+    if inspect.iscoroutinefunction(target):
+
+        async def run_all():
+            for report in reports:
+                await target(report)
+
+        start = time.perf_counter()
+        asyncio.run(run_all())
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    for report in reports:
+        target(report)
+    return time.perf_counter() - start
+
+
+def run_benchmarks(
+    document_sizes: Optional[List[int]] = None,
+    candidate_counts: Optional[List[int]] = None,
+    targets: Optional[List[str]] = None,
+    repeats: int = 3,
+    seed: int = 0,
+) -> List[BenchmarkResult]:
+    document_sizes = document_sizes or DEFAULT_DOCUMENT_SIZES
+    candidate_counts = candidate_counts or DEFAULT_CANDIDATE_COUNTS
+    corpus = SyntheticCorpus(seed=seed)
+
+    results = []
+    for document_size in document_sizes:
+        document = corpus.document(document_size)
+        all_targets = build_targets(document)
+        selected = targets or list(all_targets)
+        for num_of_candidate in candidate_counts:
+            reports = corpus.reports(document, num_of_candidate)
+            for name in selected:
+                target = all_targets[name]
+                _time_once(target, reports[:1])  # warm up (model loading etc.)
+                timings = [
+                    _time_once(target, _uncached(reports)) for _ in range(repeats)
+                ]
+                case = BenchmarkCase(
+                    target=name,
+                    document_size=document_size,
+                    num_of_candidate=num_of_candidate,
+                )
+                result = BenchmarkResult(
+                    case=case,
+                    repeats=repeats,
+                    best_seconds=min(timings),
+                    mean_seconds=sum(timings) / len(timings),
+                )
+                print(
+                    f"{case.key}: best {result.best_seconds:.6f}s, "
+                    f"mean {result.mean_seconds:.6f}s"
+                )
+                results.append(result)
+    return results
+
+
+def compare_with_baseline(
+    results: List[BenchmarkResult],
+    baseline: BenchmarkBaseline,
+    max_slowdown: float = 1.25,
+    min_seconds: float = 1e-4,
+) -> List[Regression]:
+    """Cases slower than `max_slowdown` times their baseline.
+
+    Cases faster than `min_seconds` in both runs are ignored, they are
+    dominated by timer noise.
+    """
+    baseline_by_key = {result.case.key: result for result in baseline.results}
+    regressions = []
+    for result in results:
+        previous = baseline_by_key.get(result.case.key)
+        if previous is None:
+            continue
+        if max(previous.best_seconds, result.best_seconds) < min_seconds:
+            continue
+        if result.best_seconds > max_slowdown * max(previous.best_seconds, 1e-12):
+            regressions.append(
+                Regression(
+                    key=result.case.key,
+                    baseline_seconds=previous.best_seconds,
+                    current_seconds=result.best_seconds,
+                )
+            )
+    return regressions
+
+
+class BackendAgreement(BaseModel):
+    """Agreement of a BERTScore backend with the float32 baseline.
+
+    `top1_agreement` is the fraction of documents for which both backends
+    rank the same candidate first, i.e. the summarizer picks the same report.
+    """
+
+    backend: str
+    num_of_pair: int
+    max_abs_diff: float
+    mean_abs_diff: float
+    pearson: float
+    top1_agreement: float
+    seconds: float
+    baseline_seconds: float
+
+
+def _pearson(xs: List[float], ys: List[float]) -> float:
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    var_y = sum((y - mean_y) ** 2 for y in ys)
+    if var_x == 0 or var_y == 0:
+        return 1.0 if xs == ys else 0.0
+    return cov / (var_x * var_y) ** 0.5
+
+
+def _score_corpus(backend_name: str, groups) -> tuple:
+    backend = get_bert_score_backend(name=backend_name)
+    backend.score(cands=["warm up"], refs=["warm up"])
+    start = time.perf_counter()
+    scores = [
+        backend.score(
+            cands=[report.content for report in reports],
+            refs=[document.content] * len(reports),
+        )
+        for document, reports in groups
+    ]
+    return scores, time.perf_counter() - start
+
+
+def measure_backend_agreement(
+    backends: List[str],
+    document_sizes: Optional[List[int]] = None,
+    num_of_document: int = 5,
+    num_of_candidate: int = 10,
+    seed: int = 0,
+) -> List[BackendAgreement]:
+    document_sizes = document_sizes or [1_000, 10_000]
+    groups = []
+    for document_size in document_sizes:
+        for idx in range(num_of_document):
+            corpus = SyntheticCorpus(seed=seed + idx)
+            document = corpus.document(document_size)
+            groups.append((document, corpus.reports(document, num_of_candidate)))
+
+    baseline, baseline_seconds = _score_corpus("float32", groups)
+    agreements = []
+    for backend_name in backends:
+        scores, seconds = _score_corpus(backend_name, groups)
+        xs = [x for group in baseline for x in group]
+        ys = [y for group in scores for y in group]
+        diffs = [abs(x - y) for x, y in zip(xs, ys)]
+        top1 = [
+            max(range(len(x)), key=x.__getitem__) == max(range(len(y)), key=y.__getitem__)
+            for x, y in zip(baseline, scores)
+        ]
+        agreements.append(
+            BackendAgreement(
+                backend=backend_name,
+                num_of_pair=len(xs),
+                max_abs_diff=max(diffs),
+                mean_abs_diff=sum(diffs) / len(diffs),
+                pearson=_pearson(xs, ys),
+                top1_agreement=sum(top1) / len(top1),
+                seconds=seconds,
+                baseline_seconds=baseline_seconds,
+            )
+        )
+    return agreements
+
+
+def _environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": str(os.cpu_count()),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_DOCUMENT_SIZES)
+    parser.add_argument(
+        "--candidates", type=int, nargs="+", default=DEFAULT_CANDIDATE_COUNTS
+    )
+    parser.add_argument("--targets", nargs="+", default=None)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default="benchmarks/baseline.json")
+    parser.add_argument("--max-slowdown", type=float, default=1.25)
+    parser.add_argument("--min-seconds", type=float, default=1e-4)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--agreement", action="store_true")
+    parser.add_argument("--backends", nargs="+", default=["int8", "distilled", "onnx"])
+    args = parser.parse_args(argv)
+
+    if args.agreement:
+        for agreement in measure_backend_agreement(
+            backends=args.backends, seed=args.seed
+        ):
+            print(agreement.model_dump_json())
+        return 0
+
+    if not args.update_baseline and not os.path.exists(args.baseline):
+        print(
+            f"No baseline at {args.baseline}, record one with --update-baseline",
+            file=sys.stderr,
+        )
+        return 2
+
+    results = run_benchmarks(
+        document_sizes=args.sizes,
+        candidate_counts=args.candidates,
+        targets=args.targets,
+        repeats=args.repeats,
+        seed=args.seed,
+    )
+
+    if args.update_baseline:
+        BenchmarkBaseline(environment=_environment(), results=results).save(
+            args.baseline
+        )
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare_with_baseline(
+        results,
+        BenchmarkBaseline.load(args.baseline),
+        max_slowdown=args.max_slowdown,
+        min_seconds=args.min_seconds,
+    )
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression.key}: {regression.baseline_seconds:.6f}s -> "
+            f"{regression.current_seconds:.6f}s ({regression.slowdown:.2f}x)"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""bert_backends module.
+
+CPU backends computing BERTScore F1 for `BertScoreMetricExtractor`:
+
+- ``float32``: `bert-base-uncased` as shipped, the reference backend;
+- ``int8``: the same encoder with dynamically int8-quantized linear layers;
+- ``distilled``: `distilbert-base-uncased`, a 6-layer distilled encoder;
+- ``onnx``: `bert-base-uncased` exported once to ONNX and run by onnxruntime.
+
+All backends share bert-score's tokenization and greedy token matching and only
+swap the encoder. Agreement with ``float32`` is measured with
+``python -m main.benchmark --agreement`` (see README). Since the summarizer
+only ranks candidates by their score, rank agreement is what matters; the
+distilled encoder scores on a different absolute scale.
+
+Heavy dependencies (torch, transformers, bert-score, onnxruntime) are imported
+on first use, and a loaded backend is shared per process.
+"""
+
+import asyncio
+import os
+import threading
+from abc import ABC
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Tuple
+
+__all__ = [
+    "BERT_SCORE_BACKENDS",
+    "BertScoreBackend",
+    "TorchBertScoreBackend",
+    "OnnxBertScoreBackend",
+    "get_bert_score_backend",
+]
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "ai-summarize-document"
+)
+
+
+class BertScoreBackend(ABC):
+
+    def __init__(self, model_type: str, num_threads: Optional[int] = None):
+        self._model_type = model_type
+        self._num_threads = num_threads
+        self._scorer = None
+        self._lock = threading.Lock()
+        self._registry_key: Optional[Tuple[str, Optional[int]]] = None
+
+    @property
+    def model_type(self) -> str:
+        return self._model_type
+
+    @property
+    def scorer(self):
+        """The underlying `bert_score.BERTScorer`, loaded on first access; None
+        for a backend without a model of its own, e.g. a remote one."""
+        if self._scorer is None:
+            with self._lock:
+                if self._scorer is None:
+                    if self._num_threads:
+                        import torch
+
+                        torch.set_num_threads(self._num_threads)
+                    self._scorer = self._load()
+        return self._scorer
+
+    def _load(self):
+        """Load and return a `bert_score.BERTScorer`; backends overriding
+        `score` without a local model keep this no-op."""
+        return None
+
+    def score(self, cands: List[str], refs: List[str]) -> List[float]:
+        """BERTScore F1 of each candidate against its reference."""
+        _, _, f1 = self.scorer.score(cands=cands, refs=refs)
+        return [value.item() for value in f1]
+
+    async def score_async(
+        self, cands: List[str], refs: List[str], executor: Optional[Executor] = None
+    ) -> List[float]:
+        """`score` off the event loop, in `executor` or the loop's default one."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.score, cands, refs)
+
+    def __reduce_ex__(self, protocol):
+        # A registered backend unpickles to the registered backend of the
+        # receiving process, e.g. a process pool worker, so the model is
+        # loaded once per process rather than once per task.
+        if self._registry_key is not None:
+            return get_bert_score_backend, self._registry_key
+        return super().__reduce_ex__(protocol)
+
+    def __getstate__(self) -> dict:
+        # Ship the configuration only, the receiving process loads its own
+        # copy of the model on first use.
+        state = self.__dict__.copy()
+        state["_scorer"] = None
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class TorchBertScoreBackend(BertScoreBackend):
+
+    def __init__(
+        self,
+        model_type: str = "bert-base-uncased",
+        num_threads: Optional[int] = None,
+        quantize: bool = False,
+    ):
+        super().__init__(model_type=model_type, num_threads=num_threads)
+        self._quantize = quantize
+
+    def _load(self):
+        from bert_score import BERTScorer
+
+        # Dynamically quantized modules only run on CPU.
+        device = "cpu" if self._quantize else None
+        scorer = BERTScorer(model_type=self._model_type, device=device)
+        if self._quantize:
+            import torch
+
+            scorer._model = torch.quantization.quantize_dynamic(
+                scorer._model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        return scorer
+
+
+class _OnnxEncoder:
+    """Stand-in for the transformers encoder inside a `BERTScorer`."""
+
+    def __init__(self, session):
+        self._session = session
+
+    def eval(self) -> "_OnnxEncoder":
+        return self
+
+    def __call__(self, input_ids, attention_mask=None, output_hidden_states=False):
+        import torch
+
+        (last_hidden_state,) = self._session.run(
+            ["last_hidden_state"],
+            {
+                "input_ids": input_ids.cpu().numpy(),
+                "attention_mask": attention_mask.cpu().numpy(),
+            },
+        )
+        return (torch.from_numpy(last_hidden_state),)
+
+
+class OnnxBertScoreBackend(BertScoreBackend):
+
+    def __init__(
+        self,
+        model_type: str = "bert-base-uncased",
+        num_threads: Optional[int] = None,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+    ):
+        super().__init__(model_type=model_type, num_threads=num_threads)
+        self._cache_dir = cache_dir
+
+    def _export(self, model, onnx_file_path: str) -> None:
+        import torch
+
+        class LastHiddenState(torch.nn.Module):
+            def __init__(self, encoder):
+                super().__init__()
+                self.encoder = encoder
+
+            def forward(self, input_ids, attention_mask):
+                return self.encoder(input_ids, attention_mask=attention_mask)[0]
+
+        os.makedirs(os.path.dirname(onnx_file_path), exist_ok=True)
+        dummy = torch.ones((1, 8), dtype=torch.long)
+        dynamic_axes = {0: "batch", 1: "sequence"}
+        torch.onnx.export(
+            LastHiddenState(model).eval(),
+            (dummy, dummy),
+            onnx_file_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": dynamic_axes,
+                "attention_mask": dynamic_axes,
+                "last_hidden_state": dynamic_axes,
+            },
+            opset_version=14,
+        )
+
+    def _load(self):
+        import onnxruntime
+        from bert_score import BERTScorer
+
+        scorer = BERTScorer(model_type=self._model_type, device="cpu")
+        # bert-score truncates the encoder to its best layer, the file name
+        # has to reflect that.
+        num_of_layer = len(scorer._model.encoder.layer)
+        onnx_file_path = os.path.join(
+            self._cache_dir, f"{self._model_type}-L{num_of_layer}.onnx"
+        )
+        if not os.path.exists(onnx_file_path):
+            self._export(scorer._model, onnx_file_path)
+
+        options = onnxruntime.SessionOptions()
+        if self._num_threads:
+            options.intra_op_num_threads = self._num_threads
+        session = onnxruntime.InferenceSession(
+            onnx_file_path, options, providers=["CPUExecutionProvider"]
+        )
+        scorer._model = _OnnxEncoder(session)
+        return scorer
+
+
+BERT_SCORE_BACKENDS = {
+    "float32": (TorchBertScoreBackend, {"model_type": "bert-base-uncased"}),
+    "int8": (
+        TorchBertScoreBackend,
+        {"model_type": "bert-base-uncased", "quantize": True},
+    ),
+    "distilled": (TorchBertScoreBackend, {"model_type": "distilbert-base-uncased"}),
+    "onnx": (OnnxBertScoreBackend, {"model_type": "bert-base-uncased"}),
+}
+
+_backends: Dict[Tuple[str, Optional[int]], BertScoreBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_bert_score_backend(
+    name: str = "float32", num_threads: Optional[int] = None
+) -> BertScoreBackend:
+    """The process-wide backend registered as `name` in `BERT_SCORE_BACKENDS`."""
+    if name not in BERT_SCORE_BACKENDS:
+        raise ValueError(
+            f"Unknown BERTScore backend {name!r}, "
+            f"choose from {sorted(BERT_SCORE_BACKENDS)}"
+        )
+    with _backends_lock:
+        key = (name, num_threads)
+        if key not in _backends:
+            backend_cls, kwargs = BERT_SCORE_BACKENDS[name]
+            _backends[key] = backend_cls(num_threads=num_threads, **kwargs)
+            _backends[key]._registry_key = key
+        return _backends[key]
@@ -0,0 +1,55 @@
+"""caching module."""
+
+import asyncio
+from functools import partial
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+__all__ = [
+    "AsyncMemo",
+]
+
+T = TypeVar("T")
+
+
+class AsyncMemo(Generic[T]):
+    """Memoize coroutine results by key.
+
+    Concurrent calls with the same key share one computation; its result is
+    kept for later calls. A failed or cancelled computation is forgotten, so
+    the next call retries it.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, "asyncio.Future[T]"] = {}
+        self._num_of_hits = 0
+        self._num_of_misses = 0
+
+    @property
+    def num_of_hits(self) -> int:
+        return self._num_of_hits
+
+    @property
+    def num_of_misses(self) -> int:
+        return self._num_of_misses
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def _forget_failure(self, key: Hashable, task: "asyncio.Future[T]") -> None:
+        if task.cancelled() or task.exception() is not None:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+    async def get_or_compute(
+        self, key: Hashable, compute: Callable[[], Awaitable[T]]
+    ) -> T:
+        task = self._tasks.get(key)
+        if task is None:
+            self._num_of_misses += 1
+            task = asyncio.ensure_future(compute())
+            self._tasks[key] = task
+            task.add_done_callback(partial(self._forget_failure, key))
+        else:
+            self._num_of_hits += 1
+        # A cancelled caller must not cancel the computation others wait for.
+        return await asyncio.shield(task)
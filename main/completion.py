@@ -0,0 +1,203 @@
+"""completion module.
+
+The single place where this package calls an LLM API, so that every call is
+traced, accounted and budgeted the same way.
+"""
+
+from contextlib import nullcontext
+from typing import Callable, List, Optional, Type
+
+from openai import LengthFinishReasonError
+from openai.types.chat import ChatCompletion, ChatCompletionMessage
+from openai.types.chat.chat_completion import Choice
+from pydantic import BaseModel, ValidationError
+
+from main.backend_pool import LLMBackendPool, LLMClient
+from main.customized_exceptions import GenerationAborted, TokenBudgetExceeded
+from main.tokenization import TokenCounter, get_token_counter
+from main.tracing import Span, get_tracer
+from main.usage import UsageLedger, get_usage_ledger
+
+__all__ = [
+    "parse_chat_completion",
+    "stream_chat_completion",
+]
+
+
+def _acquire(client: LLMClient):
+    """Context manager yielding the client to call, picked from a pool."""
+    if isinstance(client, LLMBackendPool):
+        return client.acquire()
+    return nullcontext(client)
+
+
+def _invalid_json(error: ValidationError) -> Optional[str]:
+    """The raw content behind a JSON syntax error of the API client's parser."""
+    for detail in error.errors():
+        if detail["type"] == "json_invalid" and isinstance(detail["input"], str):
+            return detail["input"]
+    return None
+
+
+def _unparsed_completion(content: str) -> ChatCompletion:
+    return ChatCompletion.model_construct(
+        choices=[
+            Choice.model_construct(
+                index=0,
+                finish_reason="stop",
+                message=ChatCompletionMessage.model_construct(
+                    role="assistant", content=content
+                ),
+            )
+        ],
+        usage=None,
+    )
+
+
+def _salvage(error: Exception, span: Span):
+    """The completion behind a truncated or malformed output, for
+    `parse_structured_output` to salvage; other errors are raised."""
+    if isinstance(error, LengthFinishReasonError):
+        span.set_attribute("finish_reason", "length")
+        return error.completion
+    content = _invalid_json(error)
+    if content is None:
+        raise error
+    # The usage of the completion is lost with it.
+    span.set_attribute("finish_reason", "invalid_json")
+    return _unparsed_completion(content)
+
+
+def _record_usage(
+    span: Span,
+    ledger: Optional[UsageLedger],
+    prompt_tokens: int,
+    completion_tokens: int,
+) -> None:
+    span.set_attribute("prompt_tokens", prompt_tokens)
+    span.set_attribute("completion_tokens", completion_tokens)
+    if ledger is not None:
+        ledger.record(prompt_tokens, completion_tokens)
+
+
+async def parse_chat_completion(
+    client: LLMClient,
+    model: str,
+    messages: List[dict],
+    response_format: Type[BaseModel],
+    request_options: Optional[dict] = None,
+    **attributes,
+):
+    """Request a structured chat completion.
+
+    `request_options` are passed on to the API, e.g. `max_tokens`. Extra
+    keyword arguments are attached to the `llm.call` span, e.g. the candidate
+    index of a summarization try. Token usage is recorded into the current
+    usage ledger; `TokenBudgetExceeded` is raised instead of calling the API
+    once its budget is exhausted.
+
+    A truncated or malformed output is returned rather than raised, without
+    `parsed` object, for `parse_structured_output` to salvage.
+    """
+    ledger = get_usage_ledger()
+    if ledger is not None and ledger.is_exhausted():
+        raise TokenBudgetExceeded()
+
+    with get_tracer().span(
+        "llm.call", model=model, response_format=response_format.__name__, **attributes
+    ) as span:
+        async with _acquire(client) as api_client:
+            try:
+                response = await api_client.beta.chat.completions.parse(
+                    model=model,
+                    messages=messages,
+                    response_format=response_format,
+                    **(request_options or {}),
+                )
+            except (LengthFinishReasonError, ValidationError) as e:
+                response = _salvage(e, span)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            _record_usage(
+                span, ledger, usage.prompt_tokens, usage.completion_tokens
+            )
+        span.set_attribute("outcome", "ok")
+        return response
+
+
+async def stream_chat_completion(
+    client: LLMClient,
+    model: str,
+    messages: List[dict],
+    response_format: Type[BaseModel],
+    on_delta: Callable[[str], bool],
+    token_counter: Optional[TokenCounter] = None,
+    **attributes,
+):
+    """Request a structured chat completion as a stream.
+
+    `on_delta` receives every chunk of generated text and returns True to
+    abort the generation, in which case the stream is closed, so the server
+    stops decoding, and `GenerationAborted` is raised. Otherwise the final
+    parsed completion is returned, and a truncated or malformed output is
+    salvaged, as by `parse_chat_completion`.
+
+    The usage of an aborted stream is estimated, counting the prompt with
+    `token_counter`, whitespace-separated words by default.
+    """
+    ledger = get_usage_ledger()
+    if ledger is not None and ledger.is_exhausted():
+        raise TokenBudgetExceeded()
+
+    with get_tracer().span(
+        "llm.call",
+        model=model,
+        response_format=response_format.__name__,
+        stream=True,
+        **attributes,
+    ) as span:
+        num_of_delta = 0
+        aborted = False
+        async with _acquire(client) as api_client:
+            async with api_client.beta.chat.completions.stream(
+                model=model,
+                messages=messages,
+                response_format=response_format,
+                stream_options={"include_usage": True},
+            ) as stream:
+                try:
+                    async for event in stream:
+                        if event.type != "content.delta":
+                            continue
+                        num_of_delta += 1
+                        if on_delta(event.delta):
+                            aborted = True
+                            break
+                    if not aborted:
+                        response = await stream.get_final_completion()
+                except (LengthFinishReasonError, ValidationError) as e:
+                    response = _salvage(e, span)
+
+        if aborted:
+            # The usage of an aborted stream is never reported; the prompt was
+            # prefilled all the same, and servers send about one token per
+            # chunk.
+            counter = token_counter or get_token_counter()
+            prompt_tokens = sum(
+                counter.count(message["content"])
+                for message in messages
+                if isinstance(message.get("content"), str)
+            )
+            _record_usage(
+                span, ledger, prompt_tokens=prompt_tokens, completion_tokens=num_of_delta
+            )
+            span.set_attribute("outcome", "aborted")
+            raise GenerationAborted()
+
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            _record_usage(
+                span, ledger, usage.prompt_tokens, usage.completion_tokens
+            )
+        span.set_attribute("outcome", "ok")
+        return response
@@ -0,0 +1,219 @@
+"""compression module.
+
+An optional extractive stage shrinking a document to a token budget before it
+is put into a prompt: sentences are ranked by their centrality in a TF-IDF
+sentence graph, and the best ranked ones fitting the budget are kept, in their
+original order. It runs on CPU in time linear in the size of the document,
+the sentence graph is never materialized.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from main.document import Document
+from main.tokenization import TokenCounter, get_token_counter
+
+__all__ = [
+    "CompressionResult",
+    "ExtractiveCompressor",
+    "split_into_sentences",
+]
+
+_PARAGRAPH_DELIMITER = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+")
+_WORD = re.compile(r"\w+")
+
+
+def split_into_sentences(text: str) -> List[List[str]]:
+    """The sentences of each paragraph of `text`."""
+    paragraphs = []
+    for paragraph in _PARAGRAPH_DELIMITER.split(text):
+        sentences = [
+            sentence.strip()
+            for sentence in _SENTENCE_END.split(paragraph)
+            if sentence.strip()
+        ]
+        if sentences:
+            paragraphs.append(sentences)
+    return paragraphs
+
+
+class CompressionResult(BaseModel):
+    document: Document
+    num_of_token_before: int
+    num_of_token_after: int
+
+    @property
+    def compression_ratio(self) -> float:
+        """Tokens kept per token of the input, 1.0 if nothing was removed."""
+        if self.num_of_token_before == 0:
+            return 1.0
+        return self.num_of_token_after / self.num_of_token_before
+
+
+class ExtractiveCompressor:
+    """Keep the most central sentences within `max_num_of_token` tokens.
+
+    `method` is "textrank", PageRank over the cosine similarity graph of the
+    sentences' TF-IDF vectors, or "tfidf", the similarity of each sentence to
+    all others (degree centrality), which is cheaper and close to it. Tokens
+    are counted by `token_counter`, whitespace-separated words by default.
+    """
+
+    def __init__(
+        self,
+        max_num_of_token: int,
+        method: str = "textrank",
+        damping: float = 0.85,
+        max_iterations: int = 50,
+        tolerance: float = 1e-6,
+        token_counter: Optional[TokenCounter] = None,
+    ):
+        if method not in ("textrank", "tfidf"):
+            raise ValueError(f"Unknown extractive compression method: {method}")
+        self._max_num_of_token = max_num_of_token
+        self._method = method
+        self._damping = damping
+        self._max_iterations = max_iterations
+        self._tolerance = tolerance
+        self._token_counter = token_counter or get_token_counter()
+
+    @property
+    def max_num_of_token(self) -> int:
+        return self._max_num_of_token
+
+    @staticmethod
+    def _tfidf(
+        sentences: List[str],
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+        """The L2-normalized TF-IDF matrix as (rows, columns, values, width)."""
+        vocabulary: Dict[str, int] = {}
+        counts = []
+        for sentence in sentences:
+            counter = Counter(_WORD.findall(sentence.lower()))
+            counts.append(
+                {
+                    vocabulary.setdefault(word, len(vocabulary)): n
+                    for word, n in counter.items()
+                }
+            )
+        document_frequency = np.zeros(len(vocabulary))
+        for count in counts:
+            document_frequency[list(count)] += 1
+        idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1
+
+        rows, columns, values = [], [], []
+        for row, count in enumerate(counts):
+            rows.extend([row] * len(count))
+            columns.extend(count)
+            values.extend(count.values())
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = np.asarray(columns, dtype=np.int64)
+        values = np.asarray(values, dtype=float) * idf[columns]
+        norms = np.sqrt(
+            np.bincount(rows, weights=values**2, minlength=len(sentences))
+        )
+        values = values / np.where(norms > 0, norms, 1.0)[rows]
+        return rows, columns, values, len(vocabulary)
+
+    def rank(self, sentences: List[str]) -> np.ndarray:
+        """The centrality of each sentence."""
+        num_of_sentence = len(sentences)
+        if num_of_sentence == 0:
+            return np.zeros(0)
+        rows, columns, values, width = self._tfidf(sentences)
+        has_words = np.bincount(rows, minlength=num_of_sentence) > 0
+
+        def similarity_times(vector: np.ndarray) -> np.ndarray:
+            # (X X^T - I) v, the similarities to the other sentences, through
+            # two sparse products instead of the dense n x n matrix.
+            projected = np.bincount(
+                columns, weights=values * vector[rows], minlength=width
+            )
+            product = np.bincount(
+                rows, weights=values * projected[columns], minlength=num_of_sentence
+            )
+            return product - vector * has_words
+
+        degree = similarity_times(np.ones(num_of_sentence))
+        if self._method == "tfidf":
+            return degree
+
+        # A sentence similar to no other one spreads its rank uniformly.
+        isolated = degree <= 0
+        ranks = np.full(num_of_sentence, 1.0 / num_of_sentence)
+        for _ in range(self._max_iterations):
+            spread = similarity_times(
+                np.where(isolated, 0.0, ranks / np.where(isolated, 1.0, degree))
+            )
+            spread += ranks[isolated].sum() / num_of_sentence
+            new_ranks = (1 - self._damping) / num_of_sentence + self._damping * spread
+            if np.abs(new_ranks - ranks).sum() < self._tolerance:
+                return new_ranks
+            ranks = new_ranks
+        return ranks
+
+    def _truncate(self, sentence: str) -> str:
+        """The longest prefix of whole words of `sentence` within the budget."""
+        words = sentence.split()
+        low, high = 0, len(words)
+        while low < high:
+            middle = (low + high + 1) // 2
+            prefix = " ".join(words[:middle])
+            if self._token_counter.count(prefix) <= self._max_num_of_token:
+                low = middle
+            else:
+                high = middle - 1
+        return " ".join(words[:low])
+
+    def compress(self, document: Document) -> CompressionResult:
+        num_of_token = self._token_counter.count(document.content)
+        if num_of_token <= self._max_num_of_token:
+            return CompressionResult(
+                document=document,
+                num_of_token_before=num_of_token,
+                num_of_token_after=num_of_token,
+            )
+
+        paragraphs = split_into_sentences(document.content)
+        sentences = [sentence for paragraph in paragraphs for sentence in paragraph]
+        ranks = self.rank(sentences)
+
+        # The best ranked sentences fitting the budget; a shorter sentence may
+        # still fit after a longer one did not.
+        kept = set()
+        num_of_token_kept = 0
+        for index in np.argsort(-ranks, kind="stable"):
+            size = self._token_counter.count(sentences[index])
+            if num_of_token_kept + size <= self._max_num_of_token:
+                kept.add(int(index))
+                num_of_token_kept += size
+        if not kept and sentences:
+            # No sentence fits: the best ranked one, cut at a word boundary.
+            content = self._truncate(sentences[int(np.argmax(ranks))])
+            return CompressionResult(
+                document=Document(content=content),
+                num_of_token_before=num_of_token,
+                num_of_token_after=self._token_counter.count(content),
+            )
+
+        compressed_paragraphs = []
+        index = 0
+        for paragraph in paragraphs:
+            compressed_paragraph = [
+                sentence
+                for offset, sentence in enumerate(paragraph)
+                if index + offset in kept
+            ]
+            index += len(paragraph)
+            if compressed_paragraph:
+                compressed_paragraphs.append(" ".join(compressed_paragraph))
+        return CompressionResult(
+            document=Document(content="\n\n".join(compressed_paragraphs)),
+            num_of_token_before=num_of_token,
+            num_of_token_after=num_of_token_kept,
+        )
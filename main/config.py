@@ -0,0 +1,244 @@
+"""config module.
+
+The deployment settings of the summarizer, shared by the web app and the queue
+workers so that a queued job is summarized as an inline request would be.
+Each setting is read from the environment variable of its upper-cased name,
+e.g. ``BERT_SCORE_BACKEND``, and can be overridden on the worker's command
+line, e.g. ``--bert-score-backend``.
+"""
+
+import argparse
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import List, Mapping, Optional, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+from main.backend_pool import LLMClient
+from main.batching import BatchingBertScoreBackend
+from main.bert_backends import BertScoreBackend, get_bert_score_backend
+from main.scoring_service import RemoteBertScoreBackend, preload_bert_score_backend
+from main.summarizer import BestHitLLMSummarizer, MapReduceSummarizer
+from main.usage import TokenBudget
+
+__all__ = [
+    "SummarizerConfig",
+    "SummarizerFactory",
+]
+
+
+class SummarizerConfig(BaseModel):
+    model: str = "deepseek-r1:8b"
+    # BERTScore CPU backend ("float32", "int8", "distilled" or "onnx") and its
+    # intra-op thread count, selectable per deployment.
+    bert_score_backend: str = "float32"
+    bert_score_num_threads: Optional[int] = None
+    # With several workers per node, either score through a shared scoring
+    # service (`python -m main.scoring_service --socket ...`) or load the model
+    # before the workers are forked (`gunicorn --preload`).
+    bert_score_socket: Optional[str] = None
+    bert_score_preload: bool = False
+    # Score the candidates of all in-flight requests together, in batches of up
+    # to `bert_score_batch_size` pairs collected within
+    # `bert_score_batch_wait_ms`. A batch size of 0 disables batching.
+    bert_score_batch_size: int = 32
+    bert_score_batch_wait_ms: float = 10.0
+    # Where BERT / ROUGE scoring runs, off the event loop: "thread" or "process".
+    scoring_executor: str = "thread"
+    scoring_max_workers: Optional[int] = None
+    # Rank candidates by ROUGE and run BERTScore on the best `expensive_top_k`
+    # only. None scores every candidate with both.
+    expensive_top_k: Optional[int] = None
+    # Judge models from small to large, e.g. ["qwen3:1.7b", "deepseek-r1:8b"].
+    # A verdict escalates to the next model unless it is positive with at least
+    # `judge_min_confidence`. None = `model` judges alone.
+    judge_models: Optional[List[str]] = None
+    judge_min_confidence: float = 0.8
+    # Judges answer with the decision only, in at most `judge_max_tokens`
+    # tokens. `judge_reasoning_effort` (e.g. "low") is sent on to backends
+    # which can shorten the reasoning of reasoning models.
+    fast_judge: bool = False
+    judge_max_tokens: int = 1024
+    judge_reasoning_effort: Optional[str] = None
+    # Send reports failing the length requirements back for a revision instead
+    # of discarding them.
+    repair_reports: bool = False
+    # Documents longer than `map_reduce_chunk_tokens` tokens are summarized
+    # chunk by chunk, concurrently, before the final report is generated.
+    # 0 = one prompt.
+    map_reduce_chunk_tokens: int = 0
+    # Put at most `prompt_token_budget` tokens of a document into the prompt,
+    # its most central sentences by `compression_method` ("textrank" or
+    # "tfidf"). Scoring still uses the full text. None = the whole document.
+    prompt_token_budget: Optional[int] = None
+    compression_method: str = "textrank"
+    # Counts the tokens of the length requirement, prompt budget and chunks:
+    # "whitespace" (words), "cl100k_base" / "o200k_base" (tiktoken) or
+    # "hf:<model>" (the model's fast tokenizer, e.g. "hf:Qwen/Qwen3-8B").
+    token_counter: str = "whitespace"
+    # Stop new generations / judge calls of a request once it used this many
+    # tokens; the best valid report found so far is judged and returned, or
+    # `TokenBudgetExceeded` is raised if the budget runs out while judging or
+    # summarizing chunks. None = unlimited.
+    max_tokens_per_request: Optional[int] = None
+
+    @staticmethod
+    def _value_type(annotation) -> type:
+        """The type of a setting's values, through Optional and List."""
+        while get_origin(annotation) in (Union, list):
+            annotation = next(
+                arg for arg in get_args(annotation) if arg is not type(None)
+            )
+        return annotation
+
+    @staticmethod
+    def _is_list(annotation) -> bool:
+        return get_origin(annotation) is list or any(
+            get_origin(arg) is list for arg in get_args(annotation)
+        )
+
+    @classmethod
+    def _parse(cls, name: str, value: str):
+        annotation = cls.model_fields[name].annotation
+        value_type = cls._value_type(annotation)
+        if value_type is bool:
+            return value == "1"
+        if cls._is_list(annotation):
+            # Comma-separated, empty = None.
+            return [item.strip() for item in value.split(",") if item.strip()] or None
+        parsed = value_type(value)
+        # 0 or empty = None for an optional setting.
+        if type(None) in get_args(annotation) and not parsed:
+            return None
+        return parsed
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "SummarizerConfig":
+        """The settings of the environment variables which are set."""
+        environ = os.environ if environ is None else environ
+        return cls(
+            **{
+                name: cls._parse(name, environ[name.upper()])
+                for name in cls.model_fields
+                if name.upper() in environ
+            }
+        )
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        """One command-line option per setting, overriding the environment."""
+        group = parser.add_argument_group("summarizer")
+        for name, field in cls.model_fields.items():
+            flag = "--" + name.replace("_", "-")
+            value_type = cls._value_type(field.annotation)
+            if value_type is bool:
+                group.add_argument(flag, action=argparse.BooleanOptionalAction)
+            elif cls._is_list(field.annotation):
+                group.add_argument(flag, nargs="+", type=value_type)
+            else:
+                group.add_argument(flag, type=value_type)
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "SummarizerConfig":
+        """The settings of the environment, overridden by `args`."""
+        config = cls.from_env()
+        overrides = {
+            name: getattr(args, name)
+            for name in cls.model_fields
+            if getattr(args, name, None) is not None
+        }
+        return config.model_copy(update=overrides)
+
+    def judge_request_options(self) -> Optional[dict]:
+        """API options of the fast judges, None unless `fast_judge` is set."""
+        if not self.fast_judge:
+            return None
+        options = {"max_tokens": self.judge_max_tokens}
+        if self.judge_reasoning_effort:
+            options["reasoning_effort"] = self.judge_reasoning_effort
+        return options
+
+    def token_budget(self) -> TokenBudget:
+        return TokenBudget(max_total_tokens=self.max_tokens_per_request)
+
+
+class SummarizerFactory:
+    """Summarizers set up by a `SummarizerConfig`.
+
+    The BERTScore backend and the scoring executor are created once and shared
+    by the summarizers of all requests, each of which runs in its own event
+    loop.
+    """
+
+    def __init__(self, client: LLMClient, config: SummarizerConfig):
+        self._client = client
+        self._config = config
+        self._bert_score_backend = self._build_bert_score_backend(config)
+        self._scoring_executor = self._build_scoring_executor(config)
+
+    @property
+    def config(self) -> SummarizerConfig:
+        return self._config
+
+    @staticmethod
+    def _build_bert_score_backend(config: SummarizerConfig) -> BertScoreBackend:
+        if config.bert_score_socket:
+            backend = RemoteBertScoreBackend(socket_path=config.bert_score_socket)
+        elif config.bert_score_preload:
+            backend = preload_bert_score_backend(
+                name=config.bert_score_backend,
+                num_threads=config.bert_score_num_threads,
+            )
+        else:
+            backend = get_bert_score_backend(
+                name=config.bert_score_backend,
+                num_threads=config.bert_score_num_threads,
+            )
+        if config.bert_score_batch_size > 0:
+            backend = BatchingBertScoreBackend(
+                backend=backend,
+                max_batch_size=config.bert_score_batch_size,
+                max_wait_seconds=config.bert_score_batch_wait_ms / 1000,
+            )
+        return backend
+
+    @staticmethod
+    def _build_scoring_executor(config: SummarizerConfig) -> Executor:
+        if config.scoring_executor == "process":
+            return ProcessPoolExecutor(max_workers=config.scoring_max_workers)
+        return ThreadPoolExecutor(
+            max_workers=config.scoring_max_workers, thread_name_prefix="scoring"
+        )
+
+    def create(self, **options) -> BestHitLLMSummarizer:
+        """A summarizer for one request; `options` are keyword arguments of
+        `BestHitLLMSummarizer` chosen per request, e.g. the number of
+        paragraphs, and take precedence over the configuration."""
+        config = self._config
+        if config.map_reduce_chunk_tokens > 0:
+            summarizer_class = partial(
+                MapReduceSummarizer,
+                max_num_of_token_in_chunk=config.map_reduce_chunk_tokens,
+            )
+        else:
+            summarizer_class = BestHitLLMSummarizer
+        kwargs = {
+            "bert_score_backend": self._bert_score_backend,
+            "scoring_executor": self._scoring_executor,
+            "expensive_top_k": config.expensive_top_k,
+            "judge_models": config.judge_models,
+            "judge_min_confidence": config.judge_min_confidence,
+            "fast_judge": config.fast_judge,
+            "judge_request_options": config.judge_request_options(),
+            "repair": config.repair_reports,
+            "prompt_token_budget": config.prompt_token_budget,
+            "compression_method": config.compression_method,
+            "token_counter": config.token_counter,
+        }
+        return summarizer_class(
+            client=self._client, model=config.model, **{**kwargs, **options}
+        )
+
+    def shutdown(self) -> None:
+        self._scoring_executor.shutdown(wait=False)
@@ -7,7 +7,34 @@ class LargeLanguageAPIError(Exception):
         super().__init__("Calling large language model api failed.")
 
 
+class AnswerTruncated(Exception):
+
+    def __init__(self):
+        super().__init__("The answer of the large language model was cut off.")
+
+
 class NoReportSatisfyAllMustRequirements(Exception):
 
     def __init__(self):
         super().__init__("No report satisfy all must requirements.")
+
+
+class TokenBudgetExceeded(Exception):
+
+    def __init__(self):
+        super().__init__("Token budget exceeded.")
+
+
+class GenerationAborted(Exception):
+
+    def __init__(self):
+        super().__init__("Generation aborted as it already violates a requirement.")
+
+
+class PartialSummariesTooLong(Exception):
+
+    def __init__(self, num_of_token: int, max_num_of_token: int):
+        super().__init__(
+            f"Partial summaries of {num_of_token} tokens do not fit in a chunk "
+            f"of {max_num_of_token} tokens."
+        )
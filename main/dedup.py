@@ -0,0 +1,70 @@
+"""dedup module.
+
+Local models at default temperature often return the same summary, or nearly
+the same, on several tries. `CandidateDeduplicator` spots them before they are
+validated and scored: first by an exact hash of the normalized text, then by a
+64-bit SimHash over word shingles, whose Hamming distance is small for texts
+sharing most of their shingles.
+"""
+
+import hashlib
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from main.report import Report
+
+__all__ = [
+    "CandidateDeduplicator",
+    "simhash",
+]
+
+_NUM_OF_BITS = 64
+
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(words: List[str], shingle_size: int = 3) -> int:
+    """SimHash fingerprint of the `shingle_size`-word shingles of `words`."""
+    shingles = [
+        " ".join(words[i : i + shingle_size])
+        for i in range(max(len(words) - shingle_size + 1, 1))
+    ]
+    weights = [0] * _NUM_OF_BITS
+    for shingle in shingles:
+        value = _hash(shingle)
+        for bit in range(_NUM_OF_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+class CandidateDeduplicator:
+    """Remember the kept candidates and find the twin of a new one.
+
+    Two candidates are twins if their normalized texts are equal or their
+    SimHash fingerprints differ in at most `max_hamming_distance` bits.
+    """
+
+    def __init__(self, max_hamming_distance: int = 3, shingle_size: int = 3):
+        self._max_hamming_distance = max_hamming_distance
+        self._shingle_size = shingle_size
+        self._exact: Dict[str, Hashable] = {}
+        self._fingerprints: List[Tuple[int, Hashable]] = []
+
+    def add(self, report: Report, key: Hashable) -> Optional[Hashable]:
+        """Return the key of the twin of `report`, or keep it under `key`."""
+        digest = report.features.digest
+        if digest in self._exact:
+            return self._exact[digest]
+
+        fingerprint = simhash(
+            report.features.normalized_words, shingle_size=self._shingle_size
+        )
+        if self._max_hamming_distance > 0:
+            for other, other_key in self._fingerprints:
+                if bin(fingerprint ^ other).count("1") <= self._max_hamming_distance:
+                    return other_key
+
+        self._exact[digest] = key
+        self._fingerprints.append((fingerprint, key))
+        return None
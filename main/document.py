@@ -1,20 +1,90 @@
 """document module."""
 
+import hashlib
+import re
 from pprint import pprint
+from typing import List, Optional
 
 from pydantic import BaseModel
 
+from main.tokenization import TokenCounter, get_token_counter
+
 __all__ = [
+    "ContentAddressedModel",
     "Document",
+    "content_digest",
 ]
 
+_PARAGRAPH_DELIMITER = re.compile(r"\n\s*\n")
+
+
+def content_digest(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
-class Document(BaseModel):
+
+class ContentAddressedModel(BaseModel):
     content: str
 
+    @property
+    def digest(self) -> str:
+        """The SHA-256 of the content, computed on first access; the key of
+        every per-document cache."""
+        cached = self.__dict__.get("_digest")
+        # Recomputed for a model whose content was replaced.
+        if cached is None or cached[0] is not self.content:
+            cached = (self.content, content_digest(self.content))
+            self.__dict__["_digest"] = cached
+        return cached[1]
+
+    @classmethod
+    def of(cls, other: "ContentAddressedModel") -> "ContentAddressedModel":
+        """A model with the content of `other`, sharing its text and digest."""
+        model = cls(content=other.content)
+        if "_digest" in other.__dict__:
+            model.__dict__["_digest"] = other.__dict__["_digest"]
+        return model
+
+
+class Document(ContentAddressedModel):
+
     def pprint(self) -> None:
         pprint(self.content)
 
+    def split(
+        self, max_num_of_token: int, token_counter: Optional[TokenCounter] = None
+    ) -> List["Document"]:
+        """Split into chunks of at most `max_num_of_token` tokens, as counted
+        by `token_counter` (whitespace-separated words by default).
+
+        Chunks are made of whole paragraphs, except a paragraph longer than
+        `max_num_of_token`, which is cut at word boundaries into chunks of its
+        own.
+        """
+        token_counter = token_counter or get_token_counter()
+        chunks: List[List[str]] = []
+        num_of_token_in_last_chunk = 0
+        for paragraph in _PARAGRAPH_DELIMITER.split(self.content):
+            words = paragraph.split()
+            if not words:
+                continue
+            num_of_token = token_counter.count(paragraph.strip())
+            if num_of_token > max_num_of_token:
+                # As many words per chunk as fit on average.
+                num_of_word = max(len(words) * max_num_of_token // num_of_token, 1)
+                for start in range(0, len(words), num_of_word):
+                    chunks.append([" ".join(words[start : start + num_of_word])])
+                num_of_token_in_last_chunk = max_num_of_token
+            elif (
+                chunks
+                and num_of_token_in_last_chunk + num_of_token <= max_num_of_token
+            ):
+                chunks[-1].append(paragraph.strip())
+                num_of_token_in_last_chunk += num_of_token
+            else:
+                chunks.append([paragraph.strip()])
+                num_of_token_in_last_chunk = num_of_token
+        return [Document(content="\n\n".join(chunk)) for chunk in chunks]
+
     @classmethod
     def load_from_local(cls, input_file_path: str) -> "Document":
         with open(input_file_path, "r") as in_file_obj:
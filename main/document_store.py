@@ -0,0 +1,70 @@
+"""document_store module.
+
+A process-wide store interning documents by the SHA-256 of their content.
+Requests summarizing the same text, e.g. a corpus run or retried jobs, share
+one `Document`, and with it one copy of the text and of its digest, which keys
+the per-document caches (judgements, main topics). Documents are held weakly:
+one is dropped once no request uses it any more.
+"""
+
+import threading
+import weakref
+from typing import Optional, Union
+
+from main.document import Document
+
+__all__ = [
+    "DocumentStore",
+    "get_document_store",
+]
+
+
+class DocumentStore:
+
+    def __init__(self):
+        self._documents: "weakref.WeakValueDictionary[str, Document]" = (
+            weakref.WeakValueDictionary()
+        )
+        # Requests of several threads intern documents at once.
+        self._lock = threading.Lock()
+        self._num_of_hits = 0
+        self._num_of_misses = 0
+
+    @property
+    def num_of_hits(self) -> int:
+        return self._num_of_hits
+
+    @property
+    def num_of_misses(self) -> int:
+        return self._num_of_misses
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._documents
+
+    def intern(self, document: Union[str, Document]) -> Document:
+        """The stored document with the same content, stored first if new."""
+        if isinstance(document, str):
+            document = Document(content=document)
+        digest = document.digest
+        with self._lock:
+            stored = self._documents.get(digest)
+            if stored is not None:
+                self._num_of_hits += 1
+                return stored
+            self._num_of_misses += 1
+            self._documents[digest] = document
+            return document
+
+    def get(self, digest: str) -> Optional[Document]:
+        """The stored document with this digest, None if there is none."""
+        return self._documents.get(digest)
+
+
+_store = DocumentStore()
+
+
+def get_document_store() -> DocumentStore:
+    return _store
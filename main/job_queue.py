@@ -0,0 +1,228 @@
+"""job_queue module.
+
+A job queue in a SQLite file, shared by the web app, which enqueues jobs, and
+any number of worker processes (`main.worker`), which run them. Put the file
+on storage every node can reach to spread workers over several machines.
+
+A claimed job stays invisible to other workers for `visibility_timeout`
+seconds. A worker that crashes never completes its job, so the job becomes
+visible again and is claimed by another worker. Failed jobs are retried
+after `retry_delay` seconds, up to `max_attempts` attempts in total, then they
+are dead-lettered: kept with status ``dead`` and their last error.
+
+    python -m main.job_queue submit --queue jobs.sqlite data/article.txt
+    python -m main.job_queue status --queue jobs.sqlite <job id>
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+from main.document import Document
+
+__all__ = [
+    "Job",
+    "SQLiteJobQueue",
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    visible_at REAL NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_visibility ON jobs (status, visible_at);
+"""
+
+
+class Job(BaseModel):
+    id: str
+    payload: dict
+    status: str  # queued, running, done or dead
+    attempts: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
+
+
+class SQLiteJobQueue:
+
+    def __init__(
+        self,
+        path: str,
+        visibility_timeout: float = 300.0,
+        max_attempts: int = 3,
+        retry_delay: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._path = path
+        self._visibility_timeout = visibility_timeout
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+        # Wall clock time, comparable across the machines sharing the queue.
+        self._clock = clock
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per operation, so that a queue can be
+        # used from any thread and process.
+        connection = sqlite3.connect(self._path, timeout=30.0, isolation_level=None)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as connection:
+            # Take the write lock up front, so that two workers never claim
+            # the same job.
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    @staticmethod
+    def _to_job(row: tuple) -> Job:
+        job_id, payload, status, attempts, result, error = row
+        return Job(
+            id=job_id,
+            payload=json.loads(payload),
+            status=status,
+            attempts=attempts,
+            result=json.loads(result) if result is not None else None,
+            error=error,
+        )
+
+    def enqueue(self, payload: dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = self._clock()
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, payload, status, visible_at, created_at, updated_at)"
+                " VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, json.dumps(payload), now, now, now),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT id, payload, status, attempts, result, error FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        return self._to_job(row) if row is not None else None
+
+    def claim(self) -> Optional[Job]:
+        """Claim the oldest visible job, None if there is none."""
+        now = self._clock()
+        with self._transaction() as connection:
+            while True:
+                row = connection.execute(
+                    "SELECT id, payload, status, attempts, result, error FROM jobs"
+                    " WHERE status IN ('queued', 'running') AND visible_at <= ?"
+                    " ORDER BY created_at LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    return None
+                job = self._to_job(row)
+                if job.attempts >= self._max_attempts:
+                    # The last attempt timed out, its worker is gone.
+                    connection.execute(
+                        "UPDATE jobs SET status = 'dead', error = ?, updated_at = ?"
+                        " WHERE id = ?",
+                        ("Visibility timeout expired.", now, job.id),
+                    )
+                    continue
+                connection.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1,"
+                    " visible_at = ?, updated_at = ? WHERE id = ?",
+                    (now + self._visibility_timeout, now, job.id),
+                )
+                return job.model_copy(
+                    update={"status": "running", "attempts": job.attempts + 1}
+                )
+
+    def _update_claimed(self, job: Job, assignments: str, parameters: tuple) -> bool:
+        # Only the worker holding the latest claim may settle the job.
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ?"
+                " WHERE id = ? AND status = 'running' AND attempts = ?",
+                parameters + (self._clock(), job.id, job.attempts),
+            )
+            return cursor.rowcount == 1
+
+    def extend(self, job: Job) -> bool:
+        """Keep a long-running job invisible for another visibility timeout."""
+        return self._update_claimed(
+            job, "visible_at = ?", (self._clock() + self._visibility_timeout,)
+        )
+
+    def complete(self, job: Job, result: dict) -> bool:
+        return self._update_claimed(
+            job, "status = 'done', result = ?, error = NULL", (json.dumps(result),)
+        )
+
+    def fail(self, job: Job, error: str) -> bool:
+        """Schedule a retry, or dead-letter the job after its last attempt."""
+        if job.attempts >= self._max_attempts:
+            return self._update_claimed(job, "status = 'dead', error = ?", (error,))
+        return self._update_claimed(
+            job,
+            "status = 'queued', error = ?, visible_at = ?",
+            (error, self._clock() + self._retry_delay),
+        )
+
+    def dead_letters(self) -> List[Job]:
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT id, payload, status, attempts, result, error FROM jobs"
+                " WHERE status = 'dead' ORDER BY updated_at"
+            ).fetchall()
+        return [self._to_job(row) for row in rows]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Submit summarization jobs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    submit = subparsers.add_parser("submit", help="enqueue one job per text file")
+    submit.add_argument("--queue", required=True)
+    submit.add_argument("files", nargs="+")
+    status = subparsers.add_parser("status", help="print jobs as JSON")
+    status.add_argument("--queue", required=True)
+    status.add_argument("job_ids", nargs="+")
+    args = parser.parse_args(argv)
+
+    queue = SQLiteJobQueue(path=args.queue)
+    if args.command == "submit":
+        for file_path in args.files:
+            document = Document.load_from_local(input_file_path=file_path)
+            print(queue.enqueue({"text": document.content, "options": {}}))
+    else:
+        for job_id in args.job_ids:
+            job = queue.get(job_id)
+            print(job.model_dump_json() if job is not None else json.dumps(None))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
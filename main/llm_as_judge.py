@@ -2,23 +2,38 @@
 
 import os
 from abc import ABC, abstractmethod
+from typing import Hashable, List, Optional, Type
 
 from jinja2 import Environment, FileSystemLoader
-from openai import AsyncOpenAI
-from pydantic import BaseModel, Field
-
-from main.document import Document
+from pydantic import BaseModel, Field, ValidationError
+
+from main.backend_pool import LLMClient
+from main.caching import AsyncMemo
+from main.completion import parse_chat_completion
+from main.customized_exceptions import AnswerTruncated
+from main.document import ContentAddressedModel, Document
+from main.parsing import parse_structured_output
 from main.report import Report
+from main.tracing import get_tracer
 
 __all__ = [
     "Judgement",
+    "ConfidentJudgement",
+    "Decision",
+    "ConfidentDecision",
+    "FAST_JUDGE_REQUEST_OPTIONS",
     "Reference",
     "Statement",
     "ReferenceBasedJudge",
     "ReferenceBasedCorrectnessJudge",
+    "MemoizedReferenceBasedJudge",
+    "CascadingReferenceBasedJudge",
     "Topic",
     "MainTopicExtractor",
     "TopicBasedCompletenessJudge",
+    "CascadingTopicBasedJudge",
+    "build_correctness_judge",
+    "build_completeness_judge",
 ]
 
 ABSOLUTE_PATH = os.path.dirname(__file__)
@@ -32,8 +47,112 @@ class Judgement(BaseModel):
     reason: str = Field(..., description="The reason to justify your decision")
 
 
-class Reference(BaseModel):
-    content: str
+class ConfidentJudgement(Judgement):
+    confidence: float = Field(
+        ..., description="Your confidence in the decision, from 0 to 1"
+    )
+
+
+class Decision(BaseModel):
+    """The decision of a `Judgement` alone, the fast judges' answer."""
+
+    decision: bool = Field(
+        ..., description="A decision if the statement is True or False"
+    )
+
+
+class ConfidentDecision(Decision):
+    confidence: float = Field(
+        ..., description="Your confidence in the decision, from 0 to 1"
+    )
+
+
+# Decoding dominates judge latency: fast judges answer with the decision only.
+# The cap bounds a runaway answer and leaves room for the `<think>` block of a
+# reasoning model, which `SummarizerConfig.judge_reasoning_effort` can shorten
+# on backends supporting `reasoning_effort`. An answer cut off anyway is asked
+# again without the cap.
+FAST_JUDGE_REQUEST_OPTIONS = {"max_tokens": 1024}
+
+
+def _response_format(with_confidence: bool, fast: bool) -> Type[BaseModel]:
+    if fast:
+        return ConfidentDecision if with_confidence else Decision
+    return ConfidentJudgement if with_confidence else Judgement
+
+
+def _to_judgement(answer: BaseModel) -> Judgement:
+    if isinstance(answer, Judgement):
+        return answer
+    fields = answer.model_dump()
+    judgement_cls = ConfidentJudgement if "confidence" in fields else Judgement
+    return judgement_cls(reason="", **fields)
+
+
+def _parse_judgement(message, response_format: Type[BaseModel]) -> Judgement:
+    """The judgement in a completion message, a negative verdict with no
+    confidence if the answer is unparseable, which a cascade escalates to its
+    next judge."""
+    try:
+        answer = parse_structured_output(message, response_format)
+    except ValidationError:
+        if "confidence" in response_format.model_fields:
+            return ConfidentJudgement(
+                decision=False, reason="Unparseable answer.", confidence=0.0
+            )
+        return Judgement(decision=False, reason="Unparseable answer.")
+    return _to_judgement(answer)
+
+
+def _is_truncated(response) -> bool:
+    return getattr(response.choices[0], "finish_reason", None) == "length"
+
+
+async def _judge(
+    client: LLMClient,
+    model: str,
+    prompt: str,
+    response_format: Type[BaseModel],
+    request_options: Optional[dict],
+) -> Judgement:
+    """Ask `model` for a judgement; an answer cut off by `max_tokens` is asked
+    again without it, `AnswerTruncated` is raised if it is cut off anyway."""
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant"},
+        {"role": "user", "content": f"{prompt}"},
+    ]
+    response = await parse_chat_completion(
+        client=client,
+        model=model,
+        messages=messages,
+        response_format=response_format,
+        request_options=request_options,
+    )
+    if _is_truncated(response) and "max_tokens" in (request_options or {}):
+        response = await parse_chat_completion(
+            client=client,
+            model=model,
+            messages=messages,
+            response_format=response_format,
+            request_options={
+                name: value
+                for name, value in request_options.items()
+                if name != "max_tokens"
+            },
+        )
+    if _is_truncated(response):
+        raise AnswerTruncated()
+    return _parse_judgement(response.choices[0].message, response_format)
+
+
+def _is_settled(judgement: Judgement, min_confidence: float) -> bool:
+    """A positive decision made with enough confidence needs no escalation."""
+    confidence = getattr(judgement, "confidence", 1.0)
+    return judgement.decision and confidence >= min_confidence
+
+
+class Reference(ContentAddressedModel):
+    pass
 
 
 class Statement(BaseModel):
@@ -46,39 +165,126 @@ class ReferenceBasedJudge(ABC):
     async def run(self, statement: Statement, reference: Reference) -> Judgement:
         """Judge if a statement is True or False based on a given reference."""
 
+    @property
+    def memo_key(self) -> Hashable:
+        """What tells the judgements of this judge from those of another, e.g.
+        its model, in a shared memo."""
+        return type(self).__name__
+
 
 class ReferenceBasedCorrectnessJudge(ReferenceBasedJudge):
-    """Judge if a statement is True or False by a given reference."""
+    """Judge if a statement is True or False by a given reference.
+
+    The reference is the full document even when the summarization prompt got a
+    compressed one: a statement whose support was cut would be judged False.
+    """
 
     _env = Environment(loader=FileSystemLoader(f"{ROOT_SOURCE_PATH}/prompts/templates"))
     _prompt_template_file = "judge_statement_correctness_template.j2"
 
-    def __init__(self, client: AsyncOpenAI, model: str):
+    def __init__(
+        self,
+        client: LLMClient,
+        model: str,
+        with_confidence: bool = False,
+        fast: bool = False,
+        request_options: Optional[dict] = None,
+    ):
         self._llm_api_client = client
         self._model = model
+        # Fast judges skip the reason, keep them off to debug verdicts.
+        self._fast = fast
+        self._response_format = _response_format(with_confidence, fast)
+        if request_options is None and fast:
+            request_options = FAST_JUDGE_REQUEST_OPTIONS
+        self._request_options = request_options
         self._prompt_template = ReferenceBasedCorrectnessJudge._env.get_template(
             ReferenceBasedCorrectnessJudge._prompt_template_file
         )
 
+    @property
+    def memo_key(self) -> Hashable:
+        return (type(self).__name__, self._model, self._response_format.__name__)
+
     async def run(self, statement: Statement, reference: Reference) -> Judgement:
-        prompt = self._prompt_template.render(
-            {
-                "statement": statement.content,
-                "document": reference.content,
-            }
+        with get_tracer().span(
+            "prompt.render", template=self._prompt_template_file
+        ):
+            prompt = self._prompt_template.render(
+                {
+                    "statement": statement.content,
+                    "document": reference.content,
+                    "with_confidence": "confidence" in self._response_format.model_fields,
+                    "fast": self._fast,
+                }
+            )
+
+        return await _judge(
+            client=self._llm_api_client,
+            model=self._model,
+            prompt=prompt,
+            response_format=self._response_format,
+            request_options=self._request_options,
         )
 
-        response = await self._llm_api_client.beta.chat.completions.parse(
-            model=self._model,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant"},
-                {"role": "user", "content": f"{prompt}"},
-            ],
-            response_format=Judgement,
+
+class MemoizedReferenceBasedJudge(ReferenceBasedJudge):
+    """Judge each distinct statement once per reference.
+
+    Judgements are memoized by the judge's `memo_key`, the whitespace-normalized
+    statement and a hash of the reference, so candidates sharing a paragraph
+    have it judged once, and identical judgements in flight at the same time
+    are sent once. Judges of other models may share the memo.
+    """
+
+    def __init__(self, judge: ReferenceBasedJudge, memo: Optional[AsyncMemo] = None):
+        self._judge = judge
+        self._memo = memo if memo is not None else AsyncMemo()
+
+    @property
+    def memo(self) -> AsyncMemo:
+        return self._memo
+
+    @property
+    def memo_key(self) -> Hashable:
+        return self._judge.memo_key
+
+    async def run(self, statement: Statement, reference: Reference) -> Judgement:
+        key = (
+            self._judge.memo_key,
+            " ".join(statement.content.split()),
+            reference.digest,
+        )
+        return await self._memo.get_or_compute(
+            key, lambda: self._judge.run(statement=statement, reference=reference)
         )
 
-        judgement = Judgement.model_validate_json(response.choices[0].message.content)
-        return judgement
+
+class CascadingReferenceBasedJudge(ReferenceBasedJudge):
+    """Escalate from small to large judges.
+
+    Each judge is asked in turn until one returns a positive decision with at
+    least `min_confidence`; the verdict of the last judge is final.
+    """
+
+    def __init__(self, judges: List[ReferenceBasedJudge], min_confidence: float = 0.8):
+        self._judges = judges
+        self._min_confidence = min_confidence
+
+    @property
+    def memo_key(self) -> Hashable:
+        return (
+            type(self).__name__,
+            tuple(judge.memo_key for judge in self._judges),
+            self._min_confidence,
+        )
+
+    async def run(self, statement: Statement, reference: Reference) -> Judgement:
+        for judge in self._judges[:-1]:
+            judgement = await judge.run(statement=statement, reference=reference)
+            if _is_settled(judgement, self._min_confidence):
+                return judgement
+        return await self._judges[-1].run(statement=statement, reference=reference)
 
 
 class Topic(BaseModel):
@@ -89,7 +295,7 @@ class MainTopicExtractor:
     _env = Environment(loader=FileSystemLoader(f"{ROOT_SOURCE_PATH}/prompts/templates"))
     _prompt_template_file = "extract_main_topic_template.j2"
 
-    def __init__(self, client: AsyncOpenAI, model: str):
+    def __init__(self, client: LLMClient, model: str):
         self._llm_api_client = client
         self._model = model
         self._prompt_template = MainTopicExtractor._env.get_template(
@@ -97,13 +303,17 @@ class MainTopicExtractor:
         )
 
     async def run(self, document: Document) -> Topic:
-        prompt = self._prompt_template.render(
-            {
-                "document": document.content,
-            }
-        )
-
-        response = await self._llm_api_client.beta.chat.completions.parse(
+        with get_tracer().span(
+            "prompt.render", template=self._prompt_template_file
+        ):
+            prompt = self._prompt_template.render(
+                {
+                    "document": document.content,
+                }
+            )
+
+        response = await parse_chat_completion(
+            client=self._llm_api_client,
             model=self._model,
             messages=[
                 {"role": "system", "content": "You are a helpful assistant"},
@@ -112,7 +322,7 @@ class MainTopicExtractor:
             response_format=Topic,
         )
 
-        main_topic = Topic.model_validate_json(response.choices[0].message.content)
+        main_topic = parse_structured_output(response.choices[0].message, Topic)
         return main_topic
 
 
@@ -127,29 +337,104 @@ class TopicBasedCompletenessJudge(TopicBasedJudge):
     _env = Environment(loader=FileSystemLoader(f"{ROOT_SOURCE_PATH}/prompts/templates"))
     _prompt_template_file = "judge_report_completeness_template.j2"
 
-    def __init__(self, client: AsyncOpenAI, model: str):
+    def __init__(
+        self,
+        client: LLMClient,
+        model: str,
+        with_confidence: bool = False,
+        fast: bool = False,
+        request_options: Optional[dict] = None,
+    ):
         self._llm_api_client = client
         self._model = model
+        # Fast judges skip the reason, keep them off to debug verdicts.
+        self._fast = fast
+        self._response_format = _response_format(with_confidence, fast)
+        if request_options is None and fast:
+            request_options = FAST_JUDGE_REQUEST_OPTIONS
+        self._request_options = request_options
         self._prompt_template = TopicBasedCompletenessJudge._env.get_template(
             TopicBasedCompletenessJudge._prompt_template_file
         )
 
     async def run(self, topic: Topic, report: Report) -> Judgement:
-        prompt = self._prompt_template.render(
-            {
-                "report": report.content,
-                "topic": topic.content,
-            }
-        )
-
-        response = await self._llm_api_client.beta.chat.completions.parse(
+        with get_tracer().span(
+            "prompt.render", template=self._prompt_template_file
+        ):
+            prompt = self._prompt_template.render(
+                {
+                    "report": report.content,
+                    "topic": topic.content,
+                    "with_confidence": "confidence" in self._response_format.model_fields,
+                    "fast": self._fast,
+                }
+            )
+
+        return await _judge(
+            client=self._llm_api_client,
             model=self._model,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant"},
-                {"role": "user", "content": f"{prompt}"},
-            ],
-            response_format=Judgement,
+            prompt=prompt,
+            response_format=self._response_format,
+            request_options=self._request_options,
         )
 
-        judgement = Judgement.model_validate_json(response.choices[0].message.content)
-        return judgement
+
+class CascadingTopicBasedJudge(TopicBasedJudge):
+    """Escalate from small to large judges, see `CascadingReferenceBasedJudge`."""
+
+    def __init__(self, judges: List[TopicBasedJudge], min_confidence: float = 0.8):
+        self._judges = judges
+        self._min_confidence = min_confidence
+
+    async def run(self, topic: Topic, report: Report) -> Judgement:
+        for judge in self._judges[:-1]:
+            judgement = await judge.run(topic=topic, report=report)
+            if _is_settled(judgement, self._min_confidence):
+                return judgement
+        return await self._judges[-1].run(topic=topic, report=report)
+
+
+def build_correctness_judge(
+    client: LLMClient,
+    models: List[str],
+    min_confidence: float = 0.8,
+    fast: bool = False,
+    request_options: Optional[dict] = None,
+) -> ReferenceBasedJudge:
+    """A correctness judge escalating through `models`, from small to large."""
+    judges = [
+        ReferenceBasedCorrectnessJudge(
+            client=client,
+            model=model,
+            with_confidence=idx < len(models) - 1,
+            fast=fast,
+            request_options=request_options,
+        )
+        for idx, model in enumerate(models)
+    ]
+    if len(judges) == 1:
+        return judges[0]
+    return CascadingReferenceBasedJudge(judges=judges, min_confidence=min_confidence)
+
+
+def build_completeness_judge(
+    client: LLMClient,
+    models: List[str],
+    min_confidence: float = 0.8,
+    fast: bool = False,
+    request_options: Optional[dict] = None,
+) -> TopicBasedJudge:
+    """A completeness judge escalating through `models`, from small to large."""
+    judges = [
+        TopicBasedCompletenessJudge(
+            client=client,
+            model=model,
+            with_confidence=idx < len(models) - 1,
+            fast=fast,
+            request_options=request_options,
+        )
+        for idx, model in enumerate(models)
+    ]
+    if len(judges) == 1:
+        return judges[0]
+    return CascadingTopicBasedJudge(judges=judges, min_confidence=min_confidence)
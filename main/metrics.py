@@ -1,27 +1,40 @@
-"""metrics module"""
+"""metrics module
+
+`bert_score` (torch, transformers) and `rouge_score` are imported on first use
+of the extractors which need them, so that importing this module, and the
+requirements and summarizer built on it, stays cheap.
+"""
 
 import asyncio
 from abc import ABC, abstractmethod
+from concurrent.futures import Executor
 from functools import partial
+from typing import List, Optional, Union
 
-from bert_score import BERTScorer
-from openai import AsyncOpenAI
-from rouge_score.rouge_scorer import RougeScorer
-from transformers import BertForMaskedLM, BertModel, BertTokenizer
+import numpy as np
 
+from main.backend_pool import LLMClient
+from main.bert_backends import BertScoreBackend, get_bert_score_backend
+from main.caching import AsyncMemo
 from main.document import Document
 from main.llm_as_judge import (
     MainTopicExtractor,
+    MemoizedReferenceBasedJudge,
     Reference,
     ReferenceBasedCorrectnessJudge,
+    ReferenceBasedJudge,
     Statement,
+    Topic,
     TopicBasedCompletenessJudge,
+    TopicBasedJudge,
 )
 from main.report import Report
+from main.tokenization import TokenCounter, get_token_counter
 
 __all__ = [
     "Metric",
     "MetricExtractor",
+    "CountMetricExtractor",
     "HasTitleMetricExtractor",
     "TitleLengthMetricExtractor",
     "NumberOfParagraphMetricExtractor",
@@ -66,23 +79,100 @@ class MetricExtractor(ABC):
     def extract(self, report: Report) -> Metric:
         pass
 
+    async def extract_async(
+        self, report: Report, executor: Optional[Executor] = None
+    ) -> Metric:
+        """Run `extract` in `executor` so that CPU-bound scoring does not block
+        the event loop; `None` means the loop's default thread pool.
+
+        A process pool executor requires the extractor to be picklable.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.extract, report)
+
+    def extract_batch(self, reports: List[Report]) -> List[Metric]:
+        return [self.extract(report) for report in reports]
+
+
+class CountMetricExtractor(MetricExtractor):
+    """A metric counting something in the report, e.g. its paragraphs, which
+    can be extracted for many reports at once as an array."""
 
-class HasTitleMetricExtractor(MetricExtractor):
+    _name: str
+
+    @abstractmethod
+    def _count(self, report: Report) -> int:
+        pass
 
     def extract(self, report: Report) -> Metric:
-        has_title = bool(report.title)
-        value = str(int(has_title))
-        return Metric(name="Has-Title-Metric", value=value)
+        value = str(self._count(report))
+        return Metric(name=self._name, value=value)
+
+    def extract_values(self, reports: List[Report]) -> np.ndarray:
+        return np.fromiter(
+            (self._count(report) for report in reports),
+            dtype=np.int64,
+            count=len(reports),
+        )
+
+    def extract_batch(self, reports: List[Report]) -> List[Metric]:
+        return [
+            Metric(name=self._name, value=str(value))
+            for value in self.extract_values(reports).tolist()
+        ]
+
+
+async def _gather_bounded(coroutines: list, max_concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def bounded(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*[bounded(coroutine) for coroutine in coroutines])
+
+
+class HasTitleMetricExtractor(CountMetricExtractor):
+    _name = "Has-Title-Metric"
+
+    def _count(self, report: Report) -> int:
+        return int(report.features.has_title)
 
 
 class BertScoreMetricExtractor(MetricExtractor):
-    def __init__(self, reference: Reference):
+    """BERTScore F1 of the report against the reference.
+
+    `backend` is either a `BertScoreBackend` or the name of one registered in
+    `main.bert_backends.BERT_SCORE_BACKENDS` ("float32", "int8", "distilled",
+    "onnx"); `num_threads` caps the intra-op threads of a named backend.
+    """
+
+    def __init__(
+        self,
+        reference: Reference,
+        backend: Union[str, BertScoreBackend] = "float32",
+        num_threads: Optional[int] = None,
+    ):
         self._reference = reference
+        if isinstance(backend, BertScoreBackend):
+            self._backend = backend
+        else:
+            self._backend = get_bert_score_backend(name=backend, num_threads=num_threads)
 
     def extract(self, report: Report) -> Metric:
-        scorer = BERTScorer(model_type="bert-base-uncased")
-        _, _, f1 = scorer.score(cands=[report.content], refs=[self._reference.content])
-        value = str(f1.mean().item())
+        (f1,) = self._backend.score(
+            cands=[report.content], refs=[self._reference.content]
+        )
+        value = str(f1)
+        return Metric(name="Bert-Score-Metric", value=value)
+
+    async def extract_async(
+        self, report: Report, executor: Optional[Executor] = None
+    ) -> Metric:
+        (f1,) = await self._backend.score_async(
+            cands=[report.content], refs=[self._reference.content], executor=executor
+        )
+        value = str(f1)
         return Metric(name="Bert-Score-Metric", value=value)
 
 
@@ -91,6 +181,8 @@ class RougeScoreMetricExtractor(MetricExtractor):
         self._reference = reference
 
     def extract(self, report: Report) -> Metric:
+        from rouge_score.rouge_scorer import RougeScorer
+
         scorer = RougeScorer(
             rouge_types=["rouge1", "rouge2", "rougeL"], use_stemmer=True
         )
@@ -99,45 +191,54 @@ class RougeScoreMetricExtractor(MetricExtractor):
         return Metric(name="Rouge-Score-Metric", value=value)
 
 
-class TitleLengthMetricExtractor(MetricExtractor):
+class TitleLengthMetricExtractor(CountMetricExtractor):
+    _name = "Number-Of-Chars-In-Title-Metric"
 
-    def extract(self, report: Report) -> Metric:
-        num_of_char = len(report.title.strip())
-        value = str(num_of_char)
-        return Metric(name="Number-Of-Chars-In-Title-Metric", value=value)
+    def _count(self, report: Report) -> int:
+        return report.features.title_length
 
 
-class NumberOfParagraphMetricExtractor(MetricExtractor):
+class NumberOfParagraphMetricExtractor(CountMetricExtractor):
+    _name = "Number-Of-Paragraphs-Metric"
 
-    def extract(self, report: Report) -> Metric:
-        paragraphs = report.content.strip().split("\n\n")
-        value = str(len(paragraphs))
-        return Metric(name="Number-Of-Paragraphs-Metric", value=value)
+    def _count(self, report: Report) -> int:
+        return len(report.features.paragraphs)
 
 
-class NumberOfTokenMetricExtractor(MetricExtractor):
+class NumberOfTokenMetricExtractor(CountMetricExtractor):
+    _name = "Number-Of-Tokens-Metric"
 
-    def extract(self, report: Report) -> Metric:
-        tokens = report.content.strip().split()
-        value = str(len(tokens))
-        return Metric(name="Number-Of-Tokens-Metric", value=value)
+    def __init__(self, token_counter: Optional[TokenCounter] = None):
+        # Whitespace-separated words unless a tokenizer is given.
+        self._token_counter = token_counter or get_token_counter()
+
+    def _count(self, report: Report) -> int:
+        return report.features.num_of_token(self._token_counter)
 
 
 class CorrectnessMetricExtractor(MetricExtractor):
-    def __init__(self, client: AsyncOpenAI, model: str, reference: Reference):
-        self._judge = partial(
-            ReferenceBasedCorrectnessJudge(client=client, model=model).run,
-            reference=reference,
-        )
+    def __init__(
+        self,
+        client: LLMClient,
+        model: str,
+        reference: Reference,
+        memo: Optional[AsyncMemo] = None,
+        judge: Optional[ReferenceBasedJudge] = None,
+    ):
+        # Paragraph judgements are memoized in `memo` if given, share one memo
+        # between extractors of the same document to judge shared paragraphs
+        # once.
+        if judge is None:
+            judge = ReferenceBasedCorrectnessJudge(client=client, model=model)
+        if memo is not None:
+            judge = MemoizedReferenceBasedJudge(judge=judge, memo=memo)
+        self._judge = partial(judge.run, reference=reference)
 
     async def extract(self, report: Report) -> Metric:
         statements = [
-            Statement(content=statement.strip())
-            for statement in report.content.split(
-                "\n\n"
-            )  # NOTE: each paragraph is treated as a statement
-            if statement.strip()
-        ]
+            Statement(content=statement)
+            for statement in report.features.statements
+        ]  # NOTE: each paragraph is treated as a statement
         judgements = await asyncio.gather(
             *[self._judge(statement=statement) for statement in statements]
         )
@@ -147,18 +248,73 @@ class CorrectnessMetricExtractor(MetricExtractor):
         value = str(int(is_all_statement_true))
         return Metric(name="Correctness-Metric", value=value)
 
+    async def extract_async(
+        self, report: Report, executor: Optional[Executor] = None
+    ) -> Metric:
+        return await self.extract(report)
+
+    async def extract_batch(
+        self, reports: List[Report], max_concurrency: int = 8
+    ) -> List[Metric]:
+        """Judge at most `max_concurrency` reports at a time."""
+        return await _gather_bounded(
+            [self.extract(report) for report in reports], max_concurrency
+        )
+
 
 class CompletenessMetricExtractor(MetricExtractor):
 
-    def __init__(self, client: AsyncOpenAI, model: str, reference: Reference):
-        self._reference = reference
+    def __init__(
+        self,
+        client: LLMClient,
+        model: str,
+        reference: Reference,
+        judge: Optional[TopicBasedJudge] = None,
+        memo: Optional[AsyncMemo] = None,
+        topic_document: Optional[Document] = None,
+    ):
+        self._model = model
+        # The main topic needs only the gist of the reference, e.g. the
+        # compressed document of the summarization prompt.
+        self._document = topic_document or Document.of(reference)
         self._main_idea_extractor = MainTopicExtractor(client=client, model=model)
-        self._judge = TopicBasedCompletenessJudge(client=client, model=model)
-
-    async def extract(self, report: Report) -> Metric:
-        main_topic = await self._main_idea_extractor.run(
-            document=Document(content=self._reference.content)
+        self._judge = judge or TopicBasedCompletenessJudge(client=client, model=model)
+        # The main topic is memoized in `memo` if given, by model and document
+        # digest, so that it is extracted once per document.
+        self._memo = memo
+
+    async def _main_topic(self) -> Topic:
+        if self._memo is None:
+            return await self._main_idea_extractor.run(document=self._document)
+        return await self._memo.get_or_compute(
+            ("main-topic", self._model, self._document.digest),
+            lambda: self._main_idea_extractor.run(document=self._document),
         )
+
+    async def _judge_report(self, main_topic: Topic, report: Report) -> Metric:
         judgement = await self._judge.run(topic=main_topic, report=report)
         value = str(int(judgement.decision))
         return Metric(name="Completeness-Metric", value=value)
+
+    async def extract(self, report: Report) -> Metric:
+        main_topic = await self._main_topic()
+        return await self._judge_report(main_topic=main_topic, report=report)
+
+    async def extract_async(
+        self, report: Report, executor: Optional[Executor] = None
+    ) -> Metric:
+        return await self.extract(report)
+
+    async def extract_batch(
+        self, reports: List[Report], max_concurrency: int = 8
+    ) -> List[Metric]:
+        """Extract the main topic once, then judge at most `max_concurrency`
+        reports at a time."""
+        main_topic = await self._main_topic()
+        return await _gather_bounded(
+            [
+                self._judge_report(main_topic=main_topic, report=report)
+                for report in reports
+            ],
+            max_concurrency,
+        )
@@ -0,0 +1,218 @@
+"""parsing module."""
+
+import re
+from typing import Dict, List, Optional, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from main.report import Report
+
+__all__ = [
+    "PartialReportParser",
+    "repair_json",
+    "parse_structured_output",
+]
+
+T = TypeVar("T", bound=BaseModel)
+
+# A reasoning block cut off by the output limit runs to the end of the text.
+_THINK = re.compile(r"<think>.*?(?:</think>|$)", re.DOTALL)
+_FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+
+_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class PartialReportParser:
+    """Incrementally parse the JSON of a `Report` while it is being generated.
+
+    Feed the completion chunk by chunk; `report` returns the title and content
+    decoded so far, missing fields are empty. Only the string values of the
+    top-level object are collected, everything else is skipped. Each chunk is
+    processed once, so the cost is linear in the length of the completion.
+    """
+
+    def __init__(self):
+        self._fields: Dict[str, List[str]] = {}
+        self._state = "object"
+        self._key: List[str] = []
+        self._field: Optional[List[str]] = None
+        self._unicode: List[str] = []
+        self._in_key = False
+        self._depth = 0
+        self._num_of_char = 0
+
+    @property
+    def num_of_char(self) -> int:
+        """Number of characters fed so far."""
+        return self._num_of_char
+
+    @property
+    def report(self) -> Report:
+        return Report(
+            title="".join(self._fields.get("title", [])),
+            content="".join(self._fields.get("content", [])),
+        )
+
+    def _emit(self, char: str) -> None:
+        if self._in_key:
+            self._key.append(char)
+        elif self._field is not None:
+            self._field.append(char)
+
+    def _end_string(self) -> None:
+        if self._in_key:
+            self._state = "colon"
+        else:
+            self._field = None
+            self._state = "object"
+
+    def feed(self, chunk: str) -> None:
+        self._num_of_char += len(chunk)
+        for char in chunk:
+            state = self._state
+            if state == "string":
+                if char == "\\":
+                    self._state = "escape"
+                elif char == '"':
+                    self._end_string()
+                else:
+                    self._emit(char)
+            elif state == "escape":
+                if char == "u":
+                    self._unicode = []
+                    self._state = "unicode"
+                else:
+                    self._emit(_ESCAPES.get(char, char))
+                    self._state = "string"
+            elif state == "unicode":
+                self._unicode.append(char)
+                if len(self._unicode) == 4:
+                    try:
+                        self._emit(chr(int("".join(self._unicode), 16)))
+                    except ValueError:
+                        pass
+                    self._state = "string"
+            elif state == "object":
+                # Between members of the top-level object: wait for a key.
+                if char == "{":
+                    self._depth += 1
+                elif char == "}":
+                    self._depth -= 1
+                elif char == '"' and self._depth == 1:
+                    self._key = []
+                    self._in_key = True
+                    self._state = "string"
+            elif state == "colon":
+                if char == ":":
+                    self._in_key = False
+                    self._state = "value"
+            elif state == "value":
+                if char == '"':
+                    self._field = self._fields.setdefault("".join(self._key), [])
+                    self._field.clear()
+                    self._state = "string"
+                elif not char.isspace():
+                    # Non-string values are not needed, skip them.
+                    self._state = "skip"
+                    self._depth += char in "{["
+            elif state == "skip":
+                if char in "{[":
+                    self._depth += 1
+                elif char in "}]":
+                    self._depth -= 1
+                    if self._depth <= 1:
+                        self._state = "object"
+                elif char == "," and self._depth == 1:
+                    self._state = "object"
+                elif char == '"':
+                    self._state = "skip_string"
+            elif state == "skip_string":
+                if char == "\\":
+                    self._state = "skip_escape"
+                elif char == '"':
+                    self._state = "skip"
+            elif state == "skip_escape":
+                self._state = "skip_string"
+
+
+def repair_json(text: str) -> str:
+    """Fix the usual defects of JSON written by a model.
+
+    Drops `<think>` blocks, terminated or not, code fences and anything around the first JSON
+    object, removes trailing commas, and closes the strings, arrays and
+    objects left open by a truncated output.
+    """
+    text = _FENCE.sub("", _THINK.sub("", text))
+    start = text.find("{")
+    if start < 0:
+        return text
+    chars: List[str] = []
+    closers: List[str] = []
+    in_string = False
+    is_escaped = False
+    for char in text[start:]:
+        if in_string:
+            chars.append(char)
+            if is_escaped:
+                is_escaped = False
+            elif char == "\\":
+                is_escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]":
+            _strip_trailing_comma(chars)
+            if closers:
+                closers.pop()
+            chars.append(char)
+            if not closers:
+                break  # end of the object, ignore what follows
+            continue
+        chars.append(char)
+
+    if in_string:
+        if is_escaped:
+            chars.pop()
+        chars.append('"')
+    _strip_trailing_comma(chars)
+    if chars and chars[-1] == ":":
+        chars.append("null")
+    chars.extend(reversed(closers))
+    return "".join(chars)
+
+
+def _strip_trailing_comma(chars: List[str]) -> None:
+    idx = len(chars) - 1
+    while idx >= 0 and chars[idx].isspace():
+        idx -= 1
+    if idx >= 0 and chars[idx] == ",":
+        del chars[idx:]
+
+
+def parse_structured_output(message, response_format: Type[T]) -> T:
+    """The `response_format` object of a completion message.
+
+    Uses the object parsed by the API client when there is one, otherwise
+    parses the content, repairing it with `repair_json` if need be.
+    """
+    parsed = getattr(message, "parsed", None)
+    if isinstance(parsed, response_format):
+        return parsed
+    content = message.content or ""
+    try:
+        return response_format.model_validate_json(content)
+    except ValidationError:
+        return response_format.model_validate_json(repair_json(content))
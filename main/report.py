@@ -1,15 +1,91 @@
 """report module."""
 
+import hashlib
+from functools import cached_property
+from typing import Dict, List
+
 from pydantic import BaseModel, Field
 
+from main.tokenization import TokenCounter, WhitespaceTokenCounter
+
 __all__ = [
     "Report",
+    "ReportFeatures",
 ]
 
 
+class ReportFeatures:
+    """What the structural extractors, requirements and the deduplicator read
+    from a report, each computed on first access."""
+
+    def __init__(self, title: str, content: str):
+        self.title = title
+        self.content = content
+        self._num_of_token: Dict[TokenCounter, int] = {}
+
+    @cached_property
+    def has_title(self) -> bool:
+        return bool(self.title)
+
+    @cached_property
+    def title_length(self) -> int:
+        return len(self.title.strip())
+
+    @cached_property
+    def _stripped_content(self) -> str:
+        return self.content.strip()
+
+    @cached_property
+    def paragraphs(self) -> List[str]:
+        return self._stripped_content.split("\n\n")
+
+    @cached_property
+    def statements(self) -> List[str]:
+        """Non-empty paragraphs, each one a statement to judge."""
+        return [paragraph.strip() for paragraph in self.paragraphs if paragraph.strip()]
+
+    @cached_property
+    def tokens(self) -> List[str]:
+        return self._stripped_content.split()
+
+    @cached_property
+    def normalized_words(self) -> List[str]:
+        return f"{self.title}\n{self.content}".lower().split()
+
+    @cached_property
+    def digest(self) -> str:
+        return hashlib.sha256(
+            " ".join(self.normalized_words).encode("utf-8")
+        ).hexdigest()
+
+    def num_of_token(self, token_counter: TokenCounter) -> int:
+        """The number of tokens of the stripped content by `token_counter`."""
+        if isinstance(token_counter, WhitespaceTokenCounter):
+            return len(self.tokens)
+        if token_counter not in self._num_of_token:
+            self._num_of_token[token_counter] = token_counter.count(
+                self._stripped_content
+            )
+        return self._num_of_token[token_counter]
+
+
 class Report(BaseModel):
     """summarization report"""
 
     title: str = Field(..., description="The title of the summarization report")
 
     content: str = Field(..., description="The content of the summarization report")
+
+    @property
+    def features(self) -> ReportFeatures:
+        """The features of the report, computed on first access."""
+        features = self.__dict__.get("_features")
+        # Recomputed for a report whose title or content was replaced.
+        if (
+            features is None
+            or features.title is not self.title
+            or features.content is not self.content
+        ):
+            features = ReportFeatures(title=self.title, content=self.content)
+            self.__dict__["_features"] = features
+        return features
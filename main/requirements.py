@@ -1,11 +1,12 @@
 """requirements module"""
 
 from abc import ABC, abstractmethod
+from typing import List, Optional
 
-from openai import AsyncOpenAI
-
+from main.backend_pool import LLMClient
+from main.caching import AsyncMemo
 from main.document import Document
-from main.llm_as_judge import Reference
+from main.llm_as_judge import Reference, ReferenceBasedJudge, TopicBasedJudge
 from main.metrics import (
     CompletenessMetricExtractor,
     CorrectnessMetricExtractor,
@@ -16,6 +17,7 @@ from main.metrics import (
     TitleLengthMetricExtractor,
 )
 from main.report import Report
+from main.tokenization import TokenCounter
 
 __all__ = [
     "Requirement",
@@ -50,6 +52,23 @@ class Requirement(ABC):
     def get_metric(self, report: Report) -> Metric:
         pass
 
+    def is_satisfied_batch(self, reports: List[Report]) -> List[bool]:
+        """`is_satisfied` of each report; structural requirements evaluate
+        them all at once."""
+        return [self.is_satisfied(report) for report in reports]
+
+    def get_metric_batch(self, reports: List[Report]) -> List[Metric]:
+        return [self.get_metric(report) for report in reports]
+
+    def is_violated_by_prefix(self, report: Report) -> bool:
+        """If a report still being generated already violates the requirement,
+        whatever is generated next; `report` holds the text decoded so far.
+
+        Only requirements on quantities which never decrease as text is
+        appended can tell, the others return False.
+        """
+        return False
+
 
 class HasTitleRequirement(Requirement):
 
@@ -75,6 +94,10 @@ class HasTitleRequirement(Requirement):
         value = bool(int(metric.value))
         return value
 
+    def is_satisfied_batch(self, reports: List[Report]) -> List[bool]:
+        values = self._metric_extractor.extract_values(reports)
+        return (values > 0).tolist()
+
     def must_be_satisfied(self) -> bool:
         return self._must_be_satisfied
 
@@ -82,6 +105,9 @@ class HasTitleRequirement(Requirement):
         metric = self._metric_extractor.extract(report)
         return metric
 
+    def get_metric_batch(self, reports: List[Report]) -> List[Metric]:
+        return self._metric_extractor.extract_batch(reports)
+
 
 class TitleLengthRequirement(Requirement):
 
@@ -118,6 +144,16 @@ class TitleLengthRequirement(Requirement):
         )
         return is_title_length_proper
 
+    def is_satisfied_batch(self, reports: List[Report]) -> List[bool]:
+        values = self._metric_extractor.extract_values(reports)
+        return (
+            (self._min_num_of_char <= values) & (values <= self._max_num_of_char)
+        ).tolist()
+
+    def is_violated_by_prefix(self, report: Report) -> bool:
+        metric = self._metric_extractor.extract(report)
+        return int(metric.value) > self._max_num_of_char
+
     def must_be_satisfied(self) -> bool:
         return self._must_be_satisfied
 
@@ -125,6 +161,9 @@ class TitleLengthRequirement(Requirement):
         metric = self._metric_extractor.extract(report)
         return metric
 
+    def get_metric_batch(self, reports: List[Report]) -> List[Metric]:
+        return self._metric_extractor.extract_batch(reports)
+
 
 class DoubleNewlineDelimiterRequirement(Requirement):
 
@@ -148,6 +187,9 @@ class DoubleNewlineDelimiterRequirement(Requirement):
     def is_satisfied(self, report: Report) -> bool:
         return True
 
+    def is_satisfied_batch(self, reports: List[Report]) -> List[bool]:
+        return [True] * len(reports)
+
     def must_be_satisfied(self) -> bool:
         return False
 
@@ -191,6 +233,17 @@ class NumberOfParagraphRequirement(Requirement):
         )
         return has_proper_num_of_paragraph
 
+    def is_satisfied_batch(self, reports: List[Report]) -> List[bool]:
+        values = self._metric_extractor.extract_values(reports)
+        return (
+            (self._min_num_of_paragraph <= values)
+            & (values <= self._max_num_of_paragraph)
+        ).tolist()
+
+    def is_violated_by_prefix(self, report: Report) -> bool:
+        metric = self._metric_extractor.extract(report)
+        return int(metric.value) > self._max_num_of_paragraph
+
     def must_be_satisfied(self) -> bool:
         return self._must_be_satisfied
 
@@ -198,6 +251,9 @@ class NumberOfParagraphRequirement(Requirement):
         metric = self._metric_extractor.extract(report)
         return metric
 
+    def get_metric_batch(self, reports: List[Report]) -> List[Metric]:
+        return self._metric_extractor.extract_batch(reports)
+
 
 class NumberOfTokenRequirement(Requirement):
 
@@ -206,6 +262,7 @@ class NumberOfTokenRequirement(Requirement):
         min_num_of_token: int,
         max_num_of_token: int,
         must_be_satisfied: bool = False,
+        token_counter: Optional[TokenCounter] = None,
     ):
         super().__init__()
         self._min_num_of_token = min_num_of_token
@@ -216,7 +273,9 @@ class NumberOfTokenRequirement(Requirement):
             f"Summarization report should have {self._min_num_of_token} to {self._max_num_of_token} tokens / words "
             f"in total;"
         )
-        self._metric_extractor = NumberOfTokenMetricExtractor()
+        self._metric_extractor = NumberOfTokenMetricExtractor(
+            token_counter=token_counter
+        )
 
     @property
     def name(self) -> str:
@@ -234,6 +293,16 @@ class NumberOfTokenRequirement(Requirement):
         )
         return has_proper_num_of_token
 
+    def is_satisfied_batch(self, reports: List[Report]) -> List[bool]:
+        values = self._metric_extractor.extract_values(reports)
+        return (
+            (self._min_num_of_token <= values) & (values <= self._max_num_of_token)
+        ).tolist()
+
+    def is_violated_by_prefix(self, report: Report) -> bool:
+        metric = self._metric_extractor.extract(report)
+        return int(metric.value) > self._max_num_of_token
+
     def must_be_satisfied(self) -> bool:
         return self._must_be_satisfied
 
@@ -241,15 +310,20 @@ class NumberOfTokenRequirement(Requirement):
         metric = self._metric_extractor.extract(report)
         return metric
 
+    def get_metric_batch(self, reports: List[Report]) -> List[Metric]:
+        return self._metric_extractor.extract_batch(reports)
+
 
 class CorrectnessRequirement(Requirement):
 
     def __init__(
         self,
-        client: AsyncOpenAI,
+        client: LLMClient,
         model: str,
         org_document: Document,
         must_be_satisfied: bool = False,
+        memo: Optional[AsyncMemo] = None,
+        judge: Optional[ReferenceBasedJudge] = None,
     ):
         self._llm_api_client = client
         self._model = model
@@ -259,9 +333,13 @@ class CorrectnessRequirement(Requirement):
             "Ensure the summary faithfully reflects the original document meaning without "
             "adding personal opinions;"
         )
-        self._reference = Reference(content=org_document.content)
+        self._reference = Reference.of(org_document)
         self._metric_extractor = CorrectnessMetricExtractor(
-            client=self._llm_api_client, model=self._model, reference=self._reference
+            client=self._llm_api_client,
+            model=self._model,
+            reference=self._reference,
+            memo=memo,
+            judge=judge,
         )
 
     @property
@@ -284,24 +362,46 @@ class CorrectnessRequirement(Requirement):
         metric = await self._metric_extractor.extract(report)
         return metric
 
+    async def is_satisfied_batch(
+        self, reports: List[Report], max_concurrency: int = 8
+    ) -> List[bool]:
+        """Judge at most `max_concurrency` reports at a time."""
+        metrics = await self.get_metric_batch(reports, max_concurrency=max_concurrency)
+        return [bool(int(metric.value)) for metric in metrics]
+
+    async def get_metric_batch(
+        self, reports: List[Report], max_concurrency: int = 8
+    ) -> List[Metric]:
+        return await self._metric_extractor.extract_batch(
+            reports, max_concurrency=max_concurrency
+        )
+
 
 class CompletenessRequirement(Requirement):
 
     def __init__(
         self,
-        client: AsyncOpenAI,
+        client: LLMClient,
         model: str,
         org_document: Document,
         must_be_satisfied: bool = False,
+        judge: Optional[TopicBasedJudge] = None,
+        memo: Optional[AsyncMemo] = None,
+        topic_document: Optional[Document] = None,
     ):
         self._llm_api_client = client
         self._model = model
         self._must_be_satisfied = must_be_satisfied
         self._name = "Correctness-Requirement"
         self._description = "Ensure the summary cover the main idea of the document;"
-        self._reference = Reference(content=org_document.content)
+        self._reference = Reference.of(org_document)
         self._metric_extractor = CompletenessMetricExtractor(
-            client=self._llm_api_client, model=self._model, reference=self._reference
+            client=self._llm_api_client,
+            model=self._model,
+            reference=self._reference,
+            judge=judge,
+            memo=memo,
+            topic_document=topic_document,
         )
 
     @property
@@ -323,3 +423,17 @@ class CompletenessRequirement(Requirement):
     async def get_metric(self, report: Report) -> Metric:
         metric = await self._metric_extractor.extract(report)
         return metric
+
+    async def is_satisfied_batch(
+        self, reports: List[Report], max_concurrency: int = 8
+    ) -> List[bool]:
+        """Judge at most `max_concurrency` reports at a time."""
+        metrics = await self.get_metric_batch(reports, max_concurrency=max_concurrency)
+        return [bool(int(metric.value)) for metric in metrics]
+
+    async def get_metric_batch(
+        self, reports: List[Report], max_concurrency: int = 8
+    ) -> List[Metric]:
+        return await self._metric_extractor.extract_batch(
+            reports, max_concurrency=max_concurrency
+        )
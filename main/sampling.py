@@ -0,0 +1,133 @@
+"""sampling module.
+
+Decide how many summaries `BestHitLLMSummarizer` generates. Candidates are
+generated in waves; after each wave the strategy looks at what has been seen
+so far and sizes the next wave, 0 ends the sampling.
+"""
+
+import math
+import statistics
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+__all__ = [
+    "SamplingHistory",
+    "SamplingStrategy",
+    "FixedSamplingStrategy",
+    "AdaptiveSamplingStrategy",
+    "expected_improvement",
+]
+
+
+class SamplingHistory:
+    """Outcome of every try so far: whether it was valid, and its score."""
+
+    def __init__(self):
+        self._num_of_tries = 0
+        self._scores: List[float] = []
+
+    def record(self, score: Optional[float] = None) -> None:
+        """Record one try, `score` is None unless the candidate is valid."""
+        self._num_of_tries += 1
+        if score is not None:
+            self._scores.append(score)
+
+    @property
+    def num_of_tries(self) -> int:
+        return self._num_of_tries
+
+    @property
+    def num_of_valid(self) -> int:
+        return len(self._scores)
+
+    @property
+    def scores(self) -> List[float]:
+        return list(self._scores)
+
+    @property
+    def valid_rate(self) -> float:
+        if self._num_of_tries == 0:
+            return 0.0
+        return self.num_of_valid / self._num_of_tries
+
+    @property
+    def best_score(self) -> Optional[float]:
+        return max(self._scores) if self._scores else None
+
+
+class SamplingStrategy(ABC):
+
+    @abstractmethod
+    def next_wave_size(self, history: SamplingHistory) -> int:
+        """Number of candidates to generate next, 0 to stop."""
+
+
+class FixedSamplingStrategy(SamplingStrategy):
+    """Always generate `num_tries` candidates, `wave_size` at a time."""
+
+    def __init__(self, num_tries: int = 5, wave_size: int = 1):
+        self._num_tries = num_tries
+        self._wave_size = wave_size
+
+    def next_wave_size(self, history: SamplingHistory) -> int:
+        return max(min(self._wave_size, self._num_tries - history.num_of_tries), 0)
+
+
+def expected_improvement(
+    scores: List[float], best_score: float, prior_std: float = 0.05
+) -> float:
+    """Expected gain over `best_score` of one more valid candidate.
+
+    Scores are modelled as normally distributed with the mean and standard
+    deviation of `scores`; `prior_std` stands in for the deviation until two
+    scores are known.
+    """
+    mean = statistics.fmean(scores)
+    std = statistics.stdev(scores) if len(scores) > 1 else prior_std
+    if std <= 0:
+        return max(mean - best_score, 0.0)
+    z = (mean - best_score) / std
+    cdf = 0.5 * (1 + math.erf(z / math.sqrt(2)))
+    pdf = math.exp(-0.5 * z * z) / math.sqrt(2 * math.pi)
+    return (mean - best_score) * cdf + std * pdf
+
+
+class AdaptiveSamplingStrategy(SamplingStrategy):
+    """Generate more candidates only while they are expected to pay off.
+
+    A first wave of `first_wave_size` candidates is generated. Each following
+    wave of `wave_size` candidates is generated only if the valid rate times
+    the expected improvement of the best score is at least
+    `min_expected_improvement`, up to `max_tries` candidates in total. Until a
+    valid candidate is seen, waves continue up to `max_tries`.
+    """
+
+    def __init__(
+        self,
+        first_wave_size: int = 2,
+        wave_size: int = 2,
+        max_tries: int = 10,
+        min_expected_improvement: float = 0.005,
+        prior_std: float = 0.05,
+    ):
+        self._first_wave_size = first_wave_size
+        self._wave_size = wave_size
+        self._max_tries = max_tries
+        self._min_expected_improvement = min_expected_improvement
+        self._prior_std = prior_std
+
+    def next_wave_size(self, history: SamplingHistory) -> int:
+        num_of_remaining = self._max_tries - history.num_of_tries
+        if num_of_remaining <= 0:
+            return 0
+        if history.num_of_tries == 0:
+            return min(self._first_wave_size, num_of_remaining)
+        if history.num_of_valid:
+            gain = history.valid_rate * expected_improvement(
+                scores=history.scores,
+                best_score=history.best_score,
+                prior_std=self._prior_std,
+            )
+            if gain < self._min_expected_improvement:
+                return 0
+        return min(self._wave_size, num_of_remaining)
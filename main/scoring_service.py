@@ -0,0 +1,186 @@
+"""scoring_service module.
+
+A local BERTScore service, so that several web workers on one node share a
+single copy of the model instead of loading one each. Start it with::
+
+    python -m main.scoring_service --socket /tmp/bert-score.sock --backend int8
+
+and point the workers to it with `RemoteBertScoreBackend`. Messages are JSON
+objects prefixed with their length as a 4-byte big-endian integer.
+
+When workers are forked from one parent (e.g. `gunicorn --preload`),
+`preload_bert_score_backend` is an alternative: the parent loads the model
+before forking and the workers share its memory copy-on-write.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from main.bert_backends import BertScoreBackend, get_bert_score_backend
+
+__all__ = [
+    "BertScoreServer",
+    "RemoteBertScoreBackend",
+    "preload_bert_score_backend",
+]
+
+_HEADER = struct.Struct(">I")
+
+
+def _encode(message: dict) -> bytes:
+    payload = json.dumps(message).encode("utf-8")
+    return _HEADER.pack(len(payload)) + payload
+
+
+async def _read_message(reader: asyncio.StreamReader) -> dict:
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return json.loads(await reader.readexactly(length))
+
+
+def _recv_exactly(sock: socket.socket, length: int) -> bytes:
+    chunks = []
+    while length:
+        chunk = sock.recv(min(length, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Scoring service closed the connection.")
+        chunks.append(chunk)
+        length -= len(chunk)
+    return b"".join(chunks)
+
+
+class BertScoreServer:
+    """Serve `{"cands": [...], "refs": [...]}` -> `{"f1": [...]}` requests."""
+
+    def __init__(self, backend: BertScoreBackend, socket_path: str):
+        self._backend = backend
+        self._socket_path = socket_path
+        # The model is used by one thread at a time; torch parallelizes each
+        # forward pass itself.
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="bert-score"
+        )
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def socket_path(self) -> str:
+        return self._socket_path
+
+    async def _score(self, cands: List[str], refs: List[str]) -> List[float]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._backend.score, cands, refs
+        )
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                try:
+                    request = await _read_message(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    f1 = await self._score(request["cands"], request["refs"])
+                    response = {"f1": f1}
+                except Exception as e:
+                    response = {"error": f"{type(e).__name__}: {e}"}
+                writer.write(_encode(response))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        # Load the model before accepting the first connection.
+        await asyncio.get_running_loop().run_in_executor(
+            self._executor, lambda: self._backend.scorer
+        )
+        if os.path.exists(self._socket_path) and stat.S_ISSOCK(
+            os.stat(self._socket_path).st_mode
+        ):
+            os.unlink(self._socket_path)  # left over by a previous run
+        self._server = await asyncio.start_unix_server(
+            self._handle, path=self._socket_path
+        )
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False)
+
+
+class RemoteBertScoreBackend(BertScoreBackend):
+    """Score through a `BertScoreServer` instead of loading the model."""
+
+    def __init__(self, socket_path: str, timeout: Optional[float] = 60.0):
+        super().__init__(model_type="remote")
+        self._socket_path = socket_path
+        self._timeout = timeout
+
+    def score(self, cands: List[str], refs: List[str]) -> List[float]:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self._timeout)
+            sock.connect(self._socket_path)
+            sock.sendall(_encode({"cands": cands, "refs": refs}))
+            (length,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+            response = json.loads(_recv_exactly(sock, length))
+        if "error" in response:
+            raise RuntimeError(f"Scoring service failed: {response['error']}")
+        return response["f1"]
+
+
+def preload_bert_score_backend(
+    name: str = "float32", num_threads: Optional[int] = None
+) -> BertScoreBackend:
+    """Load a backend in the current process ahead of forking workers.
+
+    Objects alive at this point are moved out of the garbage collector's
+    reach (`gc.freeze`), so that collections in the workers do not touch,
+    and thereby copy, the pages holding the shared weights.
+
+    Threads do not survive the fork, so none may be needed by the workers
+    yet: the batching thread of `BatchingBertScoreBackend` starts on the
+    first score and `LLMBackendPool.start_health_checks` restarts its thread
+    in each worker; start any other thread in the workers.
+    """
+    backend = get_bert_score_backend(name=name, num_threads=num_threads)
+    backend.scorer  # loads the model
+    gc.collect()
+    gc.freeze()
+    return backend
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve BERTScore on a local socket.")
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--backend", default="float32")
+    parser.add_argument("--num-threads", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    backend = get_bert_score_backend(name=args.backend, num_threads=args.num_threads)
+    server = BertScoreServer(backend=backend, socket_path=args.socket)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
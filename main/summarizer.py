@@ -1,19 +1,37 @@
 """summarize document."""
 
+import asyncio
 import inspect
+import math
 import os
 from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from typing import Callable, List, Optional, Tuple, Union
 
 from jinja2 import Environment, FileSystemLoader
-from openai import AsyncOpenAI
+from pydantic import BaseModel, Field
 
+from main.backend_pool import LLMClient
+from main.bert_backends import BertScoreBackend
+from main.caching import AsyncMemo
+from main.completion import parse_chat_completion, stream_chat_completion
+from main.compression import ExtractiveCompressor
 from main.customized_exceptions import (
+    GenerationAborted,
     LargeLanguageAPIError,
     NoReportSatisfyAllMustRequirements,
+    PartialSummariesTooLong,
 )
+from main.dedup import CandidateDeduplicator
 from main.document import Document
-from main.llm_as_judge import Reference
+from main.document_store import get_document_store
+from main.llm_as_judge import (
+    Reference,
+    build_completeness_judge,
+    build_correctness_judge,
+)
 from main.metrics import BertScoreMetricExtractor, RougeScoreMetricExtractor
+from main.parsing import PartialReportParser, parse_structured_output
 from main.report import Report
 from main.requirements import (
     CompletenessRequirement,
@@ -22,13 +40,24 @@ from main.requirements import (
     HasTitleRequirement,
     NumberOfParagraphRequirement,
     NumberOfTokenRequirement,
+    Requirement,
     TitleLengthRequirement,
 )
+from main.sampling import FixedSamplingStrategy, SamplingHistory, SamplingStrategy
+from main.tokenization import TokenCounter, get_token_counter
+from main.tracing import get_tracer
+from main.usage import TokenBudget, UsageLedger, usage_scope
 
 ABSOLUTE_PATH = os.path.dirname(__file__)
 ROOT_SOURCE_PATH = "/".join(ABSOLUTE_PATH.split("/")[:-1])
 
 
+class PartialSummary(BaseModel):
+    """summary of one chunk of a document"""
+
+    content: str = Field(..., description="The summary of the chunk")
+
+
 class AbstractSummarizer(ABC):
 
     @abstractmethod
@@ -39,10 +68,11 @@ class AbstractSummarizer(ABC):
 class BestHitLLMSummarizer(AbstractSummarizer):
     _env = Environment(loader=FileSystemLoader(f"{ROOT_SOURCE_PATH}/prompts/templates"))
     _prompt_template_file = "summarize_document_template.j2"
+    _repair_prompt_template_file = "repair_report_template.j2"
 
     def __init__(
         self,
-        client: AsyncOpenAI,
+        client: LLMClient,
         model: str,
         has_title: bool = True,
         min_num_of_char_in_title: int = 5,
@@ -52,6 +82,24 @@ class BestHitLLMSummarizer(AbstractSummarizer):
         compression_rate: float = 0.2,
         num_tries: int = 5,
         llm_as_judge: bool = False,
+        token_budget: Optional[TokenBudget] = None,
+        bert_score_backend: Union[str, BertScoreBackend] = "float32",
+        scoring_executor: Optional[Executor] = None,
+        stream: bool = False,
+        sampling_strategy: Optional[SamplingStrategy] = None,
+        judge_top_fraction: float = 1.0,
+        expensive_top_k: Optional[int] = None,
+        deduplicate: bool = True,
+        max_hamming_distance: int = 3,
+        judge_models: Optional[List[str]] = None,
+        judge_min_confidence: float = 0.8,
+        fast_judge: bool = False,
+        judge_request_options: Optional[dict] = None,
+        repair: bool = False,
+        max_repairs: int = 1,
+        prompt_token_budget: Optional[int] = None,
+        compression_method: str = "textrank",
+        token_counter: Union[str, TokenCounter] = "whitespace",
     ):
         self._llm_api_client = client
         self._model = model
@@ -63,12 +111,124 @@ class BestHitLLMSummarizer(AbstractSummarizer):
         self._compression_rate = compression_rate
         self._num_tries = num_tries
         self._llm_as_judge = llm_as_judge
+        self._token_budget = token_budget
+        self._bert_score_backend = bert_score_backend
+        # Scorers run off the event loop, in the loop's default thread pool
+        # unless an executor is given.
+        self._scoring_executor = scoring_executor
+        # Stream generations and abort those which already exceed the maximum
+        # title length, number of paragraphs or number of tokens.
+        self._stream = stream
+        # Generate `num_tries` candidates one by one unless a strategy is given.
+        self._sampling_strategy = sampling_strategy or FixedSamplingStrategy(
+            num_tries=num_tries
+        )
+        # LLM judges only check this fraction of the valid candidates, the
+        # best scoring ones.
+        self._judge_top_fraction = judge_top_fraction
+        # Rank valid candidates by the cheap scorers and give only the best
+        # `expensive_top_k` the expensive scorers and LLM judges. Every valid
+        # candidate gets every scorer if None.
+        self._expensive_top_k = expensive_top_k
+        # Drop candidates equal to an earlier one, or whose SimHash differs in
+        # at most `max_hamming_distance` bits, before validating and scoring.
+        self._deduplicate = deduplicate
+        self._max_hamming_distance = max_hamming_distance
+        # LLM judges escalate through `judge_models`, from small to large: a
+        # verdict is passed on unless positive with `judge_min_confidence`.
+        # The generation model judges alone if None.
+        self._judge_models = judge_models or [model]
+        self._judge_min_confidence = judge_min_confidence
+        # Fast judges answer with the decision only, within
+        # `judge_request_options` (`FAST_JUDGE_REQUEST_OPTIONS` by default);
+        # keep them off to read the judges' reasons.
+        self._fast_judge = fast_judge
+        self._judge_request_options = judge_request_options
+        # Send a report failing structural requirements back for revision, up
+        # to `max_repairs` times, instead of discarding it.
+        self._repair = repair
+        self._max_repairs = max_repairs
+        # Counts the tokens of the length requirement and prompt budgets, by
+        # name in `main.tokenization.TOKEN_COUNTERS` or "hf:<model>".
+        if isinstance(token_counter, TokenCounter):
+            self._token_counter = token_counter
+        else:
+            self._token_counter = get_token_counter(name=token_counter)
+        # Extract the most central sentences of a document longer than
+        # `prompt_token_budget` tokens before putting it into the prompt.
+        self._compressor = (
+            ExtractiveCompressor(
+                max_num_of_token=prompt_token_budget,
+                method=compression_method,
+                token_counter=self._token_counter,
+            )
+            if prompt_token_budget is not None
+            else None
+        )
         self._prompt_template = BestHitLLMSummarizer._env.get_template(
             BestHitLLMSummarizer._prompt_template_file
         )
+        self._repair_prompt_template = BestHitLLMSummarizer._env.get_template(
+            BestHitLLMSummarizer._repair_prompt_template_file
+        )
 
     async def summarize(self, document: Document) -> Report:
-        num_of_token = len([_ for _ in document.content.split() if _.strip()])
+        # Requests for the same text share one copy of it and of its digest.
+        document = get_document_store().intern(document)
+        with get_tracer().span("summarize", model=self._model) as span:
+            with usage_scope(budget=self._token_budget) as ledger:
+                try:
+                    report = await self._summarize(document=document, ledger=ledger)
+                finally:
+                    usage = ledger.usage
+                    span.set_attribute("total_prompt_tokens", usage.prompt_tokens)
+                    span.set_attribute(
+                        "total_completion_tokens", usage.completion_tokens
+                    )
+                    span.set_attribute("num_of_llm_calls", usage.num_of_calls)
+            span.set_attribute("outcome", "ok")
+            return report
+
+    @staticmethod
+    async def _satisfy_all_must_requirements(
+        requirements: list, report: Report, candidate: int
+    ) -> bool:
+        for req in requirements:
+            with get_tracer().span(
+                "requirement.check", requirement=req.name, candidate=candidate
+            ) as span:
+                if inspect.iscoroutinefunction(req.is_satisfied):
+                    is_satisfied = await req.is_satisfied(report)
+                else:
+                    is_satisfied = req.is_satisfied(report)
+                span.set_attribute(
+                    "outcome", "satisfied" if is_satisfied else "unsatisfied"
+                )
+            if not is_satisfied:
+                return False
+        return True
+
+    @staticmethod
+    def _abort_on_violation(
+        requirements: List[Requirement], check_every_n_chars: int = 32
+    ) -> Callable[[str], bool]:
+        parser = PartialReportParser()
+        num_of_char_at_last_check = 0
+
+        def on_delta(delta: str) -> bool:
+            nonlocal num_of_char_at_last_check
+            parser.feed(delta)
+            if parser.num_of_char - num_of_char_at_last_check < check_every_n_chars:
+                return False
+            num_of_char_at_last_check = parser.num_of_char
+            report = parser.report
+            return any(req.is_violated_by_prefix(report) for req in requirements)
+
+        return on_delta
+
+    async def _summarize(self, document: Document, ledger: UsageLedger) -> Report:
+        num_of_token = self._token_counter.count(document.content)
+        prompt_document = await self._prompt_document(document=document)
         # Define requirements which should be satisfied
         all_requirements = []
         if self._has_title:
@@ -99,10 +259,14 @@ class BestHitLLMSummarizer(AbstractSummarizer):
                         min(self._compression_rate + 0.05, 0.9) * num_of_token
                     ),
                     must_be_satisfied=True,
+                    token_counter=self._token_counter,
                 ),
             ]
         )
 
+        # Judgements and the main topic of the document are memoized by its
+        # digest, once per run.
+        memo = AsyncMemo()
         if self._llm_as_judge:
             all_requirements.extend(
                 [
@@ -111,20 +275,50 @@ class BestHitLLMSummarizer(AbstractSummarizer):
                         model=self._model,
                         org_document=document,
                         must_be_satisfied=True,
+                        # Paragraphs shared by candidates are judged once.
+                        memo=memo,
+                        judge=build_correctness_judge(
+                            client=self._llm_api_client,
+                            models=self._judge_models,
+                            min_confidence=self._judge_min_confidence,
+                            fast=self._fast_judge,
+                            request_options=self._judge_request_options,
+                        ),
                     ),
                     CompletenessRequirement(
                         client=self._llm_api_client,
                         model=self._model,
                         org_document=document,
                         must_be_satisfied=True,
+                        memo=memo,
+                        # The main topic is extracted from the prompt's
+                        # document, compressed if need be.
+                        topic_document=prompt_document,
+                        judge=build_completeness_judge(
+                            client=self._llm_api_client,
+                            models=self._judge_models,
+                            min_confidence=self._judge_min_confidence,
+                            fast=self._fast_judge,
+                            request_options=self._judge_request_options,
+                        ),
                     ),
                 ]
             )
 
-        scorers = [
-            BertScoreMetricExtractor(reference=Reference(content=document.content)),
-            RougeScoreMetricExtractor(reference=Reference(content=document.content)),
+        reference = Reference.of(document)
+        cheap_scorers = [
+            RougeScoreMetricExtractor(reference=reference),
+        ]
+        expensive_scorers = [
+            BertScoreMetricExtractor(
+                reference=reference,
+                backend=self._bert_score_backend,
+            ),
         ]
+        if self._expensive_top_k is None:
+            first_scorers, second_scorers = expensive_scorers + cheap_scorers, []
+        else:
+            first_scorers, second_scorers = cheap_scorers, expensive_scorers
 
         must_be_satisfied_requirements = [
             req for req in all_requirements if req.must_be_satisfied()
@@ -135,68 +329,433 @@ class BestHitLLMSummarizer(AbstractSummarizer):
             descriptions_in_all_requirements.append(requirement.description)
 
         # Build the prompt
-        prompt = self._prompt_template.render(
-            {
-                "document": document.content,
-                "requirements": descriptions_in_all_requirements,
-            }
-        )
+        with get_tracer().span(
+            "prompt.render", template=self._prompt_template_file
+        ):
+            prompt = self._prompt_template.render(
+                {
+                    "document": prompt_document.content,
+                    "requirements": descriptions_in_all_requirements,
+                }
+            )
 
         messages = [
             {"role": "system", "content": "You are a helpful assistant"},
             {"role": "user", "content": f"{prompt}"},
         ]
 
-        # Query LLM API
-        reports = []
-        for iteration in range(self._num_tries):
-            print(f"Summarize at iteration {iteration}")
-            try:
-                response = await self._llm_api_client.beta.chat.completions.parse(
-                    model=self._model,
-                    messages=messages,
-                    response_format=Report,
-                )
-            except Exception as e:
-                print(e)
-            else:
-                report = Report.model_validate_json(response.choices[0].message.content)
-                reports.append(report)
+        # Structural requirements are checked on every candidate as soon as it
+        # arrives; LLM judges only on the best scoring ones, see below.
+        judge_requirements = [
+            req
+            for req in must_be_satisfied_requirements
+            if inspect.iscoroutinefunction(req.is_satisfied)
+        ]
+        structural_requirements = [
+            req
+            for req in must_be_satisfied_requirements
+            if req not in judge_requirements
+        ]
 
-        if not reports:
-            raise LargeLanguageAPIError()
+        # Query LLM API in waves sized by the sampling strategy, validating and
+        # scoring each report as soon as it arrives. A valid duplicate of an
+        # earlier valid report is not scored, it inherits the score of its twin
+        # and is not ranked itself. Duplicates are only looked for among valid
+        # reports, so that a valid report is never dropped as the twin of an
+        # invalid one, e.g. with the same words split into more paragraphs.
+        history = SamplingHistory()
+        deduplicator = CandidateDeduplicator(
+            max_hamming_distance=self._max_hamming_distance
+        )
+        num_of_reports = 0
+        num_of_aborted = 0
+        scores = {}
+        scored_reports = []
+        while True:
+            num_of_tries = history.num_of_tries
+            if ledger.is_exhausted():
+                print(f"Token budget exhausted at iteration {num_of_tries}")
+                break
+            wave_size = self._sampling_strategy.next_wave_size(history)
+            if wave_size <= 0:
+                break
+            outcomes = await asyncio.gather(
+                *[
+                    self._try(
+                        messages=messages,
+                        requirements=structural_requirements,
+                        candidate=num_of_tries + offset,
+                    )
+                    for offset in range(wave_size)
+                ]
+            )
+            generated_reports = {}
+            for offset, (report, aborted) in enumerate(outcomes):
+                num_of_reports += report is not None
+                num_of_aborted += aborted
+                if report is not None:
+                    generated_reports[num_of_tries + offset] = report
 
-        valid_reports = []
-        for report in reports:
-            satisfy_all_must_requirements = []
-            for req in must_be_satisfied_requirements:
-                if inspect.iscoroutinefunction(req.is_satisfied):
-                    satisfy_all_must_requirements.append(await req.is_satisfied(report))
+            valid_reports = await asyncio.gather(
+                *[
+                    self._validate(
+                        report=report,
+                        requirements=structural_requirements,
+                        candidate=idx,
+                    )
+                    for idx, report in generated_reports.items()
+                ]
+            )
+            twins = {}
+            new_reports = {}
+            for idx, report in zip(generated_reports, valid_reports):
+                if report is None:
+                    continue
+                twin = deduplicator.add(report, key=idx) if self._deduplicate else None
+                if twin is None:
+                    new_reports[idx] = report
                 else:
-                    satisfy_all_must_requirements.append(req.is_satisfied(report))
+                    print(f"Report {idx+1} duplicates report {twin+1}")
+                    twins[idx] = twin
+
+            new_scores = await asyncio.gather(
+                *[
+                    self._score(scorers=first_scorers, report=report, candidate=idx)
+                    for idx, report in new_reports.items()
+                ]
+            )
+            for (idx, report), score in zip(new_reports.items(), new_scores):
+                scores[idx] = score
+                scored_reports.append((score, idx, report))
+            for offset in range(wave_size):
+                idx = num_of_tries + offset
+                history.record(score=scores.get(twins.get(idx, idx)))
+
+        if not num_of_reports and not num_of_aborted:
+            raise LargeLanguageAPIError()
+
+        print(f"Number of valid reports: {len(scored_reports)}")
+
+        def by_score(scored_report: tuple) -> float:
+            return scored_report[0]
+
+        scored_reports.sort(key=by_score, reverse=True)
+        if second_scorers:
+            # Scoring cascade: only the best candidates by the cheap scores get
+            # the expensive ones, and are ranked by the combined score.
+            scored_reports = scored_reports[: self._expensive_top_k]
+            second_scores = await asyncio.gather(
+                *[
+                    self._score(scorers=second_scorers, report=report, candidate=idx)
+                    for _, idx, report in scored_reports
+                ]
+            )
+            scored_reports = sorted(
+                [
+                    (score + second_score, idx, report)
+                    for (score, idx, report), second_score in zip(
+                        scored_reports, second_scores
+                    )
+                ],
+                key=by_score,
+                reverse=True,
+            )
+
+        # Best scoring first; the first report satisfying the judges is the best
+        # valid report, so the remaining ones need not be judged.
+        if judge_requirements:
+            num_of_judged = math.ceil(self._judge_top_fraction * len(scored_reports))
+            scored_reports = scored_reports[: max(num_of_judged, 1)]
+        # A budget exhausted while judging raises `TokenBudgetExceeded`: the
+        # best report is not known to satisfy the judges.
+        for _, idx, report in scored_reports:
+            if await self._satisfy_all_must_requirements(
+                requirements=judge_requirements,
+                report=report,
+                candidate=idx,
+            ):
+                return report
+
+        raise NoReportSatisfyAllMustRequirements()
+
+    async def _prompt_document(self, document: Document) -> Document:
+        """The document put into the prompt; requirements and scorers keep the
+        original one."""
+        if self._compressor is None:
+            return document
+        with get_tracer().span(
+            "prompt.compress", max_num_of_token=self._compressor.max_num_of_token
+        ) as span:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._scoring_executor, self._compressor.compress, document
+            )
+            span.set_attribute("num_of_token_before", result.num_of_token_before)
+            span.set_attribute("num_of_token_after", result.num_of_token_after)
+            span.set_attribute("compression_ratio", result.compression_ratio)
+            span.set_attribute("outcome", "ok")
+        print(
+            f"Compressed document from {result.num_of_token_before} to "
+            f"{result.num_of_token_after} tokens ({result.compression_ratio:.0%})"
+        )
+        return result.document
+
+    async def _generate(
+        self, messages: List[dict], requirements: List[Requirement], candidate: int
+    ) -> Report:
+        print(f"Summarize at iteration {candidate}")
+        if self._stream:
+            response = await stream_chat_completion(
+                client=self._llm_api_client,
+                model=self._model,
+                messages=messages,
+                response_format=Report,
+                on_delta=self._abort_on_violation(requirements),
+                token_counter=self._token_counter,
+                candidate=candidate,
+            )
+        else:
+            response = await parse_chat_completion(
+                client=self._llm_api_client,
+                model=self._model,
+                messages=messages,
+                response_format=Report,
+                candidate=candidate,
+            )
+        return parse_structured_output(response.choices[0].message, Report)
+
+    async def _score(self, scorers: list, report: Report, candidate: int) -> float:
+        metrics = []
+        for scorer in scorers:
+            with get_tracer().span(
+                "scorer.extract", scorer=type(scorer).__name__, candidate=candidate
+            ) as span:
+                score = await scorer.extract_async(
+                    report=report, executor=self._scoring_executor
+                )
+                span.set_attribute("score", float(score.value))
+                span.set_attribute("outcome", "ok")
+            metrics.append(score)
+
+        print(
+            f"Valid report {candidate+1}; "
+            + "; ".join(f"{metric.name}: {metric.value}" for metric in metrics)
+        )
+        return sum(float(metric.value) for metric in metrics)  # sum of all scores
+
+    async def _try(
+        self, messages: List[dict], requirements: List[Requirement], candidate: int
+    ) -> Tuple[Optional[Report], bool]:
+        """Generate one report; return it, or None, and whether it was aborted."""
+        try:
+            report = await self._generate(
+                messages=messages, requirements=requirements, candidate=candidate
+            )
+        except GenerationAborted as e:
+            print(e)
+            return None, True
+        except Exception as e:
+            print(e)
+            return None, False
+        return report, False
+
+    @staticmethod
+    def _violated_requirements(
+        requirements: List[Requirement], report: Report, candidate: int
+    ) -> List[Requirement]:
+        violated = []
+        for req in requirements:
+            with get_tracer().span(
+                "requirement.check", requirement=req.name, candidate=candidate
+            ) as span:
+                is_satisfied = req.is_satisfied(report)
+                span.set_attribute(
+                    "outcome", "satisfied" if is_satisfied else "unsatisfied"
+                )
+            if not is_satisfied:
+                violated.append(req)
+        return violated
+
+    async def _revise(
+        self, report: Report, violated: List[Requirement], candidate: int
+    ) -> Report:
+        with get_tracer().span(
+            "prompt.render", template=self._repair_prompt_template_file
+        ):
+            prompt = self._repair_prompt_template.render(
+                {
+                    "title": report.title,
+                    "content": report.content,
+                    "requirements": [req.description for req in violated],
+                }
+            )
+        print(f"Repair report {candidate+1}")
+        return await self._generate(
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant"},
+                {"role": "user", "content": f"{prompt}"},
+            ],
+            requirements=violated,
+            candidate=candidate,
+        )
+
+    async def _validate(
+        self, report: Report, requirements: List[Requirement], candidate: int
+    ) -> Optional[Report]:
+        """The report, repaired if need be, or None if it is not valid."""
+        if not self._repair:
+            if not await self._satisfy_all_must_requirements(
+                requirements=requirements, report=report, candidate=candidate
+            ):
+                return None
+        else:
+            num_of_repairs = 0
+            while True:
+                violated = self._violated_requirements(
+                    requirements=requirements, report=report, candidate=candidate
+                )
+                if not violated:
+                    break
+                if num_of_repairs == self._max_repairs:
+                    return None
+                num_of_repairs += 1
+                try:
+                    report = await self._revise(
+                        report=report, violated=violated, candidate=candidate
+                    )
+                except Exception as e:
+                    print(e)
+                    return None
+        return report
 
-            if satisfy_all_must_requirements:
-                valid_reports.append(report)
 
-        print(f"Number of valid reports: {len(valid_reports)}")
+class MapReduceSummarizer(BestHitLLMSummarizer):
+    """Summarize a long document hierarchically.
 
-        if not valid_reports:
-            raise NoReportSatisfyAllMustRequirements()
+    The document is split at paragraph boundaries into chunks of at most
+    `max_num_of_token_in_chunk` tokens, which are summarized concurrently
+    (map); the partial summaries are split and summarized again until they fit
+    in one chunk, or `PartialSummariesTooLong` is raised if a level does not
+    shrink them. The final report is generated from the partial summaries
+    (reduce), as by `BestHitLLMSummarizer`, and checked and scored against the
+    original document. A document fitting in one chunk is summarized directly.
+    """
 
-        best_report_id = -1
-        best_report_score = 0
-        for idx, report in enumerate(valid_reports):
-            scores = []
-            for scorer in scorers:
-                score = scorer.extract(report=report)
-                scores.append(float(score.value))
+    _chunk_prompt_template_file = "summarize_chunk_template.j2"
 
+    def __init__(
+        self,
+        client: LLMClient,
+        model: str,
+        max_num_of_token_in_chunk: int = 2000,
+        chunk_compression_rate: float = 0.4,
+        max_concurrent_chunks: int = 8,
+        **kwargs,
+    ):
+        super().__init__(client=client, model=model, **kwargs)
+        self._max_num_of_token_in_chunk = max_num_of_token_in_chunk
+        # Each chunk is summarized in at most this fraction of its tokens.
+        self._chunk_compression_rate = chunk_compression_rate
+        # Chunks summarized at once, so a long document does not flood the
+        # LLM backend.
+        self._max_concurrent_chunks = max_concurrent_chunks
+        self._chunk_prompt_template = BestHitLLMSummarizer._env.get_template(
+            MapReduceSummarizer._chunk_prompt_template_file
+        )
+
+    async def _prompt_document(self, document: Document) -> Document:
+        count = self._token_counter.count
+        min_num_of_token = int(self._compression_rate * count(document.content))
+        document = await super()._prompt_document(document=document)
+        semaphore = asyncio.Semaphore(self._max_concurrent_chunks)
+        level = 0
+        while count(document.content) > self._max_num_of_token_in_chunk:
+            num_of_token = count(document.content)
+            # Partial summaries shorter than the final report leave nothing to
+            # reduce, so the chunks are compressed less once that is near, but
+            # still enough for the partial summaries to fit in one chunk.
+            compression_rate = max(
+                self._chunk_compression_rate,
+                min(min_num_of_token, self._max_num_of_token_in_chunk)
+                / num_of_token,
+            )
+            chunks = document.split(
+                max_num_of_token=self._max_num_of_token_in_chunk,
+                token_counter=self._token_counter,
+            )
+            with get_tracer().span(
+                "summarize.map", level=level, num_of_chunks=len(chunks)
+            ) as span:
+                tasks = [
+                    asyncio.ensure_future(
+                        self._summarize_chunk(
+                            chunk=chunk,
+                            index=index,
+                            num_of_chunks=len(chunks),
+                            level=level,
+                            compression_rate=compression_rate,
+                            semaphore=semaphore,
+                        )
+                    )
+                    for index, chunk in enumerate(chunks)
+                ]
+                try:
+                    partial_summaries = await asyncio.gather(*tasks)
+                except BaseException:
+                    # E.g. `TokenBudgetExceeded`: the other chunks are of no
+                    # use any more.
+                    for task in tasks:
+                        task.cancel()
+                    raise
+                span.set_attribute("outcome", "ok")
+            summarized = Document(content="\n\n".join(partial_summaries))
             print(
-                f"Valid report {idx+1}; Bert-Score-F1: {scores[0]}; Roger-Score-F1: {scores[1]}"
+                f"Map level {level}: {len(chunks)} chunks, "
+                f"{num_of_token} -> {count(summarized.content)} tokens"
             )
-            cur_report_score = sum(scores)  # sum scores of all scorers
-            if cur_report_score > best_report_score:
-                best_report_score = cur_report_score
-                best_report_id = idx
+            if count(summarized.content) >= num_of_token:
+                raise PartialSummariesTooLong(
+                    num_of_token=count(summarized.content),
+                    max_num_of_token=self._max_num_of_token_in_chunk,
+                )
+            document = summarized
+            level += 1
+        return document
 
-        return valid_reports[best_report_id]
+    async def _summarize_chunk(
+        self,
+        chunk: Document,
+        index: int,
+        num_of_chunks: int,
+        level: int,
+        compression_rate: float,
+        semaphore: asyncio.Semaphore,
+    ) -> str:
+        with get_tracer().span(
+            "prompt.render", template=self._chunk_prompt_template_file
+        ):
+            prompt = self._chunk_prompt_template.render(
+                {
+                    "index": index + 1,
+                    "num_of_parts": num_of_chunks,
+                    "max_num_of_token": max(
+                        int(
+                            compression_rate * self._token_counter.count(chunk.content)
+                        ),
+                        1,
+                    ),
+                    "chunk": chunk.content,
+                }
+            )
+        async with semaphore:
+            response = await parse_chat_completion(
+                client=self._llm_api_client,
+                model=self._model,
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant"},
+                    {"role": "user", "content": f"{prompt}"},
+                ],
+                response_format=PartialSummary,
+                chunk=index,
+                level=level,
+            )
+        return parse_structured_output(response.choices[0].message, PartialSummary).content
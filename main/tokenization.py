@@ -0,0 +1,152 @@
+"""tokenization module.
+
+Token counters for length requirements and prompt budgets:
+
+- ``whitespace``: whitespace-separated words, the default;
+- ``cl100k_base`` / ``o200k_base``: OpenAI BPE encodings, through tiktoken;
+- ``hf:<model>``: the fast tokenizer of a Hugging Face model, e.g.
+  ``hf:Qwen/Qwen3-8B``, through tokenizers.
+
+Counts are memoized by a hash of the text, so that the same document or
+report is tokenized once. tiktoken and tokenizers are imported on first use,
+and a counter is shared per process.
+"""
+
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict
+
+__all__ = [
+    "TOKEN_COUNTERS",
+    "TokenCounter",
+    "WhitespaceTokenCounter",
+    "TiktokenTokenCounter",
+    "HuggingFaceTokenCounter",
+    "get_token_counter",
+]
+
+
+class TokenCounter(ABC):
+
+    def __init__(self, max_cache_size: int = 4096):
+        self._max_cache_size = max_cache_size
+        self._cache: "OrderedDict[bytes, int]" = OrderedDict()
+        # Requests running in several threads share a counter.
+        self._lock = threading.Lock()
+        self._num_of_hits = 0
+        self._num_of_misses = 0
+
+    def __getstate__(self) -> dict:
+        # Sent to worker processes without its lock and cache.
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_cache"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def num_of_hits(self) -> int:
+        return self._num_of_hits
+
+    @property
+    def num_of_misses(self) -> int:
+        return self._num_of_misses
+
+    @abstractmethod
+    def _count(self, text: str) -> int:
+        pass
+
+    def count(self, text: str) -> int:
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self._num_of_hits += 1
+                return self._cache[key]
+        num_of_token = self._count(text)
+        with self._lock:
+            self._num_of_misses += 1
+            self._cache[key] = num_of_token
+            if len(self._cache) > self._max_cache_size:
+                self._cache.popitem(last=False)
+        return num_of_token
+
+
+class WhitespaceTokenCounter(TokenCounter):
+
+    def _count(self, text: str) -> int:
+        return len(text.split())
+
+
+class TiktokenTokenCounter(TokenCounter):
+
+    def __init__(self, encoding_name: str = "cl100k_base", **kwargs):
+        super().__init__(**kwargs)
+        self._encoding_name = encoding_name
+        self._encoding = None
+
+    def __getstate__(self) -> dict:
+        state = super().__getstate__()
+        state["_encoding"] = None
+        return state
+
+    def _count(self, text: str) -> int:
+        if self._encoding is None:
+            import tiktoken
+
+            self._encoding = tiktoken.get_encoding(self._encoding_name)
+        # Special tokens in the text are counted as plain text.
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+class HuggingFaceTokenCounter(TokenCounter):
+
+    def __init__(self, model_name: str, **kwargs):
+        super().__init__(**kwargs)
+        self._model_name = model_name
+        self._tokenizer = None
+
+    def __getstate__(self) -> dict:
+        state = super().__getstate__()
+        state["_tokenizer"] = None
+        return state
+
+    def _count(self, text: str) -> int:
+        if self._tokenizer is None:
+            from tokenizers import Tokenizer
+
+            self._tokenizer = Tokenizer.from_pretrained(self._model_name)
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+TOKEN_COUNTERS = {
+    "whitespace": (WhitespaceTokenCounter, {}),
+    "cl100k_base": (TiktokenTokenCounter, {"encoding_name": "cl100k_base"}),
+    "o200k_base": (TiktokenTokenCounter, {"encoding_name": "o200k_base"}),
+}
+
+_counters: Dict[str, TokenCounter] = {}
+_counters_lock = threading.Lock()
+
+
+def get_token_counter(name: str = "whitespace") -> TokenCounter:
+    """The process-wide counter registered as `name` in `TOKEN_COUNTERS`, or
+    the Hugging Face tokenizer of the model if `name` is ``hf:<model>``."""
+    if name not in TOKEN_COUNTERS and not name.startswith("hf:"):
+        raise ValueError(
+            f"Unknown token counter {name!r}, "
+            f"choose from {sorted(TOKEN_COUNTERS)} or 'hf:<model>'"
+        )
+    with _counters_lock:
+        if name not in _counters:
+            if name.startswith("hf:"):
+                _counters[name] = HuggingFaceTokenCounter(model_name=name[3:])
+            else:
+                counter_cls, kwargs = TOKEN_COUNTERS[name]
+                _counters[name] = counter_cls(**kwargs)
+        return _counters[name]
@@ -0,0 +1,292 @@
+"""tracing module.
+
+Timed spans for the stages of the summarization pipeline, with pluggable
+exporters. Instrumented code opens spans on the process-wide tracer::
+
+    with get_tracer().span("llm.call", model=model) as span:
+        ...
+        span.set_attribute("completion_tokens", 42)
+
+and exporters registered with `Tracer.add_exporter` receive every finished
+span.
+"""
+
+import bisect
+import contextvars
+import itertools
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+__all__ = [
+    "Span",
+    "SpanExporter",
+    "InMemorySpanExporter",
+    "LoggingSpanExporter",
+    "PrometheusSpanExporter",
+    "Tracer",
+    "get_tracer",
+    "set_tracer",
+]
+
+_span_ids = itertools.count(1)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class Span:
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, **attributes):
+        self._name = name
+        self._span_id = next(_span_ids)
+        self._parent_id = parent.span_id if parent else None
+        self._trace_id = parent.trace_id if parent else self._span_id
+        self._attributes = dict(attributes)
+        self._status = "ok"
+        self._start_time = time.perf_counter()
+        self._end_time: Optional[float] = None
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def span_id(self) -> int:
+        return self._span_id
+
+    @property
+    def parent_id(self) -> Optional[int]:
+        return self._parent_id
+
+    @property
+    def trace_id(self) -> int:
+        return self._trace_id
+
+    @property
+    def attributes(self) -> dict:
+        return self._attributes
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @property
+    def duration(self) -> float:
+        end_time = self._end_time if self._end_time is not None else time.perf_counter()
+        return end_time - self._start_time
+
+    def set_attribute(self, key: str, value) -> None:
+        self._attributes[key] = value
+
+    def set_error(self, exc: BaseException) -> None:
+        self._status = "error"
+        self._attributes["error"] = type(exc).__name__
+        self._attributes.setdefault("outcome", "error")
+
+    def end(self) -> None:
+        if self._end_time is None:
+            self._end_time = time.perf_counter()
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self._name,
+            "span_id": self._span_id,
+            "parent_id": self._parent_id,
+            "trace_id": self._trace_id,
+            "status": self._status,
+            "duration": self.duration,
+            "attributes": self._attributes,
+        }
+
+
+class SpanExporter(ABC):
+
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        """Receive a finished span."""
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keep finished spans in memory, mostly useful in tests and notebooks."""
+
+    def __init__(self):
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    @property
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+class LoggingSpanExporter(SpanExporter):
+    """Log every finished span as one JSON line."""
+
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO):
+        self._logger = logger or logging.getLogger("main.tracing")
+        self._level = level
+
+    def export(self, span: Span) -> None:
+        self._logger.log(self._level, json.dumps(span.to_dict(), default=str))
+
+
+class PrometheusSpanExporter(SpanExporter):
+    """Aggregate spans into latency histograms and counters.
+
+    `render` returns the Prometheus text exposition format, which is what a
+    `/metrics` endpoint serves.
+    """
+
+    DEFAULT_BUCKETS = (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+    )
+    # Attributes of a bounded set of values; the candidate index, job id and
+    # token counts would make a series per call.
+    _LABEL_ATTRIBUTES = ("model", "scorer", "requirement", "template", "outcome")
+    _TOKEN_ATTRIBUTES = ("prompt_tokens", "completion_tokens")
+
+    def __init__(self, namespace: str = "summarizer", buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self._namespace = namespace
+        self._buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # labels -> [bucket counts..., +Inf count], sum
+        self._histograms: Dict[Tuple, List] = {}
+        self._errors: Dict[Tuple, int] = {}
+        self._tokens: Dict[Tuple, int] = {}
+
+    def _labels(self, span: Span) -> Tuple:
+        labels = [("stage", span.name)]
+        for attribute in PrometheusSpanExporter._LABEL_ATTRIBUTES:
+            if attribute in span.attributes:
+                labels.append((attribute, str(span.attributes[attribute])))
+        return tuple(labels)
+
+    def export(self, span: Span) -> None:
+        labels = self._labels(span)
+        duration = span.duration
+        with self._lock:
+            counts, total = self._histograms.get(
+                labels, ([0] * (len(self._buckets) + 1), 0.0)
+            )
+            counts[bisect.bisect_left(self._buckets, duration)] += 1
+            self._histograms[labels] = (counts, total + duration)
+            if span.status == "error":
+                self._errors[labels] = self._errors.get(labels, 0) + 1
+            for attribute in PrometheusSpanExporter._TOKEN_ATTRIBUTES:
+                value = span.attributes.get(attribute)
+                if value:
+                    key = (
+                        ("model", str(span.attributes.get("model", ""))),
+                        ("kind", attribute.removesuffix("_tokens")),
+                    )
+                    self._tokens[key] = self._tokens.get(key, 0) + int(value)
+
+    @staticmethod
+    def _format_labels(labels: Tuple, extra: Tuple = ()) -> str:
+        pairs = [
+            '{}="{}"'.format(key, value.replace("\\", "\\\\").replace('"', '\\"'))
+            for key, value in labels + extra
+        ]
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> str:
+        name = f"{self._namespace}_stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Latency of each pipeline stage.",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            histograms = {k: (list(c), s) for k, (c, s) in self._histograms.items()}
+            errors = dict(self._errors)
+            tokens = dict(self._tokens)
+
+        for labels, (counts, total) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(self._buckets, counts):
+                cumulative += count
+                lines.append(
+                    f"{name}_bucket{self._format_labels(labels, (('le', repr(bound)),))} {cumulative}"
+                )
+            cumulative += counts[-1]
+            lines.append(
+                f"{name}_bucket{self._format_labels(labels, (('le', '+Inf'),))} {cumulative}"
+            )
+            lines.append(f"{name}_sum{self._format_labels(labels)} {total}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {cumulative}")
+
+        name = f"{self._namespace}_stage_errors_total"
+        lines.extend(
+            [
+                f"# HELP {name} Number of pipeline stages which raised an error.",
+                f"# TYPE {name} counter",
+            ]
+        )
+        for labels, count in sorted(errors.items()):
+            lines.append(f"{name}{self._format_labels(labels)} {count}")
+
+        name = f"{self._namespace}_llm_tokens_total"
+        lines.extend(
+            [
+                f"# HELP {name} Number of tokens consumed by LLM calls.",
+                f"# TYPE {name} counter",
+            ]
+        )
+        for labels, count in sorted(tokens.items()):
+            lines.append(f"{name}{self._format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+class Tracer:
+
+    def __init__(self, exporters: Optional[List[SpanExporter]] = None):
+        self._exporters: List[SpanExporter] = list(exporters or [])
+
+    @property
+    def exporters(self) -> List[SpanExporter]:
+        return list(self._exporters)
+
+    def add_exporter(self, exporter: SpanExporter) -> None:
+        self._exporters.append(exporter)
+
+    def remove_exporter(self, exporter: SpanExporter) -> None:
+        self._exporters.remove(exporter)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        span = Span(name, parent=_current_span.get(), **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.set_error(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+            for exporter in self._exporters:
+                exporter.export(span)
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def set_tracer(tracer: Tracer) -> None:
+    global _tracer
+    _tracer = tracer
@@ -0,0 +1,129 @@
+"""usage module.
+
+Token usage accounting for LLM calls. Usage is recorded into the ledger of the
+innermost `usage_scope` and rolls up into the enclosing ones, e.g.::
+
+    with usage_scope() as ledger:
+        report = await summarizer.summarize(document=document)
+    print(ledger.usage.total_tokens)
+
+A ledger may carry a `TokenBudget`; once it (or any enclosing ledger) is
+exhausted, no new LLM call is started.
+"""
+
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from pydantic import BaseModel
+
+__all__ = [
+    "TokenUsage",
+    "TokenBudget",
+    "UsageLedger",
+    "get_usage_ledger",
+    "usage_scope",
+]
+
+_current_ledger: contextvars.ContextVar[Optional["UsageLedger"]] = (
+    contextvars.ContextVar("current_usage_ledger", default=None)
+)
+
+
+class TokenUsage(BaseModel):
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    num_of_calls: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def __add__(self, other: "TokenUsage") -> "TokenUsage":
+        return TokenUsage(
+            prompt_tokens=self.prompt_tokens + other.prompt_tokens,
+            completion_tokens=self.completion_tokens + other.completion_tokens,
+            num_of_calls=self.num_of_calls + other.num_of_calls,
+        )
+
+
+class TokenBudget(BaseModel):
+    """Limits on tokens and / or cost; `None` means unlimited."""
+
+    max_total_tokens: Optional[int] = None
+    max_cost: Optional[float] = None
+    prompt_cost_per_1k_tokens: float = 0.0
+    completion_cost_per_1k_tokens: float = 0.0
+
+    def cost(self, usage: TokenUsage) -> float:
+        return (
+            usage.prompt_tokens * self.prompt_cost_per_1k_tokens
+            + usage.completion_tokens * self.completion_cost_per_1k_tokens
+        ) / 1000
+
+    def is_exhausted_by(self, usage: TokenUsage) -> bool:
+        if (
+            self.max_total_tokens is not None
+            and usage.total_tokens >= self.max_total_tokens
+        ):
+            return True
+        if self.max_cost is not None and self.cost(usage) >= self.max_cost:
+            return True
+        return False
+
+
+class UsageLedger:
+
+    def __init__(
+        self,
+        budget: Optional[TokenBudget] = None,
+        parent: Optional["UsageLedger"] = None,
+    ):
+        self._budget = budget
+        self._parent = parent
+        self._usage = TokenUsage()
+        self._lock = threading.Lock()
+
+    @property
+    def usage(self) -> TokenUsage:
+        with self._lock:
+            return self._usage.model_copy()
+
+    @property
+    def budget(self) -> Optional[TokenBudget]:
+        return self._budget
+
+    @property
+    def cost(self) -> float:
+        return self._budget.cost(self.usage) if self._budget else 0.0
+
+    def record(self, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            self._usage = self._usage + TokenUsage(
+                prompt_tokens=prompt_tokens or 0,
+                completion_tokens=completion_tokens or 0,
+                num_of_calls=1,
+            )
+        if self._parent is not None:
+            self._parent.record(prompt_tokens, completion_tokens)
+
+    def is_exhausted(self) -> bool:
+        if self._budget is not None and self._budget.is_exhausted_by(self.usage):
+            return True
+        return self._parent is not None and self._parent.is_exhausted()
+
+
+def get_usage_ledger() -> Optional[UsageLedger]:
+    return _current_ledger.get()
+
+
+@contextmanager
+def usage_scope(budget: Optional[TokenBudget] = None) -> Iterator[UsageLedger]:
+    """Open a ledger nested in the current one for the duration of the block."""
+    ledger = UsageLedger(budget=budget, parent=_current_ledger.get())
+    token = _current_ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _current_ledger.reset(token)
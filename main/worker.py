@@ -0,0 +1,163 @@
+"""worker module.
+
+Run summarization jobs from a `SQLiteJobQueue`. Start as many workers as the
+inference endpoints can take, on any machine which can reach the queue file:
+
+    python -m main.worker --queue jobs.sqlite --base-url http://localhost:11434/v1
+
+The summarizer is set up as in the web app, from the environment variables of
+`main.config`, each of which can be overridden by an option, e.g.
+``--bert-score-backend int8 --fast-judge``.
+
+A job's payload is ``{"text": ..., "options": {...}}``, the options being
+keyword arguments of `BestHitLLMSummarizer` chosen per request; its result is
+the report and the tokens used.
+"""
+
+import argparse
+import asyncio
+import sys
+from typing import Awaitable, Callable, List, Optional
+
+from openai import AsyncOpenAI
+
+from main.backend_pool import LLMBackendPool
+from main.config import SummarizerConfig, SummarizerFactory
+from main.document import Document
+from main.job_queue import Job, SQLiteJobQueue
+from main.tracing import get_tracer
+from main.usage import usage_scope
+
+__all__ = [
+    "JobHandler",
+    "Worker",
+    "build_summarize_handler",
+]
+
+JobHandler = Callable[[dict], Awaitable[dict]]
+
+
+def build_summarize_handler(
+    summarizers: SummarizerFactory, **summarizer_kwargs
+) -> JobHandler:
+    """Summarize the job's text within the configured token budget; job
+    options override `summarizer_kwargs`, which override the configuration."""
+
+    async def handle(payload: dict) -> dict:
+        options = {**summarizer_kwargs, **payload.get("options", {})}
+        summarizer = summarizers.create(**options)
+        with usage_scope(budget=summarizers.config.token_budget()) as ledger:
+            report = await summarizer.summarize(
+                document=Document(content=payload["text"])
+            )
+        return {"report": report.model_dump(), "usage": ledger.usage.model_dump()}
+
+    return handle
+
+
+class Worker:
+
+    def __init__(
+        self,
+        queue: SQLiteJobQueue,
+        handler: JobHandler,
+        poll_interval: float = 1.0,
+        heartbeat_interval: float = 60.0,
+    ):
+        self._queue = queue
+        self._handler = handler
+        self._poll_interval = poll_interval
+        # Extend the visibility of a running job this often; keep it well
+        # below the queue's visibility timeout.
+        self._heartbeat_interval = heartbeat_interval
+
+    async def _heartbeat(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(self._heartbeat_interval)
+            await asyncio.to_thread(self._queue.extend, job)
+
+    async def run_once(self) -> bool:
+        """Run one job, False if there was none to claim."""
+        # SQLite may wait for the write lock, off the event loop.
+        job = await asyncio.to_thread(self._queue.claim)
+        if job is None:
+            return False
+
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        with get_tracer().span("job.run", job=job.id, attempt=job.attempts) as span:
+            try:
+                result = await self._handler(job.payload)
+            except Exception as e:
+                await asyncio.to_thread(
+                    self._queue.fail, job, f"{type(e).__name__}: {e}"
+                )
+                span.set_error(e)
+            else:
+                await asyncio.to_thread(self._queue.complete, job, result)
+                span.set_attribute("outcome", "ok")
+            finally:
+                heartbeat.cancel()
+        return True
+
+    async def run(self, max_jobs: Optional[int] = None, stop_when_idle: bool = False) -> int:
+        """Run jobs until `max_jobs` ran or, if `stop_when_idle`, none is left."""
+        num_of_jobs = 0
+        while max_jobs is None or num_of_jobs < max_jobs:
+            if await self.run_once():
+                num_of_jobs += 1
+            elif stop_when_idle:
+                break
+            else:
+                await asyncio.sleep(self._poll_interval)
+        return num_of_jobs
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run summarization jobs from a queue.")
+    parser.add_argument("--queue", required=True)
+    parser.add_argument(
+        "--base-url",
+        nargs="+",
+        default=["http://localhost:11434/v1"],
+        help="several URLs spread the calls over an LLM backend pool",
+    )
+    parser.add_argument("--api-key", default="dummy_key")
+    parser.add_argument("--concurrency", type=int, default=1, help="jobs run at once")
+    parser.add_argument("--visibility-timeout", type=float, default=300.0)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    SummarizerConfig.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if len(args.base_url) > 1:
+        client = LLMBackendPool.from_urls(args.base_url, api_key=args.api_key)
+        client.start_health_checks()
+    else:
+        client = AsyncOpenAI(base_url=args.base_url[0], api_key=args.api_key)
+    queue = SQLiteJobQueue(
+        path=args.queue,
+        visibility_timeout=args.visibility_timeout,
+        max_attempts=args.max_attempts,
+    )
+    summarizers = SummarizerFactory(
+        client=client, config=SummarizerConfig.from_args(args)
+    )
+    worker = Worker(
+        queue=queue,
+        handler=build_summarize_handler(summarizers),
+        heartbeat_interval=args.visibility_timeout / 3,
+    )
+
+    async def run() -> None:
+        await asyncio.gather(*[worker.run() for _ in range(args.concurrency)])
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        summarizers.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Fakes and fixtures shared by the tests."""
+
+import asyncio
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from main.bert_backends import BertScoreBackend
+from main.document import Document
+from main.llm_as_judge import Judgement, ReferenceBasedJudge, TopicBasedJudge
+from main.report import Report
+from main.tokenization import TokenCounter
+
+
+def completion(content: str, prompt_tokens: int = 100, completion_tokens: int = 20):
+    """A chat completion answering `content`, as returned by the API client."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+        ),
+    )
+
+
+def mock_client(report: Report, prompt_tokens: int = 100, completion_tokens: int = 20):
+    """A client answering every request with `report`."""
+    client = MagicMock()
+    client.beta.chat.completions.parse = AsyncMock(
+        return_value=completion(
+            report.model_dump_json(), prompt_tokens, completion_tokens
+        )
+    )
+    return client
+
+
+class ConstantBertScoreBackend(BertScoreBackend):
+
+    def __init__(self):
+        super().__init__(model_type="constant")
+        self.num_of_scored = 0
+
+    def _load(self):
+        return None
+
+    def score(self, cands, refs):
+        self.num_of_scored += len(cands)
+        return [0.75 for _ in cands]
+
+
+class CharacterTokenCounter(TokenCounter):
+
+    def _count(self, text: str) -> int:
+        return len(text)
+
+
+class CountingJudge(ReferenceBasedJudge, TopicBasedJudge):
+    """Judges statements / reports containing "UCLA" true, counting the calls
+    and how many run at once."""
+
+    def __init__(self):
+        self.num_of_calls = 0
+        self.num_of_running = 0
+        self.max_num_of_running = 0
+
+    async def run(self, statement=None, reference=None, topic=None, report=None):
+        self.num_of_calls += 1
+        self.num_of_running += 1
+        self.max_num_of_running = max(self.max_num_of_running, self.num_of_running)
+        await asyncio.sleep(0.01)
+        self.num_of_running -= 1
+        content = statement.content if statement is not None else report.content
+        return Judgement(decision="UCLA" in content, reason=content)
+
+
+class Clock:
+    """A clock which only moves when `now` is set."""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ArticleTestCase(unittest.TestCase):
+    """Loads `data/article.txt` and a valid report of it: its first 20% words,
+    in two paragraphs."""
+
+    def setUp(self):
+        input_file_path = os.path.join("data", "article.txt")
+        self.document = Document.load_from_local(input_file_path=input_file_path)
+        self.words = self.document.content.split()
+        self.num_of_word = int(0.2 * len(self.words))
+        self.report = self.report_of(0)
+
+    def report_of(self, start: int, num_of_word: int = 0) -> Report:
+        """A report of `num_of_word` words of the article from `start`, in two
+        paragraphs; 20% of the article by default."""
+        num_of_word = num_of_word or self.num_of_word
+        words = self.words[start : start + num_of_word]
+        return Report(
+            title="Foster care in Scotland",
+            content=" ".join(words[: num_of_word // 2])
+            + "\n\n"
+            + " ".join(words[num_of_word // 2 :]),
+        )
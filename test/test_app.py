@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import app
+from main.job_queue import SQLiteJobQueue
+
+
+class TestQueuedSummarize(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.queue = SQLiteJobQueue(path=os.path.join(self.directory.name, "jobs.sqlite"))
+        patcher = mock.patch.object(app, "_job_queue", self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = app.app.test_client()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_poll_job(self) -> None:
+        # The request the page sends, then the job it polls.
+        response = self.client.post(
+            "/summarize",
+            json={
+                "text": "UCLA is a university.",
+                "include_title": True,
+                "num_paragraph": 2,
+                "compression_rate": 0.2,
+            },
+        )
+        self.assertEqual(response.status_code, 202)
+        location = response.headers["Location"]
+        self.assertEqual(location, f"/jobs/{response.get_json()['job_id']}")
+        self.assertEqual(self.client.get(location).get_json()["status"], "queued")
+
+        job = self.queue.claim()
+        self.assertEqual(job.payload["options"]["max_num_of_paragraph"], 3)
+        self.queue.complete(job, {"title": "UCLA", "content": "A university."})
+        job = self.client.get(location).get_json()
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["result"], {"title": "UCLA", "content": "A university."})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+from openai import APIConnectionError
+
+from main.backend_pool import LLMBackendPool, LLMEndpoint
+from main.completion import parse_chat_completion
+from main.report import Report
+from test.helpers import Clock
+
+
+def _endpoint(name: str) -> LLMEndpoint:
+    client = MagicMock()
+    client.name = name
+    return LLMEndpoint(base_url=f"http://{name}:11434/v1", client=client)
+
+
+class TestLLMBackendPool(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.clock = Clock()
+        self.pool = LLMBackendPool(
+            endpoints=[_endpoint("a"), _endpoint("b")],
+            max_failures=2,
+            eject_seconds=30.0,
+            clock=self.clock,
+        )
+
+    def test_requires_endpoint(self) -> None:
+        with self.assertRaises(ValueError):
+            LLMBackendPool(endpoints=[])
+
+    def test_least_outstanding(self) -> None:
+        async def run():
+            async with self.pool.acquire() as first:
+                async with self.pool.acquire() as second:
+                    return first.name, second.name
+
+        first, second = asyncio.run(run())
+        self.assertNotEqual(first, second)
+        for endpoint in self.pool.endpoints:
+            self.assertEqual(endpoint.num_of_outstanding, 0)
+
+    def test_eject_failing_endpoint(self) -> None:
+        failing = self.pool.endpoints[0]
+        request = httpx.Request("POST", failing.base_url)
+
+        async def fail_on(name: str):
+            async with self.pool.acquire() as client:
+                if client.name == name:
+                    raise APIConnectionError(request=request)
+
+        async def run():
+            for _ in range(4):
+                try:
+                    await fail_on("a")
+                except APIConnectionError:
+                    pass
+
+        asyncio.run(run())
+        self.assertEqual(self.pool.healthy_endpoints(), [self.pool.endpoints[1]])
+
+        # Re-admitted once the ejection is over.
+        self.clock.now += 31.0
+        self.assertEqual(len(self.pool.healthy_endpoints()), 2)
+
+    def test_other_errors_do_not_eject(self) -> None:
+        async def run():
+            for _ in range(4):
+                try:
+                    async with self.pool.acquire():
+                        raise ValueError("bad request")
+                except ValueError:
+                    pass
+
+        asyncio.run(run())
+        self.assertEqual(len(self.pool.healthy_endpoints()), 2)
+
+    def test_all_ejected(self) -> None:
+        for endpoint in self.pool.endpoints:
+            endpoint.ejected_until = 100.0
+
+        async def run():
+            async with self.pool.acquire() as client:
+                return client
+
+        self.assertIsNotNone(asyncio.run(run()))
+
+    def test_health_checks_restart_after_fork(self) -> None:
+        with patch.object(self.pool, "check_health"), patch(
+            "main.backend_pool.os.register_at_fork"
+        ) as register_at_fork:
+            self.pool.start_health_checks(interval=60.0)
+            parent_thread = self.pool._health_checker
+            register_at_fork.call_args.kwargs["after_in_child"]()
+        self.assertIsNot(self.pool._health_checker, parent_thread)
+        self.assertTrue(self.pool._health_checker.is_alive())
+
+    def test_check_health(self) -> None:
+        first, second = self.pool.endpoints
+        with patch.object(LLMEndpoint, "probe", lambda self, timeout: self is second):
+            self.pool.check_health()
+        self.assertEqual(self.pool.healthy_endpoints(), [second])
+        with patch.object(LLMEndpoint, "probe", lambda self, timeout: True):
+            self.pool.check_health()
+        self.assertEqual(len(self.pool.healthy_endpoints()), 2)
+
+    def test_parse_chat_completion(self) -> None:
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="{}"))],
+            usage=None,
+        )
+        for endpoint in self.pool.endpoints:
+            endpoint.client.beta.chat.completions.parse = AsyncMock(
+                return_value=response
+            )
+
+        async def run():
+            return await asyncio.gather(
+                *[
+                    parse_chat_completion(
+                        client=self.pool,
+                        model="m",
+                        messages=[],
+                        response_format=Report,
+                    )
+                    for _ in range(4)
+                ]
+            )
+
+        asyncio.run(run())
+        for endpoint in self.pool.endpoints:
+            self.assertEqual(
+                endpoint.client.beta.chat.completions.parse.await_count, 2
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
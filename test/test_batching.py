@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from main.batching import BatchingBertScoreBackend
+from main.bert_backends import BertScoreBackend
+
+
+class _RecordingBertScoreBackend(BertScoreBackend):
+    """Score = number of words in the candidate, records the batch sizes."""
+
+    def __init__(self):
+        super().__init__(model_type="recording")
+        self.batch_sizes = []
+
+    def _load(self):
+        return object()
+
+    def score(self, cands, refs):
+        self.batch_sizes.append(len(cands))
+        if "fail" in cands:
+            raise ValueError("cannot score")
+        return [float(len(cand.split())) for cand in cands]
+
+
+class TestBatchingBertScoreBackend(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.inner = _RecordingBertScoreBackend()
+        self.backend = BatchingBertScoreBackend(
+            backend=self.inner, max_batch_size=8, max_wait_seconds=0.05
+        )
+
+    def tearDown(self) -> None:
+        self.backend.close()
+
+    def test_score(self) -> None:
+        self.assertEqual(
+            self.backend.score(cands=["a", "a b", "a b c"], refs=["r"] * 3),
+            [1.0, 2.0, 3.0],
+        )
+        self.assertEqual(self.inner.batch_sizes, [3])
+
+    def test_concurrent_callers_share_a_batch(self) -> None:
+        async def run():
+            return await asyncio.gather(
+                *[
+                    self.backend.score_async(cands=["a " * n], refs=["r"])
+                    for n in range(1, 6)
+                ]
+            )
+
+        results = asyncio.run(run())
+        self.assertEqual(results, [[1.0], [2.0], [3.0], [4.0], [5.0]])
+        self.assertEqual(self.inner.batch_sizes, [5])
+
+    def test_batches_across_event_loops(self) -> None:
+        results = {}
+
+        def request(n: int) -> None:
+            results[n] = asyncio.run(
+                self.backend.score_async(cands=["a " * n], refs=["r"])
+            )
+
+        threads = [threading.Thread(target=request, args=(n,)) for n in range(1, 4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, {1: [1.0], 2: [2.0], 3: [3.0]})
+        self.assertLess(len(self.inner.batch_sizes), 3)
+
+    def test_max_batch_size(self) -> None:
+        self.backend.score(cands=["a"] * 20, refs=["r"] * 20)
+        self.assertEqual(self.inner.batch_sizes, [8, 8, 4])
+
+    def test_worker_restarts_after_fork(self) -> None:
+        self.backend.score(cands=["a"], refs=["r"])
+        parent_worker = self.backend._worker
+        with mock.patch("main.batching.os.getpid", return_value=-1):
+            self.assertEqual(self.backend.score(cands=["a b"], refs=["r"]), [2.0])
+        self.assertIsNot(self.backend._worker, parent_worker)
+
+    def test_error(self) -> None:
+        with self.assertRaises(ValueError):
+            self.backend.score(cands=["fail"], refs=["r"])
+
+
+if __name__ == "__main__":
+    unittest.main()
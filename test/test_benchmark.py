@@ -0,0 +1,159 @@
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from main.benchmark import (
+    BenchmarkBaseline,
+    BenchmarkCase,
+    BenchmarkResult,
+    SyntheticCorpus,
+    _OfflineLLMClient,
+    compare_with_baseline,
+    main,
+    run_benchmarks,
+)
+from main.llm_as_judge import Judgement
+
+
+def _result(target: str, best_seconds: float) -> BenchmarkResult:
+    return BenchmarkResult(
+        case=BenchmarkCase(target=target, document_size=1000, num_of_candidate=1),
+        repeats=1,
+        best_seconds=best_seconds,
+        mean_seconds=best_seconds,
+    )
+
+
+class TestSyntheticCorpus(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.corpus = SyntheticCorpus(seed=7)
+
+    def test_document_size(self) -> None:
+        for size in (1_000, 10_000):
+            document = self.corpus.document(size)
+            self.assertLessEqual(len(document.content), size)
+            self.assertGreater(len(document.content), size - 100)
+
+    def test_document_is_deterministic(self) -> None:
+        self.assertEqual(
+            self.corpus.document(1_000).content,
+            SyntheticCorpus(seed=7).document(1_000).content,
+        )
+
+    def test_reports(self) -> None:
+        document = self.corpus.document(10_000)
+        reports = self.corpus.reports(document, num_of_candidate=5)
+        self.assertEqual(len(reports), 5)
+        for report in reports:
+            self.assertTrue(report.title)
+            self.assertGreaterEqual(len(report.content.split("\n\n")), 2)
+
+
+class TestOfflineLLMClient(unittest.TestCase):
+
+    def test_parse(self) -> None:
+        response = asyncio.run(
+            _OfflineLLMClient().beta.chat.completions.parse(
+                model="offline", messages=[], response_format=Judgement
+            )
+        )
+        judgement = Judgement.model_validate_json(response.choices[0].message.content)
+        self.assertTrue(judgement.decision)
+
+
+class TestCompareWithBaseline(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.baseline = BenchmarkBaseline(
+            environment={},
+            results=[_result("RougeScoreMetricExtractor", 0.010)],
+        )
+
+    def test_no_regression(self) -> None:
+        results = [_result("RougeScoreMetricExtractor", 0.011)]
+        self.assertEqual(compare_with_baseline(results, self.baseline), [])
+
+    def test_regression(self) -> None:
+        results = [_result("RougeScoreMetricExtractor", 0.020)]
+        regressions = compare_with_baseline(results, self.baseline, max_slowdown=1.5)
+        self.assertEqual(len(regressions), 1)
+        self.assertAlmostEqual(regressions[0].slowdown, 2.0)
+
+    def test_save_and_load(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            output_file_path = os.path.join(directory, "baseline.json")
+            self.baseline.save(output_file_path)
+            self.assertEqual(BenchmarkBaseline.load(output_file_path), self.baseline)
+
+
+class TestRunBenchmarks(unittest.TestCase):
+
+    def test_repeats_compute_features(self) -> None:
+        timed = []
+
+        def time_once(target, reports) -> float:
+            # No repeat reuses the features cached by an earlier one.
+            self.assertFalse(any("_features" in vars(report) for report in reports))
+            for report in reports:
+                target(report)
+            timed.append(reports)
+            return 0.0
+
+        with mock.patch(
+            "main.benchmark._time_once", side_effect=time_once
+        ), contextlib.redirect_stdout(io.StringIO()):
+            run_benchmarks(
+                document_sizes=[1000],
+                candidate_counts=[2],
+                targets=["HasTitleMetricExtractor"],
+                repeats=2,
+            )
+        # The warm-up and two repeats.
+        self.assertEqual(len(timed), 3)
+        self.assertIsNot(timed[1][0], timed[2][0])
+
+
+class TestMain(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.baseline_path = os.path.join(self.directory.name, "baseline.json")
+        self.args = [
+            "--baseline",
+            self.baseline_path,
+            "--targets",
+            "HasTitleMetricExtractor",
+            "--sizes",
+            "1000",
+            "--candidates",
+            "1",
+            "--repeats",
+            "1",
+        ]
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def _main(self, args) -> int:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+            io.StringIO()
+        ):
+            return main(args)
+
+    def test_missing_baseline(self) -> None:
+        self.assertNotEqual(self._main(self.args), 0)
+        self.assertFalse(os.path.exists(self.baseline_path))
+
+    def test_update_baseline(self) -> None:
+        self.assertEqual(self._main(self.args + ["--update-baseline"]), 0)
+        self.assertTrue(os.path.exists(self.baseline_path))
+        self.assertEqual(self._main(self.args + ["--max-slowdown", "1000"]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
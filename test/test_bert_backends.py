@@ -0,0 +1,46 @@
+import pickle
+import unittest
+
+from main.bert_backends import (
+    OnnxBertScoreBackend,
+    TorchBertScoreBackend,
+    get_bert_score_backend,
+)
+
+
+class TestGetBertScoreBackend(unittest.TestCase):
+
+    def test_backends(self) -> None:
+        self.assertIsInstance(get_bert_score_backend("float32"), TorchBertScoreBackend)
+        self.assertIsInstance(get_bert_score_backend("int8"), TorchBertScoreBackend)
+        self.assertEqual(
+            get_bert_score_backend("distilled").model_type, "distilbert-base-uncased"
+        )
+        self.assertIsInstance(get_bert_score_backend("onnx"), OnnxBertScoreBackend)
+
+    def test_shared_per_process(self) -> None:
+        self.assertIs(
+            get_bert_score_backend("int8", num_threads=2),
+            get_bert_score_backend("int8", num_threads=2),
+        )
+        self.assertIsNot(
+            get_bert_score_backend("int8", num_threads=2),
+            get_bert_score_backend("int8", num_threads=4),
+        )
+
+    def test_unknown_backend(self) -> None:
+        with self.assertRaises(ValueError):
+            get_bert_score_backend("fp4")
+
+    def test_pickle(self) -> None:
+        backend = get_bert_score_backend("distilled")
+        self.assertIs(pickle.loads(pickle.dumps(backend)), backend)
+
+        unregistered = TorchBertScoreBackend(model_type="roberta-large")
+        copy = pickle.loads(pickle.dumps(unregistered))
+        self.assertIsNot(copy, unregistered)
+        self.assertEqual(copy.model_type, "roberta-large")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import asyncio
+import unittest
+
+from main.caching import AsyncMemo
+
+
+class TestAsyncMemo(unittest.TestCase):
+
+    def test_coalesce_concurrent_calls(self):
+        memo = AsyncMemo()
+        num_of_calls = 0
+
+        async def compute():
+            nonlocal num_of_calls
+            num_of_calls += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        async def run():
+            return await asyncio.gather(
+                *[memo.get_or_compute("key", compute) for _ in range(5)]
+            )
+
+        self.assertEqual(asyncio.run(run()), ["value"] * 5)
+        self.assertEqual(num_of_calls, 1)
+        self.assertEqual(memo.num_of_misses, 1)
+        self.assertEqual(memo.num_of_hits, 4)
+
+    def test_keep_result(self):
+        memo = AsyncMemo()
+
+        async def run():
+            first = await memo.get_or_compute("key", lambda: asyncio.sleep(0, "a"))
+            second = await memo.get_or_compute("key", lambda: asyncio.sleep(0, "b"))
+            other = await memo.get_or_compute("other", lambda: asyncio.sleep(0, "c"))
+            return first, second, other
+
+        self.assertEqual(asyncio.run(run()), ("a", "a", "c"))
+        self.assertEqual(len(memo), 2)
+
+    def test_forget_failure(self):
+        memo = AsyncMemo()
+
+        async def fail():
+            raise RuntimeError("failed")
+
+        async def run():
+            with self.assertRaises(RuntimeError):
+                await memo.get_or_compute("key", fail)
+            return await memo.get_or_compute("key", lambda: asyncio.sleep(0, "ok"))
+
+        self.assertEqual(asyncio.run(run()), "ok")
+        self.assertEqual(memo.num_of_misses, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
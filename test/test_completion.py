@@ -0,0 +1,241 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from openai import LengthFinishReasonError
+from pydantic import ValidationError
+
+from main.completion import parse_chat_completion, stream_chat_completion
+from main.customized_exceptions import GenerationAborted, TokenBudgetExceeded
+from main.report import Report
+from main.tracing import InMemorySpanExporter, get_tracer
+from main.usage import TokenBudget, usage_scope
+
+
+class TestParseChatCompletion(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.response = SimpleNamespace(
+            choices=[
+                SimpleNamespace(
+                    message=SimpleNamespace(content='{"title": "UCLA", "content": "UCLA"}')
+                )
+            ],
+            usage=SimpleNamespace(prompt_tokens=12, completion_tokens=7),
+        )
+        self.client = MagicMock()
+        self.client.beta.chat.completions.parse = AsyncMock(return_value=self.response)
+        self.exporter = InMemorySpanExporter()
+        get_tracer().add_exporter(self.exporter)
+
+    def tearDown(self) -> None:
+        get_tracer().remove_exporter(self.exporter)
+
+    def test_span(self) -> None:
+        response = asyncio.run(
+            parse_chat_completion(
+                client=self.client,
+                model="deepseek-r1:8b",
+                messages=[],
+                response_format=Report,
+                candidate=3,
+            )
+        )
+        self.assertIs(response, self.response)
+        (span,) = self.exporter.spans
+        self.assertEqual(span.name, "llm.call")
+        self.assertEqual(span.attributes["model"], "deepseek-r1:8b")
+        self.assertEqual(span.attributes["candidate"], 3)
+        self.assertEqual(span.attributes["prompt_tokens"], 12)
+        self.assertEqual(span.attributes["completion_tokens"], 7)
+
+    def _parse(self):
+        return parse_chat_completion(
+            client=self.client,
+            model="deepseek-r1:8b",
+            messages=[],
+            response_format=Report,
+        )
+
+    def test_request_options(self) -> None:
+        asyncio.run(
+            parse_chat_completion(
+                client=self.client,
+                model="deepseek-r1:8b",
+                messages=[],
+                response_format=Report,
+                request_options={"max_tokens": 16},
+            )
+        )
+        call = self.client.beta.chat.completions.parse.await_args
+        self.assertEqual(call.kwargs["max_tokens"], 16)
+        (span,) = self.exporter.spans
+        self.assertNotIn("request_options", span.attributes)
+
+    def test_salvage_truncated(self) -> None:
+        self.client.beta.chat.completions.parse = AsyncMock(
+            side_effect=LengthFinishReasonError(completion=self.response)
+        )
+        response = asyncio.run(
+            parse_chat_completion(
+                client=self.client, model="m", messages=[], response_format=Report
+            )
+        )
+        self.assertIs(response, self.response)
+        (span,) = self.exporter.spans
+        self.assertEqual(span.attributes["finish_reason"], "length")
+
+    def test_salvage_invalid_json(self) -> None:
+        content = '```json\n{"title": "UCLA", "content": "UCLA",}\n```'
+        try:
+            Report.model_validate_json(content)
+        except ValidationError as e:
+            error = e
+        self.client.beta.chat.completions.parse = AsyncMock(side_effect=error)
+        response = asyncio.run(
+            parse_chat_completion(
+                client=self.client, model="m", messages=[], response_format=Report
+            )
+        )
+        self.assertEqual(response.choices[0].message.content, content)
+
+    def test_invalid_object(self) -> None:
+        try:
+            Report.model_validate_json('{"title": "UCLA"}')
+        except ValidationError as e:
+            error = e
+        self.client.beta.chat.completions.parse = AsyncMock(side_effect=error)
+        with self.assertRaises(ValidationError):
+            asyncio.run(
+                parse_chat_completion(
+                    client=self.client, model="m", messages=[], response_format=Report
+                )
+            )
+
+    def test_usage(self) -> None:
+        with usage_scope() as ledger:
+            asyncio.run(self._parse())
+            asyncio.run(self._parse())
+        self.assertEqual(ledger.usage.prompt_tokens, 24)
+        self.assertEqual(ledger.usage.completion_tokens, 14)
+        self.assertEqual(ledger.usage.num_of_calls, 2)
+
+    def test_budget(self) -> None:
+        with usage_scope(budget=TokenBudget(max_total_tokens=19)):
+            asyncio.run(self._parse())
+            with self.assertRaises(TokenBudgetExceeded):
+                asyncio.run(self._parse())
+        self.assertEqual(self.client.beta.chat.completions.parse.await_count, 1)
+
+
+class _FakeStream:
+
+    def __init__(self, deltas, final_completion, error=None):
+        self._deltas = deltas
+        self._final_completion = final_completion
+        self._error = error
+        self.num_of_delta_sent = 0
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.closed = True
+
+    async def __aiter__(self):
+        for delta in self._deltas:
+            self.num_of_delta_sent += 1
+            yield SimpleNamespace(type="chunk")
+            yield SimpleNamespace(type="content.delta", delta=delta)
+
+    async def get_final_completion(self):
+        if self._error is not None:
+            raise self._error
+        return self._final_completion
+
+
+class TestStreamChatCompletion(unittest.TestCase):
+
+    def setUp(self) -> None:
+        content = '{"title": "UCLA", "content": "UCLA is a public university"}'
+        self.final_completion = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=30, completion_tokens=10),
+        )
+        self.stream = _FakeStream(
+            deltas=[content[i : i + 4] for i in range(0, len(content), 4)],
+            final_completion=self.final_completion,
+        )
+        self.client = MagicMock()
+        self.client.beta.chat.completions.stream = MagicMock(return_value=self.stream)
+
+    def _stream(self, on_delta):
+        return stream_chat_completion(
+            client=self.client,
+            model="deepseek-r1:8b",
+            messages=[],
+            response_format=Report,
+            on_delta=on_delta,
+        )
+
+    def test_complete(self) -> None:
+        deltas = []
+        with usage_scope() as ledger:
+            response = asyncio.run(self._stream(lambda delta: deltas.append(delta)))
+        self.assertIs(response, self.final_completion)
+        self.assertEqual("".join(deltas), self.final_completion.choices[0].message.content)
+        self.assertEqual(ledger.usage.total_tokens, 40)
+
+    def test_salvage_truncated(self) -> None:
+        self.stream._error = LengthFinishReasonError(completion=self.final_completion)
+        exporter = InMemorySpanExporter()
+        get_tracer().add_exporter(exporter)
+        try:
+            response = asyncio.run(self._stream(lambda delta: False))
+        finally:
+            get_tracer().remove_exporter(exporter)
+        self.assertIs(response, self.final_completion)
+        (span,) = exporter.spans
+        self.assertEqual(span.attributes["finish_reason"], "length")
+
+    def test_salvage_invalid_json(self) -> None:
+        content = '{"title": "UCLA", "content": "UCLA",}'
+        try:
+            Report.model_validate_json(content)
+        except ValidationError as e:
+            self.stream._error = e
+        response = asyncio.run(self._stream(lambda delta: False))
+        self.assertEqual(response.choices[0].message.content, content)
+
+    def test_abort(self) -> None:
+        with usage_scope() as ledger:
+            with self.assertRaises(GenerationAborted):
+                asyncio.run(self._stream(lambda delta: "," in delta))
+        self.assertTrue(self.stream.closed)
+        self.assertLess(self.stream.num_of_delta_sent, len(self.stream._deltas))
+        self.assertEqual(
+            ledger.usage.completion_tokens, self.stream.num_of_delta_sent
+        )
+
+    def test_abort_prompt_tokens(self) -> None:
+        with usage_scope() as ledger:
+            with self.assertRaises(GenerationAborted):
+                asyncio.run(
+                    stream_chat_completion(
+                        client=self.client,
+                        model="deepseek-r1:8b",
+                        messages=[
+                            {"role": "system", "content": "You are a helpful assistant"},
+                            {"role": "user", "content": "Summarize UCLA"},
+                        ],
+                        response_format=Report,
+                        on_delta=lambda delta: True,
+                    )
+                )
+        self.assertEqual(ledger.usage.prompt_tokens, 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
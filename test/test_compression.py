@@ -0,0 +1,83 @@
+import os
+import unittest
+
+from main.compression import ExtractiveCompressor, split_into_sentences
+from main.document import Document
+from main.tokenization import get_token_counter
+
+
+class TestSplitIntoSentences(unittest.TestCase):
+
+    def test_split(self):
+        paragraphs = split_into_sentences('One. "Two?" Three!\n\n\nFour. Five')
+        self.assertEqual(paragraphs, [["One.", '"Two?"', "Three!"], ["Four.", "Five"]])
+
+
+class TestExtractiveCompressor(unittest.TestCase):
+
+    def setUp(self):
+        input_file_path = os.path.join("data", "article.txt")
+        self.document = Document.load_from_local(input_file_path=input_file_path)
+
+    def test_short_document_is_unchanged(self):
+        compressor = ExtractiveCompressor(max_num_of_token=1000)
+        result = compressor.compress(self.document)
+        self.assertIs(result.document, self.document)
+        self.assertEqual(result.compression_ratio, 1.0)
+
+    def test_compress(self):
+        for method in ("textrank", "tfidf"):
+            with self.subTest(method=method):
+                compressor = ExtractiveCompressor(max_num_of_token=150, method=method)
+                result = compressor.compress(self.document)
+                num_of_token_after = get_token_counter().count(result.document.content)
+                self.assertLessEqual(num_of_token_after, 150)
+                self.assertEqual(result.num_of_token_after, num_of_token_after)
+                self.assertEqual(
+                    result.num_of_token_before,
+                    get_token_counter().count(self.document.content),
+                )
+                self.assertLess(result.compression_ratio, 0.35)
+                # Whole sentences, in their original order.
+                sentences = [
+                    sentence
+                    for paragraph in split_into_sentences(result.document.content)
+                    for sentence in paragraph
+                ]
+                positions = [self.document.content.index(s) for s in sentences]
+                self.assertEqual(positions, sorted(positions))
+
+    def test_central_sentences_are_kept(self):
+        document = Document(
+            content="Foster carers are needed in Scotland. "
+            "Scotland needs more foster carers. "
+            "The weather was sunny on Tuesday afternoon. "
+            "More foster carers are needed."
+        )
+        compressor = ExtractiveCompressor(max_num_of_token=12)
+        result = compressor.compress(document)
+        self.assertNotIn("weather", result.document.content)
+
+    def test_no_sentence_fits(self):
+        document = Document(
+            content="Foster carers are needed in Scotland this winter. "
+            "Scotland needs many more foster carers for older children."
+        )
+        compressor = ExtractiveCompressor(max_num_of_token=4)
+        result = compressor.compress(document)
+        self.assertEqual(result.num_of_token_after, 4)
+        self.assertEqual(get_token_counter().count(result.document.content), 4)
+        self.assertTrue(
+            any(
+                sentence.startswith(result.document.content)
+                for sentence in split_into_sentences(document.content)[0]
+            )
+        )
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            ExtractiveCompressor(max_num_of_token=10, method="lexrank")
+
+
+if __name__ == "__main__":
+    unittest.main()
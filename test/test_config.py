@@ -0,0 +1,98 @@
+import argparse
+import unittest
+from unittest.mock import MagicMock, patch
+
+from main.config import SummarizerConfig, SummarizerFactory
+
+
+class TestSummarizerConfig(unittest.TestCase):
+
+    def test_from_env(self) -> None:
+        config = SummarizerConfig.from_env(
+            {
+                "MODEL": "qwen3:8b",
+                "JUDGE_MODELS": "qwen3:1.7b, deepseek-r1:8b",
+                "FAST_JUDGE": "1",
+                "PROMPT_TOKEN_BUDGET": "0",
+                "EXPENSIVE_TOP_K": "3",
+                "BERT_SCORE_BATCH_WAIT_MS": "5",
+            }
+        )
+        self.assertEqual(config.model, "qwen3:8b")
+        self.assertEqual(config.judge_models, ["qwen3:1.7b", "deepseek-r1:8b"])
+        self.assertTrue(config.fast_judge)
+        self.assertIsNone(config.prompt_token_budget)
+        self.assertEqual(config.expensive_top_k, 3)
+        self.assertEqual(config.bert_score_batch_wait_ms, 5.0)
+        self.assertEqual(config.bert_score_backend, "float32")
+
+    def test_from_args(self) -> None:
+        parser = argparse.ArgumentParser()
+        SummarizerConfig.add_arguments(parser)
+        args = parser.parse_args(
+            [
+                "--bert-score-backend",
+                "int8",
+                "--judge-models",
+                "small",
+                "large",
+                "--repair-reports",
+                "--map-reduce-chunk-tokens",
+                "2000",
+            ]
+        )
+        with patch.dict("os.environ", {"TOKEN_COUNTER": "cl100k_base"}):
+            config = SummarizerConfig.from_args(args)
+        self.assertEqual(config.bert_score_backend, "int8")
+        self.assertEqual(config.judge_models, ["small", "large"])
+        self.assertTrue(config.repair_reports)
+        self.assertEqual(config.map_reduce_chunk_tokens, 2000)
+        self.assertEqual(config.token_counter, "cl100k_base")
+
+    def test_judge_request_options(self) -> None:
+        self.assertIsNone(SummarizerConfig().judge_request_options())
+        config = SummarizerConfig(fast_judge=True, judge_reasoning_effort="low")
+        self.assertEqual(
+            config.judge_request_options(),
+            {"max_tokens": 1024, "reasoning_effort": "low"},
+        )
+
+
+class TestSummarizerFactory(unittest.TestCase):
+
+    def test_create(self) -> None:
+        config = SummarizerConfig(
+            model="m", bert_score_batch_size=0, fast_judge=True, repair_reports=True
+        )
+        summarizers = SummarizerFactory(client=MagicMock(), config=config)
+        with patch("main.config.BestHitLLMSummarizer") as summarizer_class:
+            summarizers.create(num_tries=2, repair=False)
+            summarizers.create()
+        first, second = summarizer_class.call_args_list
+        self.assertEqual(first.kwargs["model"], "m")
+        self.assertEqual(first.kwargs["num_tries"], 2)
+        self.assertFalse(first.kwargs["repair"])
+        self.assertTrue(second.kwargs["repair"])
+        self.assertEqual(first.kwargs["judge_request_options"], {"max_tokens": 1024})
+        # One backend and executor for all summarizers.
+        self.assertIs(
+            first.kwargs["bert_score_backend"], second.kwargs["bert_score_backend"]
+        )
+        self.assertIs(
+            first.kwargs["scoring_executor"], second.kwargs["scoring_executor"]
+        )
+        summarizers.shutdown()
+
+    def test_map_reduce(self) -> None:
+        config = SummarizerConfig(map_reduce_chunk_tokens=500)
+        summarizers = SummarizerFactory(client=MagicMock(), config=config)
+        with patch("main.config.MapReduceSummarizer") as summarizer_class:
+            summarizers.create()
+        self.assertEqual(
+            summarizer_class.call_args.kwargs["max_num_of_token_in_chunk"], 500
+        )
+        summarizers.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
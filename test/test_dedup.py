@@ -0,0 +1,48 @@
+import os
+import unittest
+
+from main.dedup import CandidateDeduplicator, simhash
+from main.document import Document
+from main.report import Report
+
+
+class TestCandidateDeduplicator(unittest.TestCase):
+
+    def setUp(self):
+        input_file_path = os.path.join("data", "article.txt")
+        words = Document.load_from_local(input_file_path=input_file_path).content.split()
+        self.report = Report(title="Foster care", content=" ".join(words[:200]))
+        self.other_report = Report(
+            title="Foster care", content=" ".join(words[200:400])
+        )
+
+    def test_exact_duplicate(self):
+        deduplicator = CandidateDeduplicator(max_hamming_distance=0)
+        self.assertIsNone(deduplicator.add(self.report, key=0))
+        spaced = Report(
+            title=self.report.title.upper(),
+            content=self.report.content.replace(" ", "  "),
+        )
+        self.assertEqual(deduplicator.add(spaced, key=1), 0)
+
+    def test_near_duplicate(self):
+        deduplicator = CandidateDeduplicator()
+        self.assertIsNone(deduplicator.add(self.report, key=0))
+        near = Report(
+            title=self.report.title, content=self.report.content + " Thank you."
+        )
+        self.assertEqual(deduplicator.add(near, key=1), 0)
+
+    def test_distinct(self):
+        deduplicator = CandidateDeduplicator()
+        self.assertIsNone(deduplicator.add(self.report, key=0))
+        self.assertIsNone(deduplicator.add(self.other_report, key=1))
+
+    def test_simhash(self):
+        words = self.report.content.lower().split()
+        self.assertEqual(simhash(words), simhash(list(words)))
+        self.assertLess(simhash(words), 1 << 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,10 @@
+import hashlib
 import os
 import unittest
 
 from main.document import Document
+from main.llm_as_judge import Reference
+from test.helpers import CharacterTokenCounter
 
 
 class TestDocument(unittest.TestCase):
@@ -15,6 +18,45 @@ class TestDocument(unittest.TestCase):
         document = Document.load_from_local(input_file_path)
         self.assertEqual(document.content, "Hello World")
 
+    def test_split_at_paragraphs(self) -> None:
+        document = Document(content="a b c\n\nd e\n\nf g h i\n\n\nj")
+        chunks = document.split(max_num_of_token=5)
+        self.assertEqual(
+            [chunk.content for chunk in chunks], ["a b c\n\nd e", "f g h i\n\nj"]
+        )
+
+    def test_split_long_paragraph(self) -> None:
+        document = Document(content="a b c d e f g\n\nh")
+        chunks = document.split(max_num_of_token=3)
+        self.assertEqual(
+            [chunk.content for chunk in chunks], ["a b c", "d e f", "g", "h"]
+        )
+
+    def test_split_with_token_counter(self) -> None:
+        document = Document(content="aa bb\n\ncc\n\ndd ee ff gg")
+        chunks = document.split(
+            max_num_of_token=8, token_counter=CharacterTokenCounter()
+        )
+        self.assertEqual(
+            [chunk.content for chunk in chunks], ["aa bb\n\ncc", "dd ee", "ff gg"]
+        )
+
+    def test_digest(self) -> None:
+        document = Document(content="Hello World")
+        self.assertEqual(
+            document.digest, hashlib.sha256(b"Hello World").hexdigest()
+        )
+        copy = document.model_copy(update={"content": "Hello"})
+        self.assertEqual(copy.digest, hashlib.sha256(b"Hello").hexdigest())
+        self.assertEqual(document, Document(content="Hello World"))
+
+    def test_of(self) -> None:
+        document = Document(content="Hello World")
+        reference = Reference.of(document)
+        self.assertIsInstance(reference, Reference)
+        self.assertIs(reference.content, document.content)
+        self.assertEqual(reference.digest, document.digest)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,37 @@
+import gc
+import unittest
+
+from main.document import Document
+from main.document_store import DocumentStore
+
+
+class TestDocumentStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = DocumentStore()
+
+    def test_intern(self):
+        document = self.store.intern("UCLA is a public university.")
+        self.assertIs(self.store.intern("UCLA is a public university."), document)
+        self.assertIs(
+            self.store.intern(Document(content="UCLA is a public university.")),
+            document,
+        )
+        self.assertIsNot(self.store.intern("UCLA"), document)
+        self.assertEqual((self.store.num_of_hits, self.store.num_of_misses), (2, 2))
+
+    def test_get(self):
+        document = self.store.intern("UCLA")
+        self.assertIn(document.digest, self.store)
+        self.assertIs(self.store.get(document.digest), document)
+        self.assertIsNone(self.store.get("0" * 64))
+
+    def test_unused_documents_are_dropped(self):
+        digest = self.store.intern("UCLA").digest
+        gc.collect()
+        self.assertNotIn(digest, self.store)
+        self.assertEqual(len(self.store), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+
+from main.job_queue import SQLiteJobQueue
+from test.helpers import Clock
+
+
+class TestSQLiteJobQueue(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.clock = Clock(now=1000.0)
+        self.queue = SQLiteJobQueue(
+            path=os.path.join(self.directory.name, "jobs.sqlite"),
+            visibility_timeout=60.0,
+            max_attempts=2,
+            retry_delay=5.0,
+            clock=self.clock,
+        )
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_complete(self) -> None:
+        job_id = self.queue.enqueue({"text": "UCLA"})
+        job = self.queue.claim()
+        self.assertEqual(job.id, job_id)
+        self.assertEqual(job.payload, {"text": "UCLA"})
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(self.queue.claim())
+
+        self.assertTrue(self.queue.complete(job, result={"title": "UCLA"}))
+        job = self.queue.get(job_id)
+        self.assertEqual(job.status, "done")
+        self.assertEqual(job.result, {"title": "UCLA"})
+
+    def test_fifo(self) -> None:
+        first = self.queue.enqueue({"n": 1})
+        self.clock.now += 1
+        second = self.queue.enqueue({"n": 2})
+        self.assertEqual(self.queue.claim().id, first)
+        self.assertEqual(self.queue.claim().id, second)
+
+    def test_visibility_timeout(self) -> None:
+        job_id = self.queue.enqueue({})
+        crashed = self.queue.claim()
+        self.clock.now += 61.0
+        job = self.queue.claim()
+        self.assertEqual(job.id, job_id)
+        self.assertEqual(job.attempts, 2)
+        # The crashed worker's claim is stale.
+        self.assertFalse(self.queue.complete(crashed, result={}))
+        self.assertTrue(self.queue.complete(job, result={}))
+
+    def test_extend(self) -> None:
+        self.queue.enqueue({})
+        job = self.queue.claim()
+        self.clock.now += 50.0
+        self.assertTrue(self.queue.extend(job))
+        self.clock.now += 50.0
+        self.assertIsNone(self.queue.claim())
+
+    def test_retry_and_dead_letter(self) -> None:
+        job_id = self.queue.enqueue({})
+        job = self.queue.claim()
+        self.assertTrue(self.queue.fail(job, error="boom"))
+        self.assertIsNone(self.queue.claim())  # retry delay
+        self.clock.now += 5.0
+        job = self.queue.claim()
+        self.assertEqual(job.attempts, 2)
+        self.assertTrue(self.queue.fail(job, error="boom again"))
+        self.clock.now += 5.0
+        self.assertIsNone(self.queue.claim())
+        (dead,) = self.queue.dead_letters()
+        self.assertEqual(dead.id, job_id)
+        self.assertEqual(dead.error, "boom again")
+
+    def test_dead_letter_after_last_timeout(self) -> None:
+        self.queue.enqueue({})
+        self.queue.claim()
+        self.clock.now += 61.0
+        self.queue.claim()
+        self.clock.now += 61.0
+        self.assertIsNone(self.queue.claim())
+        self.assertEqual(len(self.queue.dead_letters()), 1)
+
+    def test_get_unknown(self) -> None:
+        self.assertIsNone(self.queue.get("unknown"))
+
+
+if __name__ == "__main__":
+    unittest.main()
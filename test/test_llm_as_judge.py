@@ -1,18 +1,32 @@
 import asyncio
 import unittest
-from unittest.mock import patch
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 
+from main.caching import AsyncMemo
+from main.customized_exceptions import AnswerTruncated
 from main.document import Document
 from main.llm_as_judge import (
+    CascadingReferenceBasedJudge,
+    CascadingTopicBasedJudge,
+    ConfidentDecision,
+    ConfidentJudgement,
+    Decision,
+    FAST_JUDGE_REQUEST_OPTIONS,
     Judgement,
     MainTopicExtractor,
+    MemoizedReferenceBasedJudge,
     Reference,
+    ReferenceBasedJudge,
     ReferenceBasedCorrectnessJudge,
     Statement,
     Topic,
     TopicBasedCompletenessJudge,
+    TopicBasedJudge,
+    build_correctness_judge,
 )
 from main.report import Report
+from test.helpers import CountingJudge
 
 
 class TestJudgement(unittest.TestCase):
@@ -85,6 +99,287 @@ class TestReferenceBasedCorrectnessJudge(unittest.TestCase):
         self.assertEqual(judgement.decision, True)
 
 
+class TestMemoizedReferenceBasedJudge(unittest.TestCase):
+
+    def test_run(self) -> None:
+        judge = CountingJudge()
+        memoized_judge = MemoizedReferenceBasedJudge(judge=judge)
+        reference = Reference(content="UCLA is a public university.")
+
+        async def run():
+            return await asyncio.gather(
+                memoized_judge.run(Statement(content="UCLA is public."), reference),
+                memoized_judge.run(Statement(content=" UCLA  is\npublic. "), reference),
+                memoized_judge.run(Statement(content="UCLA is private."), reference),
+                memoized_judge.run(
+                    Statement(content="UCLA is public."),
+                    Reference(content="UCLA is a private university."),
+                ),
+            )
+
+        judgements = asyncio.run(run())
+        self.assertEqual(judge.num_of_calls, 3)
+        self.assertEqual(judgements[0], judgements[1])
+        self.assertEqual(memoized_judge.memo.num_of_hits, 1)
+
+    def test_models_sharing_a_memo(self) -> None:
+        async def parse(model, messages, response_format):
+            judgement = Judgement(decision=model == "large", reason=model)
+            content = judgement.model_dump_json()
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+            )
+
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(side_effect=parse)
+        memo = AsyncMemo()
+        statement = Statement(content="UCLA is public.")
+        reference = Reference(content="UCLA is a public university.")
+
+        async def run(model: str) -> Judgement:
+            judge = ReferenceBasedCorrectnessJudge(client=client, model=model)
+            return await MemoizedReferenceBasedJudge(judge=judge, memo=memo).run(
+                statement, reference
+            )
+
+        self.assertFalse(asyncio.run(run("small")).decision)
+        self.assertTrue(asyncio.run(run("large")).decision)
+        self.assertFalse(asyncio.run(run("small")).decision)
+        self.assertEqual(client.beta.chat.completions.parse.await_count, 2)
+
+
+class _FixedJudge(ReferenceBasedJudge, TopicBasedJudge):
+
+    def __init__(self, decision: bool, confidence: float):
+        self.judgement = ConfidentJudgement(
+            decision=decision, reason="", confidence=confidence
+        )
+        self.num_of_calls = 0
+
+    async def run(self, *args, **kwargs) -> Judgement:
+        self.num_of_calls += 1
+        return self.judgement
+
+
+class TestCascadingReferenceBasedJudge(unittest.TestCase):
+
+    def _run(self, small: _FixedJudge, large: _FixedJudge) -> Judgement:
+        judge = CascadingReferenceBasedJudge(judges=[small, large], min_confidence=0.8)
+        return asyncio.run(
+            judge.run(
+                statement=Statement(content="UCLA is public."),
+                reference=Reference(content="UCLA is a public university."),
+            )
+        )
+
+    def test_confident_positive_is_final(self) -> None:
+        small = _FixedJudge(decision=True, confidence=0.9)
+        large = _FixedJudge(decision=False, confidence=1.0)
+        self.assertIs(self._run(small, large), small.judgement)
+        self.assertEqual(large.num_of_calls, 0)
+
+    def test_escalate_low_confidence(self) -> None:
+        small = _FixedJudge(decision=True, confidence=0.5)
+        large = _FixedJudge(decision=False, confidence=1.0)
+        self.assertIs(self._run(small, large), large.judgement)
+
+    def test_escalate_negative(self) -> None:
+        small = _FixedJudge(decision=False, confidence=1.0)
+        large = _FixedJudge(decision=True, confidence=1.0)
+        self.assertIs(self._run(small, large), large.judgement)
+
+
+class TestCascadingTopicBasedJudge(unittest.TestCase):
+
+    def test_run(self) -> None:
+        small = _FixedJudge(decision=False, confidence=0.9)
+        large = _FixedJudge(decision=True, confidence=1.0)
+        judge = CascadingTopicBasedJudge(judges=[small, large])
+        judgement = asyncio.run(
+            judge.run(
+                topic=Topic(content="UCLA"), report=Report(title="", content="UCLA")
+            )
+        )
+        self.assertIs(judgement, large.judgement)
+        self.assertEqual(small.num_of_calls, 1)
+
+
+class TestBuildCorrectnessJudge(unittest.TestCase):
+
+    def _client(self):
+        async def parse(model, messages, response_format):
+            judgement = {"decision": True, "reason": model}
+            if response_format is ConfidentJudgement:
+                judgement["confidence"] = 0.95
+            content = response_format(**judgement).model_dump_json()
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+            )
+
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(side_effect=parse)
+        return client
+
+    def test_single_model(self) -> None:
+        judge = build_correctness_judge(client=self._client(), models=["large"])
+        self.assertIsInstance(judge, ReferenceBasedCorrectnessJudge)
+
+    def test_cascade(self) -> None:
+        client = self._client()
+        judge = build_correctness_judge(client=client, models=["small", "large"])
+        self.assertIsInstance(judge, CascadingReferenceBasedJudge)
+        judgement = asyncio.run(
+            judge.run(
+                statement=Statement(content="UCLA is public."),
+                reference=Reference(content="UCLA is a public university."),
+            )
+        )
+        self.assertEqual(judgement.reason, "small")
+        self.assertIsInstance(judgement, ConfidentJudgement)
+        (call,) = client.beta.chat.completions.parse.await_args_list
+        self.assertIn("confidence", call.kwargs["messages"][1]["content"])
+
+
+class TestFastJudge(unittest.TestCase):
+
+    def _client(self, answer: Decision):
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=answer.model_dump_json()))]
+        )
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(return_value=response)
+        return client
+
+    def test_decision_only(self) -> None:
+        client = self._client(Decision(decision=True))
+        judge = ReferenceBasedCorrectnessJudge(client=client, model="m", fast=True)
+        judgement = asyncio.run(
+            judge.run(
+                statement=Statement(content="UCLA is public."),
+                reference=Reference(content="UCLA is a public university."),
+            )
+        )
+        self.assertEqual(judgement, Judgement(decision=True, reason=""))
+        call = client.beta.chat.completions.parse.await_args
+        self.assertIs(call.kwargs["response_format"], Decision)
+        self.assertEqual(
+            call.kwargs["max_tokens"], FAST_JUDGE_REQUEST_OPTIONS["max_tokens"]
+        )
+
+    def test_with_confidence(self) -> None:
+        client = self._client(ConfidentDecision(decision=False, confidence=0.6))
+        judge = TopicBasedCompletenessJudge(
+            client=client,
+            model="m",
+            with_confidence=True,
+            fast=True,
+            request_options={"max_tokens": 8, "reasoning_effort": "low"},
+        )
+        judgement = asyncio.run(
+            judge.run(topic=Topic(content="UCLA"), report=Report(title="", content="UCLA"))
+        )
+        self.assertIsInstance(judgement, ConfidentJudgement)
+        self.assertEqual(judgement.confidence, 0.6)
+        call = client.beta.chat.completions.parse.await_args
+        self.assertIs(call.kwargs["response_format"], ConfidentDecision)
+        self.assertEqual(call.kwargs["reasoning_effort"], "low")
+
+    def test_unparseable_answer_is_negative(self) -> None:
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="<think>UCLA is"))]
+        )
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(return_value=response)
+        judge = ReferenceBasedCorrectnessJudge(client=client, model="m", fast=True)
+        judgement = asyncio.run(
+            judge.run(
+                statement=Statement(content="UCLA is public."),
+                reference=Reference(content="UCLA is a public university."),
+            )
+        )
+        self.assertFalse(judgement.decision)
+
+    @staticmethod
+    def _truncated():
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(
+                    message=SimpleNamespace(content="<think>UCLA is"),
+                    finish_reason="length",
+                )
+            ]
+        )
+
+    def test_truncated_answer_is_asked_again_without_cap(self) -> None:
+        answer = SimpleNamespace(
+            choices=[
+                SimpleNamespace(
+                    message=SimpleNamespace(
+                        content=Decision(decision=True).model_dump_json()
+                    ),
+                    finish_reason="stop",
+                )
+            ]
+        )
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(
+            side_effect=[self._truncated(), answer]
+        )
+        judge = ReferenceBasedCorrectnessJudge(
+            client=client,
+            model="m",
+            fast=True,
+            request_options={"max_tokens": 8, "reasoning_effort": "low"},
+        )
+        judgement = asyncio.run(
+            judge.run(
+                statement=Statement(content="UCLA is public."),
+                reference=Reference(content="UCLA is a public university."),
+            )
+        )
+        self.assertTrue(judgement.decision)
+        capped, uncapped = client.beta.chat.completions.parse.await_args_list
+        self.assertEqual(capped.kwargs["max_tokens"], 8)
+        self.assertNotIn("max_tokens", uncapped.kwargs)
+        self.assertEqual(uncapped.kwargs["reasoning_effort"], "low")
+
+    def test_truncated_answer_without_cap_raises(self) -> None:
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(return_value=self._truncated())
+        judge = TopicBasedCompletenessJudge(client=client, model="m")
+        with self.assertRaises(AnswerTruncated):
+            asyncio.run(
+                judge.run(
+                    topic=Topic(content="UCLA"), report=Report(title="", content="UCLA")
+                )
+            )
+        self.assertEqual(client.beta.chat.completions.parse.await_count, 1)
+
+    def test_truncated_reasoning_escalates(self) -> None:
+        async def parse(model, messages, response_format, max_tokens):
+            if model == "small":
+                content = "<think>The reference says"
+            else:
+                content = Decision(decision=True).model_dump_json()
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+            )
+
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(side_effect=parse)
+        judge = build_correctness_judge(
+            client=client, models=["small", "large"], fast=True
+        )
+        judgement = asyncio.run(
+            judge.run(
+                statement=Statement(content="UCLA is public."),
+                reference=Reference(content="UCLA is a public university."),
+            )
+        )
+        self.assertTrue(judgement.decision)
+        self.assertEqual(client.beta.chat.completions.parse.await_count, 2)
+
+
 class TestTopic(unittest.TestCase):
     def setUp(self) -> None:
         self.topic = Topic(
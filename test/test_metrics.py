@@ -1,5 +1,9 @@
 import asyncio
+import subprocess
+import sys
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 from openai import AsyncOpenAI
 
@@ -10,12 +14,14 @@ from main.metrics import (
     CorrectnessMetricExtractor,
     HasTitleMetricExtractor,
     Metric,
+    MetricExtractor,
     NumberOfParagraphMetricExtractor,
     NumberOfTokenMetricExtractor,
     RougeScoreMetricExtractor,
     TitleLengthMetricExtractor,
 )
 from main.report import Report
+from test.helpers import ConstantBertScoreBackend
 
 
 class TestMetric(unittest.TestCase):
@@ -108,6 +114,16 @@ class TestNumberOfTokenMetricExtractor(unittest.TestCase):
         self.assertEqual(num_of_token_metric.name, "Number-Of-Tokens-Metric")
         self.assertEqual(num_of_token_metric.value, "8")
 
+    def test_extract_batch(self) -> None:
+        reports = [self.report, Report(title="UCLA", content="UCLA")]
+        self.assertEqual(
+            self.metric_extractor.extract_values(reports).tolist(), [8, 1]
+        )
+        self.assertEqual(
+            self.metric_extractor.extract_batch(reports),
+            [self.metric_extractor.extract(report) for report in reports],
+        )
+
 
 class TestBertScoreMetricExtractor(unittest.TestCase):
 
@@ -128,6 +144,24 @@ class TestBertScoreMetricExtractor(unittest.TestCase):
         self.assertGreater(score, 0.6)
 
 
+class TestBertScoreMetricExtractorBackend(unittest.TestCase):
+
+    def test_extract(self) -> None:
+        metric_extractor = BertScoreMetricExtractor(
+            reference=Reference(content="UCLA is in Los Angeles."),
+            backend=ConstantBertScoreBackend(),
+        )
+        metric = metric_extractor.extract(Report(title="UCLA", content="UCLA"))
+        self.assertEqual(metric.name, "Bert-Score-Metric")
+        self.assertEqual(metric.value, "0.75")
+
+    def test_unknown_backend(self) -> None:
+        with self.assertRaises(ValueError):
+            BertScoreMetricExtractor(
+                reference=Reference(content="UCLA"), backend="fp4"
+            )
+
+
 class TestRougeScoreMetricExtractor(unittest.TestCase):
 
     def setUp(self):
@@ -207,5 +241,59 @@ class TestCompletenessMetricExtractor(unittest.TestCase):
         self.assertTrue(bool(int(completeness_metric.value)))
 
 
+class _SlowMetricExtractor(MetricExtractor):
+
+    def extract(self, report: Report) -> Metric:
+        time.sleep(0.2)
+        return Metric(name="Slow-Metric", value="1")
+
+
+class TestExtractAsync(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.report = Report(title="UCLA", content="UCLA is a public university.")
+
+    def test_extract_async(self) -> None:
+        metric_extractor = RougeScoreMetricExtractor(
+            reference=Reference(content="UCLA is a public university in Los Angeles.")
+        )
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            metric = asyncio.run(
+                metric_extractor.extract_async(self.report, executor=executor)
+            )
+        self.assertEqual(metric, metric_extractor.extract(self.report))
+
+    def test_event_loop_stays_responsive(self) -> None:
+        async def tick(ticks: list) -> None:
+            for _ in range(10):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        async def run() -> list:
+            ticks = []
+            await asyncio.gather(
+                _SlowMetricExtractor().extract_async(self.report), tick(ticks)
+            )
+            return ticks
+
+        ticks = asyncio.run(run())
+        self.assertLess(max(b - a for a, b in zip(ticks, ticks[1:])), 0.1)
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_import_does_not_load_heavy_dependencies(self) -> None:
+        code = (
+            "import sys\n"
+            "import main.metrics, main.requirements, main.summarizer\n"
+            "heavy = ('bert_score', 'torch', 'transformers', 'rouge_score')\n"
+            "print(','.join(m for m in heavy if m in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        self.assertEqual(output, "")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,107 @@
+import json
+import unittest
+from types import SimpleNamespace
+
+from pydantic import ValidationError
+
+from main.parsing import PartialReportParser, parse_structured_output, repair_json
+from main.report import Report
+
+
+class TestPartialReportParser(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.completion = json.dumps(
+            {
+                "title": 'UCLA, "the" university',
+                "content": "UCLA is a public university.\n\nIt is in Los Angeles é.",
+            }
+        )
+
+    def _feed(self, text: str, chunk_size: int) -> PartialReportParser:
+        parser = PartialReportParser()
+        for start in range(0, len(text), chunk_size):
+            parser.feed(text[start : start + chunk_size])
+        return parser
+
+    def test_complete(self) -> None:
+        for chunk_size in (1, 2, 5, len(self.completion)):
+            report = self._feed(self.completion, chunk_size).report
+            self.assertEqual(report.title, 'UCLA, "the" university')
+            self.assertEqual(
+                report.content,
+                "UCLA is a public university.\n\nIt is in Los Angeles é.",
+            )
+
+    def test_partial(self) -> None:
+        prefix = self.completion[: self.completion.index("It is")]
+        parser = self._feed(prefix, 3)
+        self.assertEqual(parser.report.title, 'UCLA, "the" university')
+        self.assertEqual(parser.report.content, "UCLA is a public university.\n\n")
+        self.assertEqual(parser.num_of_char, len(prefix))
+
+    def test_missing_fields(self) -> None:
+        report = self._feed('{"tit', 1).report
+        self.assertEqual(report.title, "")
+        self.assertEqual(report.content, "")
+
+    def test_skip_other_values(self) -> None:
+        completion = json.dumps(
+            {"meta": {"title": "nested"}, "tags": ["a", "]"], "n": 1, "title": "UCLA"}
+        )
+        self.assertEqual(self._feed(completion, 4).report.title, "UCLA")
+
+
+class TestRepairJson(unittest.TestCase):
+
+    def test_valid(self) -> None:
+        text = '{"title": "UCLA", "content": "a, b}"}'
+        self.assertEqual(repair_json(text), text)
+
+    def test_think_and_fence(self) -> None:
+        text = '<think>{"draft"}</think>\n```json\n{"title": "UCLA", "content": "b"}\n```'
+        self.assertEqual(
+            json.loads(repair_json(text)), {"title": "UCLA", "content": "b"}
+        )
+
+    def test_unterminated_think(self) -> None:
+        self.assertEqual(repair_json("<think>The statement is"), "")
+
+    def test_trailing_comma(self) -> None:
+        text = '{"title": "UCLA", "tags": [1, 2, ], }'
+        self.assertEqual(json.loads(repair_json(text)), {"title": "UCLA", "tags": [1, 2]})
+
+    def test_truncated(self) -> None:
+        text = '{"title": "UCLA", "content": "UCLA is a \\"public'
+        self.assertEqual(
+            json.loads(repair_json(text)),
+            {"title": "UCLA", "content": 'UCLA is a "public'},
+        )
+        self.assertEqual(json.loads(repair_json('{"title": "UCLA",')), {"title": "UCLA"})
+
+
+class TestParseStructuredOutput(unittest.TestCase):
+
+    def test_parsed(self) -> None:
+        report = Report(title="UCLA", content="UCLA")
+        message = SimpleNamespace(parsed=report, content="not even JSON")
+        self.assertIs(parse_structured_output(message, Report), report)
+
+    def test_content(self) -> None:
+        message = SimpleNamespace(
+            parsed=None,
+            content='Here it is: ```json\n{"title": "UCLA", "content": "UCLA",}\n```',
+        )
+        self.assertEqual(
+            parse_structured_output(message, Report),
+            Report(title="UCLA", content="UCLA"),
+        )
+
+    def test_unrepairable(self) -> None:
+        message = SimpleNamespace(content='{"title": "UCLA"}')
+        with self.assertRaises(ValidationError):
+            parse_structured_output(message, Report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 
 from main.report import Report
+from test.helpers import CharacterTokenCounter
 
 
 class TestReport(unittest.TestCase):
@@ -16,5 +17,51 @@ class TestReport(unittest.TestCase):
         self.assertEqual(self.report.content, "This is a hello world document.")
 
 
+class TestReportFeatures(unittest.TestCase):
+    def setUp(self):
+        self.report = Report(
+            title=" Hello World ",
+            content="\nThis is a hello\n\n\n\nworld document.\n\n",
+        )
+
+    def test_features(self) -> None:
+        features = self.report.features
+        self.assertTrue(features.has_title)
+        self.assertEqual(features.title_length, 11)
+        self.assertEqual(features.paragraphs, ["This is a hello", "", "world document."])
+        self.assertEqual(features.statements, ["This is a hello", "world document."])
+        self.assertEqual(len(features.tokens), 6)
+        self.assertEqual(
+            features.num_of_token(CharacterTokenCounter()),
+            len(self.report.content.strip()),
+        )
+
+    def test_computed_once(self) -> None:
+        self.assertIs(self.report.features, self.report.features)
+
+    def test_computed_on_first_access(self) -> None:
+        features = self.report.features
+        self.assertNotIn("digest", vars(features))
+        features.digest
+        self.assertIn("digest", vars(features))
+        self.assertNotIn("statements", vars(features))
+
+    def test_recomputed_on_change(self) -> None:
+        features = self.report.features
+        copy = self.report.model_copy(update={"content": "Hello"})
+        self.assertEqual(copy.features.tokens, ["Hello"])
+        self.assertIs(self.report.features, features)
+
+    def test_not_a_field(self) -> None:
+        self.report.features
+        other = Report(title=self.report.title, content=self.report.content)
+        self.assertEqual(self.report, other)
+        self.assertEqual(set(self.report.model_dump()), {"title", "content"})
+
+    def test_digest(self) -> None:
+        other = Report(title="hello world", content="THIS is a hello world document.")
+        self.assertEqual(self.report.features.digest, other.features.digest)
+
+
 if __name__ == "__main__":
     unittest.main()
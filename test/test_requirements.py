@@ -1,7 +1,10 @@
 import asyncio
 import unittest
+from unittest.mock import AsyncMock, MagicMock
 
+from main.caching import AsyncMemo
 from main.document import Document
+from main.llm_as_judge import Topic
 from main.report import Report
 from main.requirements import (
     CompletenessRequirement,
@@ -12,6 +15,7 @@ from main.requirements import (
     NumberOfTokenRequirement,
     TitleLengthRequirement,
 )
+from test.helpers import CharacterTokenCounter, CountingJudge, completion
 
 
 class TestHasTitleRequirement(unittest.TestCase):
@@ -62,6 +66,14 @@ class TestTitleLengthRequirement(unittest.TestCase):
     def test_is_satisfied(self) -> None:
         self.assertTrue(self.requirement.is_satisfied(report=self.report))
 
+    def test_is_violated_by_prefix(self) -> None:
+        self.assertFalse(self.requirement.is_violated_by_prefix(report=self.report))
+        self.assertTrue(
+            self.requirement.is_violated_by_prefix(
+                report=Report(title="U" * 65, content="")
+            )
+        )
+
 
 class TestDoubleNewlineDelimiterRequirement(unittest.TestCase):
 
@@ -118,6 +130,14 @@ class TestNumberOfParagraphRequirement(unittest.TestCase):
     def test_is_satisfied(self) -> None:
         self.assertTrue(self.requirement.is_satisfied(report=self.report))
 
+    def test_is_violated_by_prefix(self) -> None:
+        self.assertFalse(self.requirement.is_violated_by_prefix(report=self.report))
+        self.assertTrue(
+            self.requirement.is_violated_by_prefix(
+                report=Report(title="UCLA", content="\n\n".join(["LA"] * 6))
+            )
+        )
+
 
 class TestNumberOfTokenRequirement(unittest.TestCase):
 
@@ -146,6 +166,28 @@ class TestNumberOfTokenRequirement(unittest.TestCase):
     def test_is_satisfied(self) -> None:
         self.assertTrue(self.requirement.is_satisfied(report=self.report))
 
+    def test_is_violated_by_prefix(self) -> None:
+        self.assertFalse(
+            self.requirement.is_violated_by_prefix(
+                report=Report(title="UCLA", content="UCLA")
+            )
+        )
+        self.assertTrue(
+            self.requirement.is_violated_by_prefix(
+                report=Report(title="UCLA", content="LA " * 31)
+            )
+        )
+
+    def test_token_counter(self) -> None:
+        requirement = NumberOfTokenRequirement(
+            min_num_of_token=5,
+            max_num_of_token=30,
+            must_be_satisfied=True,
+            token_counter=CharacterTokenCounter(),
+        )
+        self.assertFalse(requirement.is_satisfied(report=self.report))
+        self.assertEqual(requirement.get_metric(report=self.report).value, "70")
+
 
 class TestCorrectnessRequirement(unittest.TestCase):
 
@@ -223,5 +265,93 @@ class TestCompletenessRequirement(unittest.TestCase):
         self.assertTrue(asyncio.run(self.requirement.is_satisfied(report=self.report)))
 
 
+class TestBatchValidation(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.reports = [
+            Report(title="", content="UCLA"),
+            Report(title="UCLA", content="UCLA is a public university."),
+            Report(title="University of California", content="UCLA\n\nis\n\nin LA"),
+            Report(title="A university in LA", content="USC " * 40),
+        ]
+        self.document = Document(content="UCLA is a public university at LA.")
+
+    def test_structural_requirements(self) -> None:
+        requirements = [
+            HasTitleRequirement(),
+            TitleLengthRequirement(min_num_of_char=5, max_num_of_char=20),
+            DoubleNewlineDelimiterRequirement(),
+            NumberOfParagraphRequirement(min_num_of_paragraph=2, max_num_of_paragraph=3),
+            NumberOfTokenRequirement(min_num_of_token=2, max_num_of_token=30),
+        ]
+        for requirement in requirements:
+            with self.subTest(requirement=requirement.name):
+                self.assertEqual(
+                    requirement.is_satisfied_batch(self.reports),
+                    [requirement.is_satisfied(report) for report in self.reports],
+                )
+                self.assertEqual(
+                    requirement.get_metric_batch(self.reports),
+                    [requirement.get_metric(report) for report in self.reports],
+                )
+
+    def test_empty_batch(self) -> None:
+        requirement = NumberOfTokenRequirement(min_num_of_token=2, max_num_of_token=30)
+        self.assertEqual(requirement.is_satisfied_batch([]), [])
+
+    def test_correctness_requirement(self) -> None:
+        judge = CountingJudge()
+        requirement = CorrectnessRequirement(
+            client=MagicMock(), model="m", org_document=self.document, judge=judge
+        )
+        # Reports of one paragraph each, which is judged as one statement.
+        reports = [self.reports[0], self.reports[1], self.reports[3]]
+        is_satisfied = asyncio.run(
+            requirement.is_satisfied_batch(reports, max_concurrency=2)
+        )
+        self.assertEqual(is_satisfied, [True, True, False])
+        self.assertEqual(judge.max_num_of_running, 2)
+
+    def test_completeness_requirement(self) -> None:
+        response = completion(Topic(content="UCLA").model_dump_json())
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(return_value=response)
+        judge = CountingJudge()
+        requirement = CompletenessRequirement(
+            client=client, model="m", org_document=self.document, judge=judge
+        )
+        is_satisfied = asyncio.run(
+            requirement.is_satisfied_batch(self.reports, max_concurrency=3)
+        )
+        self.assertEqual(is_satisfied, [True, True, True, False])
+        # The main topic of the document is extracted once for the batch.
+        self.assertEqual(client.beta.chat.completions.parse.await_count, 1)
+        self.assertEqual(judge.max_num_of_running, 3)
+
+
+class TestCompletenessRequirementMemo(unittest.TestCase):
+
+    def test_main_topic_is_extracted_once(self) -> None:
+        response = completion(Topic(content="UCLA").model_dump_json())
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(return_value=response)
+        requirement = CompletenessRequirement(
+            client=client,
+            model="m",
+            org_document=Document(content="UCLA is a public university at LA."),
+            judge=CountingJudge(),
+            memo=AsyncMemo(),
+        )
+
+        async def check_all():
+            return [
+                await requirement.is_satisfied(Report(title="", content="UCLA")),
+                await requirement.is_satisfied(Report(title="", content="USC")),
+            ]
+
+        self.assertEqual(asyncio.run(check_all()), [True, False])
+        self.assertEqual(client.beta.chat.completions.parse.await_count, 1)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+
+from main.sampling import (
+    AdaptiveSamplingStrategy,
+    FixedSamplingStrategy,
+    SamplingHistory,
+    expected_improvement,
+)
+
+
+class TestSamplingHistory(unittest.TestCase):
+
+    def test_record(self):
+        history = SamplingHistory()
+        self.assertEqual(history.valid_rate, 0.0)
+        self.assertIsNone(history.best_score)
+        history.record(score=1.2)
+        history.record()
+        history.record(score=1.5)
+        self.assertEqual(history.num_of_tries, 3)
+        self.assertEqual(history.num_of_valid, 2)
+        self.assertAlmostEqual(history.valid_rate, 2 / 3)
+        self.assertEqual(history.best_score, 1.5)
+
+
+class TestFixedSamplingStrategy(unittest.TestCase):
+
+    def test_next_wave_size(self):
+        strategy = FixedSamplingStrategy(num_tries=3, wave_size=2)
+        history = SamplingHistory()
+        self.assertEqual(strategy.next_wave_size(history), 2)
+        history.record()
+        history.record()
+        self.assertEqual(strategy.next_wave_size(history), 1)
+        history.record()
+        self.assertEqual(strategy.next_wave_size(history), 0)
+
+
+class TestExpectedImprovement(unittest.TestCase):
+
+    def test_identical_scores(self):
+        self.assertEqual(expected_improvement([1.0, 1.0], best_score=1.0), 0.0)
+
+    def test_spread_scores(self):
+        narrow = expected_improvement([1.0, 1.01, 1.02], best_score=1.02)
+        wide = expected_improvement([0.8, 1.0, 1.2], best_score=1.2)
+        self.assertGreater(narrow, 0.0)
+        self.assertGreater(wide, narrow)
+
+
+class TestAdaptiveSamplingStrategy(unittest.TestCase):
+
+    def test_first_wave(self):
+        strategy = AdaptiveSamplingStrategy(first_wave_size=3, max_tries=10)
+        self.assertEqual(strategy.next_wave_size(SamplingHistory()), 3)
+
+    def test_continue_without_valid_candidate(self):
+        strategy = AdaptiveSamplingStrategy(wave_size=2, max_tries=5)
+        history = SamplingHistory()
+        for _ in range(4):
+            history.record()
+        self.assertEqual(strategy.next_wave_size(history), 1)
+        history.record()
+        self.assertEqual(strategy.next_wave_size(history), 0)
+
+    def test_stop_when_not_worth_it(self):
+        strategy = AdaptiveSamplingStrategy(min_expected_improvement=0.005)
+        history = SamplingHistory()
+        history.record(score=1.5)
+        history.record(score=1.5)
+        self.assertEqual(strategy.next_wave_size(history), 0)
+
+    def test_continue_when_worth_it(self):
+        strategy = AdaptiveSamplingStrategy(wave_size=2, min_expected_improvement=0.005)
+        history = SamplingHistory()
+        history.record(score=1.2)
+        history.record(score=1.6)
+        self.assertEqual(strategy.next_wave_size(history), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+from main.bert_backends import BertScoreBackend
+from main.scoring_service import BertScoreServer, RemoteBertScoreBackend
+
+
+class _OverlapBertScoreBackend(BertScoreBackend):
+    """Fraction of candidate words found in the reference."""
+
+    def __init__(self):
+        super().__init__(model_type="overlap")
+
+    def _load(self):
+        return object()
+
+    def score(self, cands, refs):
+        if not cands:
+            raise ValueError("no candidates")
+        return [
+            len(set(cand.split()) & set(ref.split())) / len(set(cand.split()))
+            for cand, ref in zip(cands, refs)
+        ]
+
+
+class TestBertScoreServer(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self._directory.name, "bert-score.sock")
+        self.server = BertScoreServer(
+            backend=_OverlapBertScoreBackend(), socket_path=self.socket_path
+        )
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.server.start())
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.backend = RemoteBertScoreBackend(socket_path=self.socket_path)
+
+    def tearDown(self) -> None:
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self._directory.cleanup()
+
+    def test_score(self) -> None:
+        f1 = self.backend.score(
+            cands=["UCLA is public", "UCLA"], refs=["UCLA is a public university"] * 2
+        )
+        self.assertEqual(f1, [1.0, 1.0])
+
+    def test_no_local_model(self) -> None:
+        self.assertIsNone(self.backend.scorer)
+
+    def test_large_reference(self) -> None:
+        reference = "word " * 500_000
+        self.assertEqual(self.backend.score(cands=["word"], refs=[reference]), [1.0])
+
+    def test_error(self) -> None:
+        with self.assertRaises(RuntimeError):
+            self.backend.score(cands=[], refs=[])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,18 +1,30 @@
 import asyncio
-import os
-import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
 
 from openai import AsyncOpenAI
 
-from main.document import Document
-from main.summarizer import BestHitLLMSummarizer
+from main.customized_exceptions import (
+    NoReportSatisfyAllMustRequirements,
+    PartialSummariesTooLong,
+    TokenBudgetExceeded,
+)
+from main.llm_as_judge import Judgement, Topic
+from main.report import Report
+from main.sampling import AdaptiveSamplingStrategy
+from main.summarizer import BestHitLLMSummarizer, MapReduceSummarizer, PartialSummary
+from main.tokenization import get_token_counter
+from main.usage import TokenBudget, usage_scope
+from test.helpers import (
+    ArticleTestCase,
+    CharacterTokenCounter,
+    ConstantBertScoreBackend,
+    completion,
+    mock_client,
+)
 
 
-class TestBestHitLLMSummarizer(unittest.TestCase):
-
-    def setUp(self):
-        input_file_path = os.path.join("data", "article.txt")
-        self.document = Document.load_from_local(input_file_path=input_file_path)
+class TestBestHitLLMSummarizer(ArticleTestCase):
 
     def test_open_sourced_deepseek_summarize(self):
         deepseek_client = AsyncOpenAI(
@@ -37,3 +49,483 @@ class TestBestHitLLMSummarizer(unittest.TestCase):
 
         report = asyncio.run(self._summarizer.summarize(document=self.document))
         print(report)
+
+
+class TestBestHitLLMSummarizerTokenBudget(ArticleTestCase):
+
+    def test_usage(self):
+        client = mock_client(self.report)
+        summarizer = BestHitLLMSummarizer(
+            client=client,
+            model="m",
+            num_tries=3,
+            bert_score_backend=ConstantBertScoreBackend(),
+        )
+        with usage_scope() as ledger:
+            report = asyncio.run(summarizer.summarize(document=self.document))
+        self.assertEqual(report, self.report)
+        self.assertEqual(ledger.usage.num_of_calls, 3)
+        self.assertEqual(ledger.usage.total_tokens, 360)
+
+    def test_budget_stops_generation(self):
+        client = mock_client(self.report)
+        summarizer = BestHitLLMSummarizer(
+            client=client,
+            model="m",
+            num_tries=5,
+            token_budget=TokenBudget(max_total_tokens=200),
+            bert_score_backend=ConstantBertScoreBackend(),
+        )
+        report = asyncio.run(summarizer.summarize(document=self.document))
+        self.assertEqual(report, self.report)
+        self.assertEqual(client.beta.chat.completions.parse.await_count, 2)
+
+    def test_budget_exhausted_while_judging(self):
+        async def parse(model, messages, response_format):
+            if response_format is Judgement:
+                return completion(Judgement(decision=True, reason="").model_dump_json())
+            if response_format is Topic:
+                return completion(Topic(content="Foster care").model_dump_json())
+            return completion(self.report.model_dump_json())
+
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(side_effect=parse)
+        summarizer = BestHitLLMSummarizer(
+            client=client,
+            model="m",
+            num_tries=1,
+            llm_as_judge=True,
+            token_budget=TokenBudget(max_total_tokens=200),
+            bert_score_backend=ConstantBertScoreBackend(),
+        )
+        with self.assertRaises(TokenBudgetExceeded):
+            asyncio.run(summarizer.summarize(document=self.document))
+
+    def test_budget_exhausted_while_summarizing_chunks(self):
+        num_of_started = 0
+
+        async def parse(model, messages, response_format):
+            nonlocal num_of_started
+            num_of_started += 1
+            index = num_of_started
+            await asyncio.sleep(0.01 * index)
+            if index == 1:
+                raise TokenBudgetExceeded()
+            return completion(PartialSummary(content="UCLA").model_dump_json())
+
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(side_effect=parse)
+        summarizer = MapReduceSummarizer(
+            client=client,
+            model="m",
+            max_num_of_token_in_chunk=60,
+            max_concurrent_chunks=2,
+            num_tries=1,
+            bert_score_backend=ConstantBertScoreBackend(),
+        )
+
+        async def summarize_and_wait():
+            with self.assertRaises(TokenBudgetExceeded):
+                await summarizer.summarize(document=self.document)
+            await asyncio.sleep(0.2)
+
+        asyncio.run(summarize_and_wait())
+        # The chunks waiting for their turn are cancelled.
+        num_of_chunks = len(self.document.split(max_num_of_token=60))
+        self.assertLess(num_of_started, num_of_chunks)
+
+
+class TestBestHitLLMSummarizerSampling(ArticleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Distinct candidates, one per fifth of the document.
+        self.reports = [
+            self.report_of(start)
+            for start in range(0, 4 * self.num_of_word, self.num_of_word)
+        ]
+
+    def _judging_client(self, decision: bool):
+        num_of_reports = 0
+
+        async def parse(model, messages, response_format):
+            if response_format is Judgement:
+                return completion(
+                    Judgement(decision=decision, reason="").model_dump_json()
+                )
+            if response_format is Topic:
+                return completion(Topic(content="Foster care").model_dump_json())
+            nonlocal num_of_reports
+            num_of_reports += 1
+            report = self.reports[(num_of_reports - 1) % len(self.reports)]
+            return completion(report.model_dump_json())
+
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(side_effect=parse)
+        return client
+
+    @staticmethod
+    def _num_of_calls(client, response_format) -> int:
+        return len(
+            [
+                call
+                for call in client.beta.chat.completions.parse.await_args_list
+                if call.kwargs["response_format"] is response_format
+            ]
+        )
+
+    def test_adaptive_stops_after_first_wave(self):
+        # Identical candidates, another wave cannot improve the best score.
+        client = mock_client(self.report)
+        summarizer = BestHitLLMSummarizer(
+            client=client,
+            model="m",
+            bert_score_backend=ConstantBertScoreBackend(),
+            sampling_strategy=AdaptiveSamplingStrategy(
+                first_wave_size=3, max_tries=10
+            ),
+        )
+        report = asyncio.run(summarizer.summarize(document=self.document))
+        self.assertEqual(report, self.report)
+        self.assertEqual(client.beta.chat.completions.parse.await_count, 3)
+
+    def test_duplicates_are_not_scored(self):
+        client = mock_client(self.report)
+        backend = ConstantBertScoreBackend()
+        summarizer = BestHitLLMSummarizer(
+            client=client, model="m", num_tries=4, bert_score_backend=backend
+        )
+        report = asyncio.run(summarizer.summarize(document=self.document))
+        self.assertEqual(report, self.report)
+        self.assertEqual(client.beta.chat.completions.parse.await_count, 4)
+        self.assertEqual(backend.num_of_scored, 1)
+
+    def test_valid_report_is_not_a_twin_of_an_invalid_one(self):
+        # The same words in six paragraphs, more than allowed.
+        words = self.report.content.split()
+        invalid = Report(
+            title=self.report.title,
+            content="\n\n".join(
+                " ".join(words[start : start + len(words) // 6 + 1])
+                for start in range(0, len(words), len(words) // 6 + 1)
+            ),
+        )
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(
+            side_effect=[
+                completion(invalid.model_dump_json()),
+                completion(self.report.model_dump_json()),
+            ]
+        )
+        summarizer = BestHitLLMSummarizer(
+            client=client,
+            model="m",
+            num_tries=2,
+            bert_score_backend=ConstantBertScoreBackend(),
+        )
+        report = asyncio.run(summarizer.summarize(document=self.document))
+        self.assertEqual(report, self.report)
+
+    def test_judge_stops_at_first_satisfying_report(self):
+        client = self._judging_client(decision=True)
+        summarizer = BestHitLLMSummarizer(
+            client=client,
+            model="m",
+            num_tries=4,
+            llm_as_judge=True,
+            bert_score_backend=ConstantBertScoreBackend(),
+        )
+        report = asyncio.run(summarizer.summarize(document=self.document))
+        self.assertEqual(report, self.report)
+        num_of_judgement_per_report = self._num_of_calls(client, Judgement)
+
+        client = self._judging_client(decision=True)
+        summarizer = BestHitLLMSummarizer(
+            client=client,
+            model="m",
+            num_tries=1,
+            llm_as_judge=True,
+            bert_score_backend=ConstantBertScoreBackend(),
+        )
+        asyncio.run(summarizer.summarize(document=self.document))
+        self.assertEqual(
+            self._num_of_calls(client, Judgement), num_of_judgement_per_report
+        )
+
+    def test_scoring_cascade(self):
+        client = self._judging_client(decision=True)
+        backend = ConstantBertScoreBackend()
+        summarizer = BestHitLLMSummarizer(
+            client=client,
+            model="m",
+            num_tries=4,
+            llm_as_judge=True,
+            bert_score_backend=backend,
+            expensive_top_k=2,
+        )
+        report = asyncio.run(summarizer.summarize(document=self.document))
+        self.assertEqual(report, self.report)
+        self.assertEqual(self._num_of_calls(client, Report), 4)
+        self.assertEqual(backend.num_of_scored, 2)
+
+    def test_judge_top_fraction(self):
+        num_of_judgement = {}
+        for judge_top_fraction in (0.5, 1.0):
+            client = self._judging_client(decision=False)
+            summarizer = BestHitLLMSummarizer(
+                client=client,
+                model="m",
+                num_tries=4,
+                llm_as_judge=True,
+                bert_score_backend=ConstantBertScoreBackend(),
+                judge_top_fraction=judge_top_fraction,
+            )
+            with self.assertRaises(NoReportSatisfyAllMustRequirements):
+                asyncio.run(summarizer.summarize(document=self.document))
+            self.assertEqual(self._num_of_calls(client, Report), 4)
+            num_of_judgement[judge_top_fraction] = self._num_of_calls(
+                client, Judgement
+            )
+        self.assertGreater(num_of_judgement[0.5], 0)
+        self.assertEqual(num_of_judgement[0.5] * 2, num_of_judgement[1.0])
+
+
+class TestBestHitLLMSummarizerRepair(ArticleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.overlong = self.report_of(0, num_of_word=2 * self.num_of_word)
+
+    def _client(self):
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(
+            side_effect=[
+                completion(self.overlong.model_dump_json()),
+                completion(self.report.model_dump_json()),
+            ]
+        )
+        return client
+
+    def test_repair(self):
+        client = self._client()
+        summarizer = BestHitLLMSummarizer(
+            client=client,
+            model="m",
+            num_tries=1,
+            bert_score_backend=ConstantBertScoreBackend(),
+            repair=True,
+        )
+        report = asyncio.run(summarizer.summarize(document=self.document))
+        self.assertEqual(report, self.report)
+        repair_call = client.beta.chat.completions.parse.await_args_list[1]
+        prompt = repair_call.kwargs["messages"][1]["content"]
+        self.assertIn("Revise the summary", prompt)
+        self.assertIn(self.overlong.content, prompt)
+        self.assertNotIn(self.document.content, prompt)
+
+    def test_no_repair(self):
+        summarizer = BestHitLLMSummarizer(
+            client=self._client(),
+            model="m",
+            num_tries=1,
+            bert_score_backend=ConstantBertScoreBackend(),
+        )
+        with self.assertRaises(NoReportSatisfyAllMustRequirements):
+            asyncio.run(summarizer.summarize(document=self.document))
+
+
+class TestBestHitLLMSummarizerCompression(ArticleTestCase):
+
+    def test_prompt_is_compressed(self):
+        client = mock_client(self.report)
+        summarizer = BestHitLLMSummarizer(
+            client=client,
+            model="m",
+            num_tries=1,
+            bert_score_backend=ConstantBertScoreBackend(),
+            prompt_token_budget=150,
+        )
+        report = asyncio.run(summarizer.summarize(document=self.document))
+        self.assertEqual(report, self.report)
+        prompt = client.beta.chat.completions.parse.await_args.kwargs["messages"][1][
+            "content"
+        ]
+        document_in_prompt = prompt.split("Requirements include:")[0]
+        self.assertLessEqual(len(document_in_prompt.split()), 150 + 4)
+        # The length requirement still follows the original document.
+        num_of_token = get_token_counter().count(self.document.content)
+        self.assertIn(f"have {int(0.15 * num_of_token)} to", prompt)
+
+    def test_main_topic_is_extracted_from_compressed_document(self):
+        async def parse(model, messages, response_format):
+            if response_format is Judgement:
+                return completion(Judgement(decision=True, reason="").model_dump_json())
+            if response_format is Topic:
+                return completion(Topic(content="Foster care").model_dump_json())
+            return completion(self.report.model_dump_json())
+
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(side_effect=parse)
+        summarizer = BestHitLLMSummarizer(
+            client=client,
+            model="m",
+            num_tries=1,
+            llm_as_judge=True,
+            bert_score_backend=ConstantBertScoreBackend(),
+            prompt_token_budget=150,
+        )
+        asyncio.run(summarizer.summarize(document=self.document))
+        prompts = {}
+        for call in client.beta.chat.completions.parse.await_args_list:
+            prompts.setdefault(call.kwargs["response_format"], []).append(
+                call.kwargs["messages"][1]["content"]
+            )
+        (topic_prompt,) = prompts[Topic]
+        self.assertLessEqual(len(topic_prompt.split()), 150 + 8)
+        # The correctness judges keep the full reference.
+        self.assertTrue(
+            any(self.document.content.strip() in prompt for prompt in prompts[Judgement])
+        )
+
+
+class TestMapReduceSummarizer(ArticleTestCase):
+
+    def _client(self):
+        async def parse(model, messages, response_format):
+            if response_format is PartialSummary:
+                # The first 40% of the chunk.
+                chunk = messages[1]["content"].split("Here is the text:")[1].split()
+                partial_summary = " ".join(chunk[: int(0.4 * len(chunk))])
+                return completion(PartialSummary(content=partial_summary).model_dump_json())
+            return completion(self.report.model_dump_json())
+
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(side_effect=parse)
+        return client
+
+    @staticmethod
+    def _prompts(client, response_format) -> list:
+        return [
+            call.kwargs["messages"][1]["content"]
+            for call in client.beta.chat.completions.parse.await_args_list
+            if call.kwargs["response_format"] is response_format
+        ]
+
+    def test_map_reduce(self):
+        client = self._client()
+        summarizer = MapReduceSummarizer(
+            client=client,
+            model="m",
+            max_num_of_token_in_chunk=200,
+            num_tries=1,
+            bert_score_backend=ConstantBertScoreBackend(),
+        )
+        report = asyncio.run(summarizer.summarize(document=self.document))
+        self.assertEqual(report, self.report)
+        self.assertEqual(len(self._prompts(client, PartialSummary)), 3)
+        (reduce_prompt,) = self._prompts(client, Report)
+        self.assertNotIn(self.document.content.split("\n\n")[-1].strip(), reduce_prompt)
+        # The length requirement still follows the original document.
+        num_of_token = get_token_counter().count(self.document.content)
+        self.assertIn(f"have {int(0.15 * num_of_token)} to", reduce_prompt)
+
+    def test_reduce_prompt_fits_in_one_chunk(self):
+        client = self._client()
+        summarizer = MapReduceSummarizer(
+            client=client,
+            model="m",
+            max_num_of_token_in_chunk=60,
+            num_tries=1,
+            bert_score_backend=ConstantBertScoreBackend(),
+        )
+        asyncio.run(summarizer.summarize(document=self.document))
+        (reduce_prompt,) = self._prompts(client, Report)
+        document_in_prompt = reduce_prompt.split("Summarize the document below:")[
+            1
+        ].split("Requirements include:")[0]
+        self.assertLessEqual(len(document_in_prompt.split()), 60)
+
+    def test_partial_summaries_not_shrinking(self):
+        async def parse(model, messages, response_format):
+            chunk = messages[1]["content"].split("Here is the text:")[1]
+            return completion(PartialSummary(content=chunk).model_dump_json())
+
+        client = MagicMock()
+        client.beta.chat.completions.parse = AsyncMock(side_effect=parse)
+        summarizer = MapReduceSummarizer(
+            client=client,
+            model="m",
+            max_num_of_token_in_chunk=200,
+            num_tries=1,
+            bert_score_backend=ConstantBertScoreBackend(),
+        )
+        with self.assertRaises(PartialSummariesTooLong):
+            asyncio.run(summarizer.summarize(document=self.document))
+        self.assertEqual(self._prompts(client, Report), [])
+
+    def test_chunk_length_follows_token_counter(self):
+        client = self._client()
+        summarizer = MapReduceSummarizer(
+            client=client,
+            model="m",
+            max_num_of_token_in_chunk=1500,
+            num_tries=1,
+            bert_score_backend=ConstantBertScoreBackend(),
+            token_counter=CharacterTokenCounter(),
+        )
+        asyncio.run(summarizer.summarize(document=self.document))
+        chunk_prompts = self._prompts(client, PartialSummary)
+        self.assertGreater(len(chunk_prompts), 1)
+        for prompt in chunk_prompts:
+            chunk = prompt.split("Here is the text:\n")[1].strip()
+            self.assertIn(f"at most {int(0.4 * len(chunk))} tokens / words", prompt)
+
+    def test_short_document_is_summarized_directly(self):
+        client = self._client()
+        summarizer = MapReduceSummarizer(
+            client=client,
+            model="m",
+            max_num_of_token_in_chunk=1000,
+            num_tries=1,
+            bert_score_backend=ConstantBertScoreBackend(),
+        )
+        report = asyncio.run(summarizer.summarize(document=self.document))
+        self.assertEqual(report, self.report)
+        self.assertEqual(self._prompts(client, PartialSummary), [])
+        (prompt,) = self._prompts(client, Report)
+        self.assertIn(self.document.content, prompt)
+
+
+class TestBestHitLLMSummarizerStream(ArticleTestCase):
+
+    def _stream(self, report: Report):
+        content = report.model_dump_json()
+        deltas = [content[i : i + 8] for i in range(0, len(content), 8)]
+        final_completion = completion(content, completion_tokens=len(deltas))
+        stream = MagicMock()
+        stream.__aenter__ = AsyncMock(return_value=stream)
+        stream.__aexit__ = AsyncMock(return_value=False)
+        stream.deltas_sent = []
+
+        async def events():
+            for delta in deltas:
+                stream.deltas_sent.append(delta)
+                yield SimpleNamespace(type="content.delta", delta=delta)
+
+        stream.__aiter__ = lambda _: events()
+        stream.get_final_completion = AsyncMock(return_value=final_completion)
+        return stream
+
+    def test_abort_overlong_report(self):
+        overlong = Report(title="Foster care", content=self.document.content)
+        stream = self._stream(overlong)
+        client = MagicMock()
+        client.beta.chat.completions.stream = MagicMock(return_value=stream)
+        summarizer = BestHitLLMSummarizer(
+            client=client, model="m", num_tries=1, stream=True
+        )
+        with self.assertRaises(NoReportSatisfyAllMustRequirements):
+            asyncio.run(summarizer.summarize(document=self.document))
+        self.assertLess(
+            len("".join(stream.deltas_sent)), len(overlong.model_dump_json()) // 2
+        )
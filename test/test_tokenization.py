@@ -0,0 +1,67 @@
+import importlib.util
+import pickle
+import unittest
+
+from main.tokenization import (
+    TiktokenTokenCounter,
+    TokenCounter,
+    WhitespaceTokenCounter,
+    get_token_counter,
+)
+
+
+class _CountingTokenCounter(TokenCounter):
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.num_of_calls = 0
+
+    def _count(self, text: str) -> int:
+        self.num_of_calls += 1
+        return len(text.split())
+
+
+class TestTokenCounter(unittest.TestCase):
+
+    def test_whitespace(self):
+        counter = WhitespaceTokenCounter()
+        self.assertEqual(counter.count(" UCLA is\n\na university "), 4)
+
+    def test_memoized(self):
+        counter = _CountingTokenCounter()
+        self.assertEqual(counter.count("UCLA is a university"), 4)
+        self.assertEqual(counter.count("UCLA is a university"), 4)
+        self.assertEqual(counter.num_of_calls, 1)
+        self.assertEqual((counter.num_of_hits, counter.num_of_misses), (1, 1))
+
+    def test_least_recently_used_is_evicted(self):
+        counter = _CountingTokenCounter(max_cache_size=2)
+        counter.count("a")
+        counter.count("b")
+        counter.count("a")
+        counter.count("c")
+        counter.count("a")
+        self.assertEqual(counter.num_of_calls, 3)
+        counter.count("b")
+        self.assertEqual(counter.num_of_calls, 4)
+
+    def test_picklable(self):
+        counter = WhitespaceTokenCounter()
+        counter.count("UCLA")
+        copy = pickle.loads(pickle.dumps(counter))
+        self.assertEqual(copy.count("UCLA is"), 2)
+
+    def test_registry(self):
+        self.assertIs(get_token_counter(), get_token_counter("whitespace"))
+        self.assertIsInstance(get_token_counter("cl100k_base"), TiktokenTokenCounter)
+        with self.assertRaises(ValueError):
+            get_token_counter("unknown")
+
+    @unittest.skipUnless(importlib.util.find_spec("tiktoken"), "tiktoken not installed")
+    def test_tiktoken(self):
+        counter = get_token_counter("cl100k_base")
+        self.assertGreater(counter.count("UCLA is a public university."), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import asyncio
+import unittest
+
+from main.tracing import InMemorySpanExporter, PrometheusSpanExporter, Tracer
+
+
+class TestTracer(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.exporter = InMemorySpanExporter()
+        self.tracer = Tracer(exporters=[self.exporter])
+
+    def test_span(self) -> None:
+        with self.tracer.span("llm.call", model="deepseek-r1:8b") as span:
+            span.set_attribute("completion_tokens", 8)
+        (exported,) = self.exporter.spans
+        self.assertEqual(exported.name, "llm.call")
+        self.assertEqual(exported.status, "ok")
+        self.assertEqual(exported.attributes["model"], "deepseek-r1:8b")
+        self.assertEqual(exported.attributes["completion_tokens"], 8)
+        self.assertGreaterEqual(exported.duration, 0.0)
+
+    def test_nested_spans(self) -> None:
+        async def run():
+            with self.tracer.span("summarize"):
+                await asyncio.gather(
+                    *[self._child(candidate) for candidate in range(2)]
+                )
+
+        asyncio.run(run())
+        children = [span for span in self.exporter.spans if span.name == "llm.call"]
+        (parent,) = [span for span in self.exporter.spans if span.name == "summarize"]
+        self.assertEqual(len(children), 2)
+        for child in children:
+            self.assertEqual(child.parent_id, parent.span_id)
+            self.assertEqual(child.trace_id, parent.trace_id)
+
+    async def _child(self, candidate: int) -> None:
+        with self.tracer.span("llm.call", candidate=candidate):
+            await asyncio.sleep(0)
+
+    def test_error(self) -> None:
+        with self.assertRaises(ValueError):
+            with self.tracer.span("scorer.extract"):
+                raise ValueError("boom")
+        (exported,) = self.exporter.spans
+        self.assertEqual(exported.status, "error")
+        self.assertEqual(exported.attributes["outcome"], "error")
+
+
+class TestPrometheusSpanExporter(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.exporter = PrometheusSpanExporter()
+        self.tracer = Tracer(exporters=[self.exporter])
+
+    def test_render(self) -> None:
+        with self.tracer.span("llm.call", model="m") as span:
+            span.set_attribute("prompt_tokens", 10)
+            span.set_attribute("completion_tokens", 5)
+            span.set_attribute("outcome", "ok")
+        text = self.exporter.render()
+        self.assertIn("# TYPE summarizer_stage_duration_seconds histogram", text)
+        self.assertIn(
+            'summarizer_stage_duration_seconds_count{stage="llm.call",model="m",outcome="ok"} 1',
+            text,
+        )
+        self.assertIn(
+            'summarizer_stage_duration_seconds_bucket{stage="llm.call",model="m",outcome="ok",le="+Inf"} 1',
+            text,
+        )
+        self.assertIn('summarizer_llm_tokens_total{model="m",kind="prompt"} 10', text)
+        self.assertIn(
+            'summarizer_llm_tokens_total{model="m",kind="completion"} 5', text
+        )
+
+    def test_stage_labels(self) -> None:
+        with self.tracer.span("scorer.extract", scorer="RougeScoreMetricExtractor", candidate=0):
+            pass
+        with self.tracer.span("requirement.check", requirement="Correctness") as span:
+            span.set_attribute("outcome", "satisfied")
+        with self.tracer.span("prompt.render", template="summarize_template.j2"):
+            pass
+        text = self.exporter.render()
+        self.assertIn(
+            'summarizer_stage_duration_seconds_count{stage="scorer.extract",scorer="RougeScoreMetricExtractor"} 1',
+            text,
+        )
+        self.assertIn(
+            'summarizer_stage_duration_seconds_count{stage="requirement.check",requirement="Correctness",outcome="satisfied"} 1',
+            text,
+        )
+        self.assertIn(
+            'summarizer_stage_duration_seconds_count{stage="prompt.render",template="summarize_template.j2"} 1',
+            text,
+        )
+        self.assertNotIn("candidate", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from main.usage import TokenBudget, TokenUsage, UsageLedger, get_usage_ledger, usage_scope
+
+
+class TestTokenUsage(unittest.TestCase):
+
+    def test_add(self) -> None:
+        usage = TokenUsage(prompt_tokens=10, completion_tokens=2, num_of_calls=1)
+        usage = usage + TokenUsage(prompt_tokens=5, completion_tokens=3, num_of_calls=1)
+        self.assertEqual(usage.prompt_tokens, 15)
+        self.assertEqual(usage.completion_tokens, 5)
+        self.assertEqual(usage.total_tokens, 20)
+        self.assertEqual(usage.num_of_calls, 2)
+
+
+class TestTokenBudget(unittest.TestCase):
+
+    def test_max_total_tokens(self) -> None:
+        budget = TokenBudget(max_total_tokens=100)
+        self.assertFalse(budget.is_exhausted_by(TokenUsage(prompt_tokens=99)))
+        self.assertTrue(budget.is_exhausted_by(TokenUsage(prompt_tokens=100)))
+
+    def test_max_cost(self) -> None:
+        budget = TokenBudget(
+            max_cost=0.01,
+            prompt_cost_per_1k_tokens=0.001,
+            completion_cost_per_1k_tokens=0.002,
+        )
+        usage = TokenUsage(prompt_tokens=4000, completion_tokens=2000)
+        self.assertAlmostEqual(budget.cost(usage), 0.008)
+        self.assertFalse(budget.is_exhausted_by(usage))
+        self.assertTrue(budget.is_exhausted_by(usage + usage))
+
+    def test_unlimited(self) -> None:
+        self.assertFalse(TokenBudget().is_exhausted_by(TokenUsage(prompt_tokens=10**9)))
+
+
+class TestUsageLedger(unittest.TestCase):
+
+    def test_roll_up(self) -> None:
+        parent = UsageLedger(budget=TokenBudget(max_total_tokens=50))
+        child = UsageLedger(parent=parent)
+        child.record(prompt_tokens=30, completion_tokens=10)
+        self.assertEqual(parent.usage.total_tokens, 40)
+        self.assertFalse(child.is_exhausted())
+        child.record(prompt_tokens=10, completion_tokens=0)
+        self.assertTrue(child.is_exhausted())
+
+    def test_usage_scope(self) -> None:
+        self.assertIsNone(get_usage_ledger())
+        with usage_scope() as outer:
+            with usage_scope(budget=TokenBudget(max_total_tokens=1)) as inner:
+                self.assertIs(get_usage_ledger(), inner)
+                get_usage_ledger().record(prompt_tokens=3, completion_tokens=1)
+            self.assertIs(get_usage_ledger(), outer)
+        self.assertEqual(outer.usage.total_tokens, 4)
+        self.assertTrue(inner.is_exhausted())
+        self.assertIsNone(get_usage_ledger())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from main.config import SummarizerConfig, SummarizerFactory
+from main.job_queue import SQLiteJobQueue
+from main.worker import Worker, build_summarize_handler
+from test.helpers import ArticleTestCase, ConstantBertScoreBackend, mock_client
+
+
+class TestWorker(ArticleTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.queue = SQLiteJobQueue(
+            path=os.path.join(self.directory.name, "jobs.sqlite"),
+            max_attempts=2,
+            retry_delay=0.0,
+        )
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_run(self) -> None:
+        async def handler(payload: dict) -> dict:
+            if payload["fail"]:
+                raise RuntimeError("boom")
+            return {"echo": payload["text"]}
+
+        done = self.queue.enqueue({"text": "UCLA", "fail": False})
+        dead = self.queue.enqueue({"text": "UCLA", "fail": True})
+        worker = Worker(queue=self.queue, handler=handler)
+        num_of_jobs = asyncio.run(worker.run(stop_when_idle=True))
+
+        self.assertEqual(num_of_jobs, 3)  # the failing job ran twice
+        self.assertEqual(self.queue.get(done).result, {"echo": "UCLA"})
+        self.assertEqual(self.queue.get(dead).status, "dead")
+        self.assertEqual(self.queue.get(dead).error, "RuntimeError: boom")
+
+    def test_summarize_handler(self) -> None:
+        client = mock_client(self.report)
+        summarizers = SummarizerFactory(
+            client=client, config=SummarizerConfig(model="m", bert_score_batch_size=0)
+        )
+        handler = build_summarize_handler(
+            summarizers, bert_score_backend=ConstantBertScoreBackend()
+        )
+        job_id = self.queue.enqueue(
+            {"text": self.document.content, "options": {"num_tries": 2}}
+        )
+        asyncio.run(Worker(queue=self.queue, handler=handler).run(max_jobs=1))
+
+        result = self.queue.get(job_id).result
+        self.assertEqual(result["report"], self.report.model_dump())
+        self.assertEqual(result["usage"]["num_of_calls"], 2)
+        self.assertEqual(
+            client.beta.chat.completions.parse.await_args.kwargs["model"], "m"
+        )
+        summarizers.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()